@@ -0,0 +1,54 @@
+"""Time the text-to-layout assignment of a synthetic, text-dense page.
+
+Compares scaling layout boxes and matching text items to them using the
+pydantic geometry types against the array-backed blocks used by the PDF
+extractors::
+
+    uv run python assistant/benchmarks/pdf_layout_assignment.py
+"""
+
+import random
+import timeit
+
+from mapwisefox.assistant.tools.pdf._spatial import RectIndex
+from mapwisefox.assistant.tools.pdf._types import (
+    LayoutBlocks,
+    LayoutBox,
+    Point,
+    Rect,
+    TextBlocks,
+    TextItem,
+)
+
+_rng = random.Random(0)
+
+
+def _rect(max_w: float, max_h: float) -> Rect:
+    x, y = _rng.uniform(0, 600), _rng.uniform(0, 800)
+    return Rect(
+        Point(x, y), Point(x + _rng.uniform(1, max_w), y + _rng.uniform(1, max_h))
+    )
+
+
+def main() -> None:
+    items = [TextItem("word", 10, None, _rect(60, 12)) for _ in range(3000)]
+    boxes = [LayoutBox(["Text"], _rect(300, 120)) for _ in range(40)]
+    text_blocks = TextBlocks.from_items(items)
+    layout_blocks = LayoutBlocks.from_boxes(boxes)
+
+    def _with_types():
+        scaled = [box.scale(0.5, 0.5) for box in boxes]
+        for item in items:
+            [b for b in scaled if b.bounds.overlap_ratio(item.bounds) >= 0.5]
+
+    def _with_blocks():
+        index = RectIndex(layout_blocks.scale(0.5, 0.5).coords)
+        index.overlapping_many(text_blocks.coords, 0.5)
+
+    for label, f in [("pydantic types", _with_types), ("blocks", _with_blocks)]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        print(f"{label}: {seconds * 1000:.1f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
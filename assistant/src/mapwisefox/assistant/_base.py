@@ -1,9 +1,12 @@
 from functools import partial
+from pathlib import Path
+from typing import Optional
 
 import click
 
-from mapwisefox.assistant.config import AssistantParams, ProviderChoice
+from mapwisefox.assistant.config import AssistantParams, OutputMode, ProviderChoice
 from mapwisefox.assistant.config._validate import validate_config
+from mapwisefox.assistant.instrumentation import MetricsRegistry
 from mapwisefox.assistant.quality_assessment import cli as study_qa
 from mapwisefox.assistant.study_selection import cli as study_selection
 from mapwisefox.assistant.tools.llm import (
@@ -12,6 +15,9 @@ from mapwisefox.assistant.tools.llm import (
     AnthropicProvider,
     GoogleProvider,
     BedrockProvider,
+    RateLimiter,
+    ResponseCache,
+    TokenUsage,
 )
 
 
@@ -33,8 +39,70 @@ def _google_provider(model_choice: str, api_key: str):
     return partial(GoogleProvider, model=model_choice, api_key=api_key)
 
 
-def _bedrock_provider(model_choice: str, api_key: str):
-    return partial(BedrockProvider, model=model_choice, api_key=api_key)
+def _bedrock_provider(
+    model_choice: str,
+    api_key: str,
+    batch_s3_uri: Optional[str],
+    batch_role_arn: Optional[str],
+):
+    return partial(
+        BedrockProvider,
+        model=model_choice,
+        api_key=api_key,
+        batch_s3_uri=batch_s3_uri,
+        batch_role_arn=batch_role_arn,
+    )
+
+
+def _provider_factory(
+    provider: ProviderChoice,
+    model_choice: str,
+    ollama_endpoint: str,
+    api_key: str,
+    bedrock_batch_s3_uri: Optional[str] = None,
+    bedrock_batch_role_arn: Optional[str] = None,
+):
+    match provider:
+        case ProviderChoice.openai:
+            return _openai_provider(model_choice, api_key)
+        case ProviderChoice.anthropic:
+            return _anthropic_provider(model_choice, api_key)
+        case ProviderChoice.google:
+            return _google_provider(model_choice, api_key)
+        case ProviderChoice.bedrock:
+            return _bedrock_provider(
+                model_choice, api_key, bedrock_batch_s3_uri, bedrock_batch_role_arn
+            )
+        case _:
+            return _ollama_provider(model_choice, ollama_endpoint, api_key)
+
+
+def _close_response_cache(cache: ResponseCache) -> None:
+    if cache.hits or cache.misses:
+        click.echo(
+            f"LLM response cache: {cache.hits} hits, {cache.misses} misses", err=True
+        )
+    cache.close()
+
+
+def _report_token_usage(usage: TokenUsage) -> None:
+    if usage.requests:
+        click.echo(
+            f"LLM prompt tokens: {usage.input_tokens}, "
+            f"{usage.cached_input_tokens} read from the provider's prompt cache",
+            err=True,
+        )
+
+
+def _write_metrics(
+    registry: MetricsRegistry,
+    json_path: Optional[str],
+    prometheus_path: Optional[str],
+) -> None:
+    if json_path is not None:
+        registry.write_json(Path(json_path))
+    if prometheus_path is not None:
+        registry.write_prometheus(Path(prometheus_path))
 
 
 def _validate_api_key(ctx, param, value):
@@ -87,24 +155,181 @@ all assistant subcommands."""
     help="API key used to connect to LLM provider APIs (OpenAI, Google, Anthropic, ...)",
     default="",
 )
+@click.option(
+    "--bedrock-batch-s3-uri",
+    type=click.STRING,
+    default=None,
+    envvar="MWF_ASSISTANT_BEDROCK_BATCH_S3_URI",
+    help="S3 location where AWS Bedrock batch inference jobs read and write records",
+)
+@click.option(
+    "--bedrock-batch-role-arn",
+    type=click.STRING,
+    default=None,
+    envvar="MWF_ASSISTANT_BEDROCK_BATCH_ROLE_ARN",
+    help="IAM service role AWS Bedrock batch inference jobs run as",
+)
+@click.option(
+    "--rpm",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="maximum LLM requests per minute (unlimited if not set)",
+)
+@click.option(
+    "--tpm",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="maximum estimated LLM prompt tokens per minute (unlimited if not set)",
+)
+@click.option(
+    "--response-cache",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    envvar="MWF_ASSISTANT_RESPONSE_CACHE",
+    help="SQLite file caching LLM answers, so repeated requests are answered locally",
+)
+@click.option(
+    "--response-cache-mb",
+    type=click.IntRange(min=1),
+    default=256,
+    show_default=True,
+    help="size limit of the LLM response cache",
+)
+@click.option(
+    "--screening-model",
+    type=click.STRING,
+    default=None,
+    help="a small, fast model that screens records before --model in a cascade",
+)
+@click.option(
+    "--screening-provider",
+    type=click.Choice(ProviderChoice),
+    default=ProviderChoice.ollama,
+    help="the LLM provider of --screening-model",
+    show_default=True,
+)
+@click.option(
+    "--screening-api-key",
+    type=click.STRING,
+    default=None,
+    envvar="MWF_ASSISTANT_SCREENING_API_KEY",
+    help="API key of --screening-provider; --api-key is never sent to it",
+)
+@click.option(
+    "--metrics-json",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    envvar="MWF_ASSISTANT_METRICS_JSON",
+    help="file receiving a JSON summary of LLM request metrics when the run ends",
+)
+@click.option(
+    "--metrics-prom",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    envvar="MWF_ASSISTANT_METRICS_PROM",
+    help="file receiving LLM request metrics in the Prometheus textfile format",
+)
+@click.option(
+    "--output",
+    "output_mode",
+    type=click.Choice(OutputMode),
+    default=OutputMode.stream,
+    envvar="MWF_ASSISTANT_OUTPUT",
+    show_default=True,
+    help=r"""how LLM answers are shown: streamed as they arrive, aggregated into
+    one line per record, as JSON lines, or quiet""",
+)
+@click.option(
+    "--output-file",
+    type=click.File("w"),
+    default=None,
+    help="file receiving the LLM answers instead of the standard output",
+)
 @click.pass_context
-def assistant(ctx, model, provider, ollama_endpoint, api_key):
+def assistant(
+    ctx,
+    model,
+    provider,
+    ollama_endpoint,
+    api_key,
+    bedrock_batch_s3_uri,
+    bedrock_batch_role_arn,
+    rpm,
+    tpm,
+    response_cache,
+    response_cache_mb,
+    screening_model,
+    screening_provider,
+    screening_api_key,
+    metrics_json,
+    metrics_prom,
+    output_mode,
+    output_file,
+):
     obj = ctx.ensure_object(AssistantParams)
     obj.model_choice = model
     obj.ollama_endpoint = ollama_endpoint
     obj.api_key = api_key
+    obj.output_mode = output_mode
+    obj.output_file = output_file
 
-    match provider:
-        case ProviderChoice.openai:
-            obj.provider_factory = _openai_provider(model, api_key)
-        case ProviderChoice.anthropic:
-            obj.provider_factory = _anthropic_provider(model, api_key)
-        case ProviderChoice.google:
-            obj.provider_factory = _google_provider(model, api_key)
-        case ProviderChoice.bedrock:
-            obj.provider_factory = _bedrock_provider(model, api_key)
-        case _:
-            obj.provider_factory = _ollama_provider(model, ollama_endpoint, api_key)
+    obj.provider_factory = _provider_factory(
+        provider,
+        model,
+        ollama_endpoint,
+        api_key,
+        bedrock_batch_s3_uri,
+        bedrock_batch_role_arn,
+    )
+    # one budget shared by every request the subcommand makes to the provider
+    cache = None
+    if response_cache is not None:
+        cache = ResponseCache(
+            Path(response_cache), max_size_bytes=response_cache_mb * 2**20
+        )
+        ctx.call_on_close(partial(_close_response_cache, cache))
+    usage = TokenUsage()
+    ctx.call_on_close(partial(_report_token_usage, usage))
+    metrics = None
+    if metrics_json is not None or metrics_prom is not None:
+        metrics = MetricsRegistry()
+        ctx.call_on_close(partial(_write_metrics, metrics, metrics_json, metrics_prom))
+    obj.provider_factory = partial(
+        obj.provider_factory,
+        rate_limiter=RateLimiter(rpm, tpm),
+        response_cache=cache,
+        token_usage=usage,
+        metrics=metrics,
+    )
+    if screening_model is not None:
+        # a Bedrock key is exported as AWS_BEARER_TOKEN_BEDROCK, so it can't be None
+        if (
+            screening_provider
+            in {
+                ProviderChoice.openai,
+                ProviderChoice.anthropic,
+                ProviderChoice.bedrock,
+            }
+            and not (screening_api_key or "").strip()
+        ):
+            raise click.BadParameter(
+                f"expected user to supply an API key when using {screening_provider}",
+                param_hint="'--screening-api-key'",
+            )
+        obj.screening_model_choice = screening_model
+        # --rpm and --tpm budget the main provider; the screening model is
+        # typically local and unlimited
+        obj.screening_provider_factory = partial(
+            _provider_factory(
+                screening_provider,
+                screening_model,
+                ollama_endpoint,
+                screening_api_key,
+            ),
+            response_cache=cache,
+            token_usage=usage,
+            metrics=metrics,
+        )
 
 
 assistant.add_command(study_selection)
@@ -11,13 +11,21 @@ from mapwisefox.common.config import (
     write_schema_files,
 )
 
-from ._types import ProviderChoice, ReaderType, AssistantParams
+from ._types import (
+    ProviderChoice,
+    ReaderType,
+    ScoringMode,
+    OutputMode,
+    AssistantParams,
+)
 
 
 __all__ = [
     "ProviderChoice",
     "AssistantParams",
     "ReaderType",
+    "ScoringMode",
+    "OutputMode",
     "SelectionCriterion",
     "SelectionConfig",
     "SelectionResponse",
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import StrEnum
-from typing import Optional, Callable
+from typing import Optional, Callable, TextIO
 
 
 class ProviderChoice(StrEnum):
@@ -16,9 +16,27 @@ class ReaderType(StrEnum):
     custom = "custom"
 
 
+class ScoringMode(StrEnum):
+    per_criterion = "per-criterion"
+    combined = "combined"
+
+
+class OutputMode(StrEnum):
+    stream = "stream"
+    aggregated = "aggregated"
+    jsonl = "jsonl"
+    quiet = "quiet"
+
+
 @dataclass
 class AssistantParams:
     provider_factory: Optional[Callable] = field(init=True, repr=True, default=None)
     model_choice: str = field(init=True, repr=True, default="gpt-oss:20b")
     ollama_endpoint: str = field(init=True, repr=True, default="http://localhost:11434")
     api_key: Optional[str] = field(init=True, repr=True, default=None)
+    screening_provider_factory: Optional[Callable] = field(
+        init=True, repr=True, default=None
+    )
+    screening_model_choice: Optional[str] = field(init=True, repr=True, default=None)
+    output_mode: OutputMode = field(init=True, repr=True, default=OutputMode.stream)
+    output_file: Optional[TextIO] = field(init=True, repr=True, default=None)
@@ -1,4 +1,5 @@
 from ._timer import timer
+from ._metrics import Counter, Histogram, MetricsRegistry
 
 
-__all__ = ["timer"]
+__all__ = ["timer", "Counter", "Histogram", "MetricsRegistry"]
@@ -0,0 +1,190 @@
+import bisect
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, Any]) -> _Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self.__lock = threading.Lock()
+        self.__values: dict[_Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self.__lock:
+            return self.__values.get(_labels(labels), 0)
+
+    def summary(self) -> list[dict]:
+        with self.__lock:
+            return [
+                {"labels": dict(key), "value": value}
+                for key, value in self.__values.items()
+            ]
+
+    def prometheus_lines(self) -> list[str]:
+        with self.__lock:
+            return [
+                f"{self.name}{_format_labels(key)} {value}"
+                for key, value in self.__values.items()
+            ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.__bounds = sorted(buckets) + [math.inf]
+        self.__lock = threading.Lock()
+        # per label set: observations per bucket, their sum and their count
+        self.__values: dict[_Labels, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self.__lock:
+            counts, total, count = self.__values.get(
+                key, ([0] * len(self.__bounds), 0.0, 0)
+            )
+            counts[bisect.bisect_left(self.__bounds, value)] += 1
+            self.__values[key] = counts, total + value, count + 1
+
+    def count(self, **labels) -> int:
+        with self.__lock:
+            return self.__values.get(_labels(labels), ([], 0.0, 0))[2]
+
+    def __cumulative(self, counts: list[int]) -> list[tuple[str, int]]:
+        cumulative, running = [], 0
+        for bound, n in zip(self.__bounds, counts):
+            running += n
+            cumulative.append((_format_bound(bound), running))
+        return cumulative
+
+    def summary(self) -> list[dict]:
+        with self.__lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "count": count,
+                    "sum": total,
+                    "buckets": dict(self.__cumulative(counts)),
+                }
+                for key, (counts, total, count) in self.__values.items()
+            ]
+
+    def prometheus_lines(self) -> list[str]:
+        lines = []
+        with self.__lock:
+            for key, (counts, total, count) in self.__values.items():
+                for bound, n in self.__cumulative(counts):
+                    labels = _format_labels(key + (("le", bound),))
+                    lines.append(f"{self.name}_bucket{labels} {n}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Counters and histograms of a run, summarized when the run ends.
+
+    Metrics are created on first use and can be updated from any thread. The
+    summary is written as JSON, or in the Prometheus text format read by the
+    node exporter's textfile collector.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__metrics: dict[str, Counter | Histogram] = {}
+        self.__started = time.time()
+
+    def __get(self, cls, name: str, *args) -> Any:
+        with self.__lock:
+            if name not in self.__metrics:
+                self.__metrics[name] = cls(name, *args)
+            metric = self.__metrics[name]
+        if not isinstance(metric, cls):
+            raise ValueError(f"metric {name!r} is a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self.__get(Counter, name, help_text)
+
+    def histogram(
+        self, name: str, help_text: str = "", buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.__get(Histogram, name, help_text, buckets)
+
+    def summary(self) -> dict[str, Any]:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return {
+            "started": self.__started,
+            "duration_seconds": time.time() - self.__started,
+            "metrics": {
+                m.name: {"type": m.kind, "help": m.help, "values": m.summary()}
+                for m in metrics
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __write(path: Path, text: str) -> None:
+        # textfile collectors may read at any time, so files are replaced whole
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".part", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(text)
+        os.replace(f.name, path)
+
+    def write_json(self, path: Path) -> None:
+        self.__write(path, json.dumps(self.summary(), indent=2) + "\n")
+
+    def write_prometheus(self, path: Path) -> None:
+        self.__write(path, self.to_prometheus())
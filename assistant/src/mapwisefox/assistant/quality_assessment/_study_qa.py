@@ -1,20 +1,25 @@
 import io
+import json
 import os
+import threading
 from collections import defaultdict
+from concurrent.futures import CancelledError, Executor, Future, ThreadPoolExecutor
 
 import pandas as pd
 import urllib3
 from functools import partial
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Iterator, Optional
 
 from pathlib import Path
 
 import click
+import jinja2
 from requests.exceptions import HTTPError
 
 from mapwisefox.assistant.config import (
     ConfigValidationError,
     ReaderType,
+    ScoringMode,
     load_qa_config,
 )
 from mapwisefox.assistant.instrumentation import timer
@@ -24,15 +29,18 @@ from mapwisefox.assistant.tools import (
     FileProvider,
 )
 from mapwisefox.assistant.tools.callbacks import (
+    OutputDispatcher,
     make_stderr_callback,
-    make_thinking_callback,
-    write_stdout,
 )
 from mapwisefox.assistant.tools.extras import try_import
+from mapwisefox.assistant.tools.journal import CheckpointJournal, fingerprint
 from mapwisefox.assistant.tools.logging import get_logger
+from mapwisefox.assistant.tools.pipeline import pipelined
+from mapwisefox.assistant.tools.retrieval import ChunkIndex
 from mapwisefox.assistant.tools.pdf import (
     FileContentsExtractor,
     CachingFileContentsExtractor,
+    ExtractionCache,
     FileContentsExtractionError,
     ExtractionFailureReason,
 )
@@ -41,6 +49,18 @@ _COMMAND_NAME = "study-qa"
 log = get_logger(_COMMAND_NAME)
 urllib3.disable_warnings()
 
+DEFAULT_MAX_SCORE_RETRIES = 3
+DEFAULT_QUEUE_SIZE = 2
+_CRITERION_SCHEMA = {
+    "title": "evaluation",
+    "description": "primary study evaluation",
+    "type": "object",
+    "properties": {"score": {"type": "number"}, "reason": {"type": "string"}},
+    "additionalProperties": False,
+    "strict": True,
+    "required": ["score", "reason"],
+}
+
 
 def _extract_context(cfg: dict, crit: dict) -> dict:
     return {
@@ -61,19 +81,24 @@ def reader_factory(
     layout_model: str,
     dpi: int = 150,
     timeout_seconds: float = 30.0,
+    workers: int = 1,
 ) -> FileContentsExtractor:
     if reader_type == ReaderType.docling:
         docling = try_import("mapwisefox.assistant.tools.pdf._docling")
         return docling.DoclingExtractor(
-            error_callback=log.warning, timeout_seconds=timeout_seconds
+            error_callback=log.warning,
+            timeout_seconds=timeout_seconds,
+            workers=workers,
         )
 
     return get_default_pdf_reader(dpi, layout_model)
 
 
 @timer(callback=log.info, label="read-pdf")
-def _extract_file_contents(extractor: FileContentsExtractor, local_path: Path) -> str:
-    caching_reader = CachingFileContentsExtractor(local_path.parent, extractor)
+def _extract_file_contents(
+    extractor: FileContentsExtractor, local_path: Path, cache: ExtractionCache
+) -> str:
+    caching_reader = CachingFileContentsExtractor(cache, extractor)
     return caching_reader.read_file(local_path)
 
 
@@ -83,11 +108,12 @@ def _read_paper(
     pdf_reader: FileContentsExtractor,
     max_retries: int,
     get_failsafe_reader: Callable,
+    cache: ExtractionCache,
 ):
     retries, local_reader = max_retries, pdf_reader
     while retries >= 0:
         try:
-            return True, _extract_file_contents(local_reader, local_file_path)
+            return True, _extract_file_contents(local_reader, local_file_path, cache)
         except FileContentsExtractionError as exc:
             if exc.reason not in {
                 ExtractionFailureReason.Timeout,
@@ -109,41 +135,122 @@ def _read_paper(
     return False, None
 
 
-@timer(log.info, "read-pdf-files")
+def _download_papers(
+    df: pd.DataFrame, url_column: str, file_provider: FileProvider
+) -> Iterator[tuple[Any, str, Path | None]]:
+    row_indices = defaultdict(list)
+    for idx, download_url in df[url_column].items():
+        row_indices[download_url].append(idx)
+
+    for download_url, result in file_provider.fetch_many(row_indices):
+        if isinstance(result, (AttributeError, ValueError, HTTPError)):
+            log.warning("failed to download %s: %s", download_url, result)
+            result = None
+        elif isinstance(result, Exception):
+            raise result
+        for idx in row_indices[download_url]:
+            yield idx, download_url, result
+
+
+def _read_downloaded_paper(
+    pdf_reader: FileContentsExtractor,
+    default_pdf_reader_factory: Callable[[], FileContentsExtractor],
+    max_retries: int,
+    cache: ExtractionCache,
+    item: tuple[Any, str, Path | None],
+) -> tuple[Any, str, Path | None, str | None]:
+    idx, download_url, local_file_path = item
+    if local_file_path is None:
+        return idx, download_url, None, None
+    read_ok, contents = _read_paper(
+        idx,
+        local_file_path,
+        pdf_reader,
+        max_retries,
+        default_pdf_reader_factory,
+        cache,
+    )
+    return idx, download_url, local_file_path, contents if read_ok else None
+
+
 def _extract_pdf_contents(
     df: pd.DataFrame,
     url_column: str,
     file_provider: FileProvider,
     pdf_reader: FileContentsExtractor,
     default_pdf_reader_factory: Callable[[], FileContentsExtractor],
+    cache: ExtractionCache,
     max_retries: int = 3,
-):
-    user_prompts = dict()
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    read_workers: int = 1,
+) -> tuple[Iterator[tuple[tuple[Any, str, Path], str]], list[tuple[Any, str]]]:
+    # papers are downloaded in parallel and read on a separate thread in the
+    # order downloads complete; `failed` is complete only once the returned
+    # iterator is exhausted
     failed = []
-    for idx, paper_metadata in df.iterrows():
-        download_url = paper_metadata[url_column]
-        try:
-            local_file_path = file_provider(download_url)
+    papers = pipelined(
+        partial(
+            _read_downloaded_paper,
+            pdf_reader,
+            default_pdf_reader_factory,
+            max_retries,
+            cache,
+        ),
+        _download_papers(df, url_column, file_provider),
+        queue_size,
+        name=f"{_COMMAND_NAME}-read",
+        workers=read_workers,
+    )
 
-            read_ok, contents = _read_paper(
-                idx,
-                local_file_path,
-                pdf_reader,
-                max_retries,
-                default_pdf_reader_factory,
-            )
-            if read_ok:
-                user_prompts[(idx, download_url, local_file_path)] = contents
-            else:
+    def _read_papers():
+        for idx, download_url, local_file_path, contents in papers:
+            if contents is None:
                 failed.append((idx, download_url))
-        except (AttributeError, ValueError, HTTPError) as e:
-            failed.append((idx, download_url))
-            log.warning("failed to download %s: %s", download_url, e)
+                continue
+            yield (idx, download_url, local_file_path), contents
 
-    return user_prompts, failed
+    return _read_papers(), failed
 
 
-DEFAULT_MAX_SCORE_RETRIES = 3
+def _paper_first(
+    generate_json: Callable[..., dict],
+    user_prompt_template: jinja2.Template,
+    template_data: dict,
+    user_prompt: str,
+    **kwargs,
+) -> dict:
+    """Ask about the paper ``user_prompt`` with the paper leading the request.
+
+    The topic and paper make up the system prompt, which is the same for every
+    request about a paper and is cached by providers that support it; only the
+    criteria rendered from ``user_prompt_template`` vary between requests.
+    """
+    return generate_json(
+        template_data={"topic": template_data["topic"], "paper": user_prompt},
+        user_prompt=user_prompt_template.render(**template_data),
+        **kwargs,
+    )
+
+
+def _sections_in_request(
+    generate_json: Callable[..., dict],
+    user_prompt_template: jinja2.Template,
+    template_data: dict,
+    user_prompt: str,
+    **kwargs,
+) -> dict:
+    """Ask about the sections of a paper in ``user_prompt`` within the request.
+
+    Each request is sent different sections of the paper, so they are put in
+    the user prompt ahead of the criteria and the system prompt stays the same
+    for every request of the run.
+    """
+    criteria = user_prompt_template.render(**template_data)
+    return generate_json(
+        template_data={"topic": template_data["topic"]},
+        user_prompt=f"-----\n{user_prompt}\n-----\n\n{criteria}",
+        **kwargs,
+    )
 
 
 def _score_criterion(
@@ -153,8 +260,11 @@ def _score_criterion(
     label: str,
     max_retries: int,
 ) -> dict:
-    for _ in range(max_retries + 1):
-        obj = eval_c(template_data=template_data, user_prompt=user_prompt)
+    for attempt in range(max_retries + 1):
+        # a cached answer without a usable score must not be served again
+        obj = eval_c(
+            template_data=template_data, user_prompt=user_prompt, refresh=attempt > 0
+        )
         log.debug("LLM answer: %s", obj)
         if obj.get("score"):
             return obj
@@ -163,30 +273,245 @@ def _score_criterion(
     return {"score": None, "reason": "left unscored: LLM did not return a usable score"}
 
 
-@timer(callback=log.info, label="paper-evaluation")
-def _evaluate_paper(
+def _score_paper_criterion(
     user_prompt: str,
     local_path: Path,
     generate_json: Callable[[dict, str], dict],
     qa_config: dict,
-    qa_criteria: dict,
+    criterion: dict,
     max_score_retries: int = DEFAULT_MAX_SCORE_RETRIES,
-) -> dict | None:
+) -> dict:
+    key = criterion["label"]
+    ctx = _extract_context(qa_config, criterion)
+    c_timer = timer(log.info, f"{local_path.stem}: generate-json({key})")
+    return _score_criterion(
+        c_timer(generate_json), ctx, user_prompt, key, max_score_retries
+    )
+
+
+def _paper_context(
+    user_prompt: str,
+    index: Optional[ChunkIndex],
+    criteria: list[dict],
+    context_budget: Optional[int],
+) -> str:
+    """Return the parts of the paper relevant to ``criteria``.
+
+    Without an index the whole paper is returned.
+    """
+    if index is None:
+        return user_prompt
+    query = " ".join(f"{c['question']} {c['description']}" for c in criteria)
+    return index.context(query, context_budget)
+
+
+def _criterion_key(download_url: str, label: str) -> str:
+    return json.dumps([download_url, label])
+
+
+def _journaled_results(
+    df: pd.DataFrame, url_column: str, qa_criteria: dict, journal: CheckpointJournal
+) -> dict[Any, dict]:
+    """Return the journaled results of the papers with every criterion scored."""
+    results = {}
+    for idx, download_url in df[url_column].items():
+        scores = [
+            journal.get(_criterion_key(download_url, c["label"])) for c in qa_criteria
+        ]
+        if all(score is not None for score in scores):
+            results[idx] = {
+                c["label"]: dict(score) for c, score in zip(qa_criteria, scores)
+            }
+    return results
+
+
+def _score_and_journal(
+    journal: Optional[CheckpointJournal], key: str, score: Callable[..., dict], *args
+) -> dict:
+    obj = score(*args)
+    # unscored criteria are left out, so a resumed run asks for them again
+    if journal is not None and obj.get("score") is not None:
+        journal.record(key, obj)
+    return obj
+
+
+def _combined_schema(criteria: list[dict]) -> dict:
+    return {
+        "title": "evaluation",
+        "description": "primary study evaluation against every criterion",
+        "type": "object",
+        "properties": {c["label"]: _CRITERION_SCHEMA for c in criteria},
+        "additionalProperties": False,
+        "required": [c["label"] for c in criteria],
+    }
+
+
+def _score_paper_combined(
+    paper_context: Callable[[list[dict]], str],
+    local_path: Path,
+    generate_combined: Callable[..., dict],
+    generate_json: Callable[[dict, str], dict],
+    qa_config: dict,
+    criteria: list[dict],
+    max_score_retries: int = DEFAULT_MAX_SCORE_RETRIES,
+    download_url: str = "",
+    journal: Optional[CheckpointJournal] = None,
+) -> dict[str, dict]:
+    """Score every criterion in one request, then score the criteria that came
+    back without a usable score one by one.
+
+    ``paper_context`` returns the text of the paper sent for the criteria of a
+    request.
+    """
+    labels = ", ".join(c["label"] for c in criteria)
+    c_timer = timer(log.info, f"{local_path.stem}: generate-json({labels})")
+    template_data = {"topic": qa_config["topic"], "criteria": criteria}
     try:
-        result = {}
+        answer = c_timer(generate_combined)(
+            template_data=template_data,
+            user_prompt=paper_context(criteria),
+            response_schema=_combined_schema(criteria),
+        )
+    except ValueError as err:
+        log.warning("%s: combined scoring failed: %s", local_path.stem, err)
+        answer = {}
+
+    results = {}
+    for c in criteria:
+        obj = answer.get(c["label"])
+        if not (isinstance(obj, dict) and obj.get("score")):
+            log.info("%s: scoring %r separately", local_path.stem, c["label"])
+            obj = _score_paper_criterion(
+                paper_context([c]),
+                local_path,
+                generate_json,
+                qa_config,
+                c,
+                max_score_retries,
+            )
+        if journal is not None and obj.get("score") is not None:
+            journal.record(_criterion_key(download_url, c["label"]), obj)
+        results[c["label"]] = obj
+    return results
+
+
+def _completed(result: dict) -> Future:
+    f = Future()
+    f.set_result(result)
+    return f
 
-        for c in qa_criteria:
-            key = c["label"]
-            ctx = _extract_context(qa_config, c)
 
-            c_timer = timer(log.info, f"{local_path.stem}: generate-json({key})")
-            eval_c = c_timer(generate_json)
-            result[key] = _score_criterion(
-                eval_c, ctx, user_prompt, key, max_score_retries
+def _split(future: Future, labels: list[str]) -> dict[str, Future]:
+    """Return one future per label, resolved with that label's result."""
+    parts = {label: Future() for label in labels}
+
+    def _done(f: Future):
+        for label, part in parts.items():
+            # a part cancelled by its consumer is no longer waited on
+            if not part.set_running_or_notify_cancel():
+                continue
+            if f.cancelled():
+                part.set_exception(CancelledError())
+            elif (exc := f.exception()) is not None:
+                part.set_exception(exc)
+            else:
+                part.set_result(f.result()[label])
+
+    future.add_done_callback(_done)
+    return parts
+
+
+def _evaluate_paper(
+    pool: Executor,
+    user_prompt: str,
+    local_path: Path,
+    generate_json: Callable[[dict, str], dict],
+    qa_config: dict,
+    qa_criteria: dict,
+    max_score_retries: int = DEFAULT_MAX_SCORE_RETRIES,
+    download_url: str = "",
+    journal: Optional[CheckpointJournal] = None,
+    generate_combined: Optional[Callable[..., dict]] = None,
+    context_budget: Optional[int] = None,
+    output: Optional[OutputDispatcher] = None,
+) -> dict[str, Future]:
+    def _scoped(labels: list[str], fn: Callable) -> Callable:
+        if output is None:
+            return fn
+        return output.scoped(f"{local_path.stem}: {', '.join(labels)}", fn)
+
+    futures = {}
+    pending = []
+    for c in qa_criteria:
+        key = _criterion_key(download_url, c["label"])
+        if journal is not None and (journaled := journal.get(key)) is not None:
+            futures[c["label"]] = _completed(dict(journaled))
+        else:
+            pending.append(c)
+
+    # the paper is chunked and indexed once, then queried for each request
+    index = None
+    if context_budget is not None and pending:
+        index = ChunkIndex.from_markdown(user_prompt)
+
+    if generate_combined is not None and len(pending) > 1:
+        combined = pool.submit(
+            _scoped([c["label"] for c in pending], _score_paper_combined),
+            partial(_paper_context, user_prompt, index, context_budget=context_budget),
+            local_path,
+            generate_combined,
+            generate_json,
+            qa_config,
+            pending,
+            max_score_retries,
+            download_url,
+            journal,
+        )
+        futures.update(_split(combined, [c["label"] for c in pending]))
+    else:
+        for c in pending:
+            futures[c["label"]] = pool.submit(
+                _scoped([c["label"]], _score_and_journal),
+                journal,
+                _criterion_key(download_url, c["label"]),
+                _score_paper_criterion,
+                _paper_context(user_prompt, index, [c], context_budget),
+                local_path,
+                generate_json,
+                qa_config,
+                c,
+                max_score_retries,
             )
+    # results are reported in the configured order of the criteria
+    return {c["label"]: futures[c["label"]] for c in qa_criteria}
+
+
+def _release_when_done(
+    futures: Iterable[Future], semaphore: threading.BoundedSemaphore
+) -> None:
+    futures = list(futures)
+    remaining = len(futures)
+    lock = threading.Lock()
+
+    def _done(_):
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining == 0:
+                semaphore.release()
 
-        return result
+    if not futures:
+        semaphore.release()
+    for f in futures:
+        f.add_done_callback(_done)
+
+
+def _collect_evaluation(local_path: Path, futures: dict[str, Future]) -> dict | None:
+    try:
+        return {key: f.result() for key, f in futures.items()}
     except Exception as e:
+        for f in futures.values():
+            f.cancel()
         styled_url = click.style(local_path, italic=True, underline=True)
         click.echo(f"Failed to evaluate paper {styled_url}. Error: {e}", err=True)
         return None
@@ -194,21 +519,50 @@ def _evaluate_paper(
 
 @timer(log.info, "evaluation")
 def _evaluate_papers(
-    paper_contents: dict[Any, Any], generate_json: partial[Any], qa_config, qa_criteria
+    paper_contents: Iterable[tuple[tuple[Any, str, Path], str]],
+    generate_json: partial[Any],
+    qa_config,
+    qa_criteria,
+    concurrency: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    journal: Optional[CheckpointJournal] = None,
+    generate_combined: Optional[Callable[..., dict]] = None,
+    context_budget: Optional[int] = None,
+    output: Optional[OutputDispatcher] = None,
 ) -> dict[Any, Any]:
+    # criteria and papers are submitted in input order, and results are keyed
+    # by row index, so the output doesn't depend on completion order
     results = {}
-    for (idx, download_url, local_file_path), user_prompt in paper_contents.items():
-        result = _evaluate_paper(
-            user_prompt,
-            local_file_path,
-            generate_json,
-            qa_config,
-            qa_criteria,
-        )
-        if result is None:
-            log.warning("unable to process item %d: %r", idx, download_url)
-            continue
-        results[idx] = result
+    # at most `queue_size` papers wait for a free worker; this stops the
+    # download/read stages from running arbitrarily far ahead of scoring
+    waiting_papers = threading.BoundedSemaphore(max(1, concurrency) + queue_size)
+    with ThreadPoolExecutor(
+        max_workers=max(1, concurrency), thread_name_prefix=_COMMAND_NAME
+    ) as pool:
+        pending = []
+        for (idx, download_url, local_file_path), user_prompt in paper_contents:
+            waiting_papers.acquire()
+            futures = _evaluate_paper(
+                pool,
+                user_prompt,
+                local_file_path,
+                generate_json,
+                qa_config,
+                qa_criteria,
+                download_url=download_url,
+                journal=journal,
+                generate_combined=generate_combined,
+                context_budget=context_budget,
+                output=output,
+            )
+            _release_when_done(futures.values(), waiting_papers)
+            pending.append((idx, download_url, local_file_path, futures))
+        for idx, download_url, local_file_path, futures in pending:
+            result = _collect_evaluation(local_file_path, futures)
+            if result is None:
+                log.warning("unable to process item %d: %r", idx, download_url)
+                continue
+            results[idx] = result
     return results
 
 
@@ -304,6 +658,12 @@ def _fill_results(df: pd.DataFrame, qa_criteria: dict, results: dict) -> pd.Data
     default=False,
     help="disable TLS certificate verification when downloading primary study PDFs",
 )
+@click.option(
+    "--verify-downloads",
+    is_flag=True,
+    default=False,
+    help="re-hash previously downloaded PDFs instead of trusting their size and mtime",
+)
 @click.option(
     "-D",
     "--download-dir",
@@ -312,6 +672,63 @@ def _fill_results(df: pd.DataFrame, qa_criteria: dict, results: dict) -> pd.Data
     help="download directory where papers will be stored.",
     show_default=True,
 )
+@click.option(
+    "--extraction-cache-mb",
+    type=click.IntRange(min=1),
+    default=512,
+    show_default=True,
+    help="size limit of the cache of extracted paper texts kept in the download directory",
+)
+@click.option(
+    "-j",
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="maximum number of LLM requests kept in flight at the same time",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=DEFAULT_QUEUE_SIZE,
+    show_default=True,
+    help="number of papers read ahead of LLM scoring",
+)
+@click.option(
+    "--download-workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="maximum number of primary study PDFs downloaded in parallel",
+)
+@click.option(
+    "--docling-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="number of Docling worker processes converting PDFs in parallel",
+)
+@click.option(
+    "--scoring-mode",
+    type=click.Choice(choices=list(ScoringMode)),
+    default=ScoringMode.per_criterion,
+    show_default=True,
+    help=r"""score each criterion in a separate request, or all criteria of a
+    paper in one request (criteria left unscored are then scored separately)""",
+)
+@click.option(
+    "--context-budget",
+    type=click.IntRange(min=1),
+    default=None,
+    help=r"""send each request only the sections of the paper most relevant to
+    its criteria, up to this many estimated tokens, instead of the whole paper""",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=True,
+    show_default=True,
+    help="reuse the scores journaled by an interrupted run with the same settings",
+)
 @click.pass_context
 def study_qa(
     ctx,
@@ -322,7 +739,16 @@ def study_qa(
     layout_config_path: str,
     reader_type: ReaderType,
     insecure_skip_tls_verify: bool,
+    verify_downloads: bool,
     download_dir: Path,
+    extraction_cache_mb: int,
+    concurrency: int,
+    prefetch: int,
+    download_workers: int,
+    docling_workers: int,
+    scoring_mode: ScoringMode,
+    context_budget: Optional[int],
+    resume: bool,
 ):
     try:
         qa_config = load_qa_config(qa_config_path).model_dump()
@@ -332,8 +758,18 @@ def study_qa(
 
     download_dir = Path(download_dir).resolve()
     file = Path(file).resolve()
-    file_provider = FileProvider(download_dir, verify_tls=not insecure_skip_tls_verify)
-    pdf_reader = reader_factory(reader_type, layout_config_path)
+    file_provider = FileProvider(
+        download_dir,
+        verify_tls=not insecure_skip_tls_verify,
+        max_workers=download_workers,
+        verify_cache=verify_downloads,
+    )
+    ctx.call_on_close(file_provider.close)
+    pdf_reader = reader_factory(
+        reader_type, layout_config_path, workers=docling_workers
+    )
+    # only the Docling reader can convert several documents at the same time
+    read_workers = docling_workers if reader_type == ReaderType.docling else 1
 
     df = load_df(file, index_col=index_col)
     for c in qa_criteria:
@@ -342,43 +778,105 @@ def study_qa(
             df[column] = pd.to_numeric(df[column], errors="coerce").astype("Float64")
         else:
             df[column] = pd.Series(dtype="Float64", index=df.index)
-    expected_json_schema = {
-        "title": "evaluation",
-        "description": "primary study evaluation",
-        "type": "object",
-        "properties": {"score": {"type": "number"}, "reason": {"type": "string"}},
-        "additionalProperties": False,
-        "strict": True,
-        "required": ["score", "reason"],
-    }
+    expected_json_schema = _CRITERION_SCHEMA
+    output = ctx.with_resource(
+        OutputDispatcher(ctx.obj.output_mode, ctx.obj.output_file)
+    )
     provider = ctx.obj.provider_factory(
         on_error=make_stderr_callback(log),
-        on_thinking=make_thinking_callback(),
-        on_text=write_stdout,
+        on_thinking=output.on_thinking,
+        on_text=output.on_text,
     )
     if not provider.ensure_model():
         exit(1)
 
     json_generator = provider.new_json_generator()
-    generate_json = partial(
+    template_dir, template_stem = Path(__file__).parent, Path(__file__).stem
+    system_prompt_path = template_dir / f"{template_stem}.j2"
+    criterion_prompt_path = template_dir / f"{template_stem}_criterion.j2"
+    ask_about_paper = partial(
         json_generator.generate_json,
-        system_prompt_template=load_template(
-            Path(__file__).parent / f"{Path(__file__).stem}.j2"
+        system_prompt_template=load_template(system_prompt_path),
+    )
+    # the whole paper is a prefix shared by its requests, while the sections
+    # retrieved for each request only keep the instructions shared
+    ask_first = _paper_first if context_budget is None else _sections_in_request
+    generate_json = partial(
+        ask_first,
+        partial(ask_about_paper, response_schema=expected_json_schema),
+        load_template(criterion_prompt_path),
+    )
+    generate_combined, combined_prompt = None, None
+    if scoring_mode == ScoringMode.combined:
+        combined_prompt_path = template_dir / f"{template_stem}_combined.j2"
+        combined_prompt = combined_prompt_path.read_text()
+        # the response schema depends on the criteria left to score
+        generate_combined = partial(
+            ask_first,
+            ask_about_paper,
+            load_template(combined_prompt_path),
+        )
+
+    output_path = file.parent / f"{file.stem}-{ctx.obj.model_choice}{file.suffix}"
+    journal = CheckpointJournal(
+        output_path.with_suffix(".journal.jsonl"),
+        fingerprint(
+            _COMMAND_NAME,
+            ctx.obj.model_choice,
+            qa_config,
+            reader_type,
+            layout_config_path,
+            system_prompt_path.read_text(),
+            criterion_prompt_path.read_text(),
+            expected_json_schema,
+            scoring_mode,
+            combined_prompt,
+            context_budget,
         ),
-        response_schema=expected_json_schema,
+        resume,
     )
+    # papers with every criterion journaled are neither downloaded nor read
+    resumed = _journaled_results(df, url_column, qa_criteria, journal)
+    if resumed:
+        log.info("resuming %d papers scored by an earlier run", len(resumed))
 
     default_reader = partial(
         get_default_pdf_reader, dpi=150, layout_model=layout_config_path
     )
+    # papers are read lazily while they are evaluated, so the cache stays
+    # open until the command ends
+    extraction_cache = ctx.with_resource(
+        ExtractionCache(download_dir, max_size_bytes=extraction_cache_mb * 2**20)
+    )
     markdown_texts, failed = _extract_pdf_contents(
-        df, url_column, file_provider, pdf_reader, default_reader, 1
+        df.drop(index=list(resumed)),
+        url_column,
+        file_provider,
+        pdf_reader,
+        default_reader,
+        extraction_cache,
+        1,
+        prefetch,
+        read_workers,
     )
+    with journal:
+        results = _evaluate_papers(
+            markdown_texts,
+            generate_json,
+            qa_config,
+            qa_criteria,
+            concurrency,
+            prefetch,
+            journal,
+            generate_combined,
+            context_budget,
+            output,
+        )
+    output.close()
+    results.update(resumed)
     if failed:
         log.warning("failed to download %d files", len(failed))
         for f in failed:
             log.warning(f)
-    results = _evaluate_papers(markdown_texts, generate_json, qa_config, qa_criteria)
     df = _fill_results(df, qa_criteria, results)
-    output_path = file.parent / f"{file.stem}-{ctx.obj.model_choice}{file.suffix}"
     df.to_excel(output_path, index=False if index_col is None else True)
@@ -1,7 +1,13 @@
+import hashlib
 import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from functools import partial
 from itertools import islice
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 import click
 import pandas as pd
@@ -10,26 +16,397 @@ from tenacity import (
     stop_after_attempt,
     retry_if_exception_type,
     wait_exponential,
-    sleep,
 )
 
 from mapwisefox.assistant.config import ConfigValidationError, load_selection_config
-from mapwisefox.common.config import SelectionResponse
+from mapwisefox.common.config import SelectionConfig, SelectionResponse
 from mapwisefox.assistant.tools import load_df, load_template
 from mapwisefox.assistant.tools.callbacks import (
+    OutputDispatcher,
     make_stderr_callback,
-    make_thinking_callback,
-    write_stdout,
 )
+from mapwisefox.assistant.tools.embeddings import (
+    EmbeddingCache,
+    OllamaEmbedder,
+    cosine_similarity,
+    embed_texts,
+)
+from mapwisefox.assistant.tools.journal import CheckpointJournal, fingerprint
+from mapwisefox.assistant.tools.llm import BatchError, estimate_tokens
 from mapwisefox.assistant.tools.logging import get_logger
 
 _COMMAND_NAME = "study-selection"
+log = get_logger(_COMMAND_NAME)
 
 SYSTEM_PROMPT_TEMPLATE = Path(__file__).parent / f"{Path(__file__).stem}.j2"
+MULTI_RECORD_PROMPT_TEMPLATE = Path(__file__).parent / f"{Path(__file__).stem}_multi.j2"
 INCLUDE_COL_NAME = "include"
 EXCLUDE_REASON_COL_NAME = "exclude_reason"
-DEFAULT_EXCLUDED_ATTRIBUTES = ["cluster_id", INCLUDE_COL_NAME, EXCLUDE_REASON_COL_NAME]
+RELEVANCE_COL_NAME = "relevance"
+DEFAULT_EXCLUDED_ATTRIBUTES = [
+    "cluster_id",
+    INCLUDE_COL_NAME,
+    EXCLUDE_REASON_COL_NAME,
+    RELEVANCE_COL_NAME,
+]
+AUTO_EXCLUDE_REASON = "least similar to the selection criteria by embedding"
 _MAX_RETRIES = 3
+DEFAULT_PROMPT_TOKEN_BUDGET = 4000
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+_RETRY_WAIT = wait_exponential(multiplier=2, max=4)
+# record keys are digests, so the submitted batch can't clash with them
+_BATCH_JOURNAL_KEY = "batch"
+
+
+def _record_prompt(row: pd.Series, ignored_attrs: set[str]) -> str:
+    return os.linesep.join(
+        f"{key}: {value}" for key, value in row.items() if key not in ignored_attrs
+    )
+
+
+def _record_key(user_prompt: str) -> str:
+    # keyed on the prompt rather than the row index, so a resumed run still
+    # matches records after the input was re-sorted or extended
+    return hashlib.sha256(user_prompt.encode()).hexdigest()
+
+
+def _resumed_records(
+    records: Iterable[tuple[Any, str]],
+    journal: CheckpointJournal,
+    on_resumed: Callable[[Any, dict], None],
+) -> Iterator[tuple[Any, str]]:
+    """Pass journaled answers to ``on_resumed`` and yield the other records."""
+    for ix, user_prompt in records:
+        if (answer_obj := journal.get(_record_key(user_prompt))) is None:
+            yield ix, user_prompt
+        else:
+            on_resumed(ix, answer_obj)
+
+
+def _check_answer(answer_obj: dict) -> None:
+    status = answer_obj.get("answer")
+    if status is None or (status == "exclude" and "justification" not in answer_obj):
+        raise ValueError(f"incomplete LLM answer: {answer_obj!r}")
+
+
+def _evaluate_record(
+    generate_json: Callable[..., dict],
+    user_prompt: str,
+    journal: Optional[CheckpointJournal] = None,
+) -> dict:
+    for retry_attempt in Retrying(
+        wait=_RETRY_WAIT,
+        stop=stop_after_attempt(_MAX_RETRIES),
+        retry=retry_if_exception_type(Exception),
+    ):
+        with retry_attempt:
+            # a cached answer that failed must not be served again
+            answer_obj = generate_json(
+                user_prompt=user_prompt,
+                refresh=retry_attempt.retry_state.attempt_number > 1,
+            )
+            # malformed answers are retried like any other failure
+            _check_answer(answer_obj)
+    # journaled as soon as it is known, so an interrupted run can resume here
+    if journal is not None:
+        journal.record(_record_key(user_prompt), answer_obj)
+    return answer_obj
+
+
+def _evaluate_records(
+    records: Iterable[tuple[Any, str]],
+    evaluate: Callable[[str], dict],
+    concurrency: int = 1,
+    output: Optional[OutputDispatcher] = None,
+) -> Iterator[tuple[Any, dict]]:
+    """Evaluate ``(index, prompt)`` records on up to ``concurrency`` threads.
+
+    Yields ``(index, answer)`` pairs as evaluations complete, which may differ
+    from the input order. At most twice ``concurrency`` records are submitted
+    ahead of the results being consumed. With an ``output``, the text streamed
+    while evaluating a record is attributed to its index.
+    """
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix=_COMMAND_NAME
+    ) as pool:
+        pending: dict[Future, Any] = {}
+        try:
+            for ix, user_prompt in records:
+                while len(pending) >= 2 * concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        yield pending.pop(f), f.result()
+                task = evaluate if output is None else output.scoped(ix, evaluate)
+                pending[pool.submit(task, user_prompt)] = ix
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield pending.pop(f), f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+
+
+def _pack_records(
+    records: Iterable[tuple[Any, str]], max_records: int, token_budget: int
+) -> Iterator[list[tuple[Any, str]]]:
+    """Group ``(index, prompt)`` records for multi-record prompts.
+
+    Each group holds at most ``max_records`` records whose prompts together
+    stay within ``token_budget`` estimated tokens. A record that exceeds the
+    budget on its own gets a group of its own.
+    """
+    group, tokens = [], 0
+    for ix, user_prompt in records:
+        record_tokens = estimate_tokens(user_prompt)
+        if group and (
+            len(group) >= max_records or tokens + record_tokens > token_budget
+        ):
+            yield group
+            group, tokens = [], 0
+        group.append((ix, user_prompt))
+        tokens += record_tokens
+    if group:
+        yield group
+
+
+def _multi_record_schema(record_schema: dict) -> dict:
+    item = {
+        **record_schema,
+        "properties": {"id": {"type": "string"}, **record_schema["properties"]},
+        "required": ["id", *record_schema.get("required", [])],
+    }
+    return {
+        "title": "selection",
+        "description": "selection answers of every record in the prompt",
+        "type": "object",
+        "properties": {"answers": {"type": "array", "items": item}},
+        "additionalProperties": False,
+        "required": ["answers"],
+    }
+
+
+def _multi_record_prompt(group: list[tuple[Any, str]]) -> str:
+    return (os.linesep * 2).join(
+        f"### Record {n}{os.linesep}{user_prompt}"
+        for n, (_, user_prompt) in enumerate(group, start=1)
+    )
+
+
+def _evaluate_group(
+    generate_multi: Callable[..., dict],
+    generate_json: Callable[..., dict],
+    group: list[tuple[Any, str]],
+    journal: Optional[CheckpointJournal] = None,
+) -> list[tuple[Any, dict]]:
+    """Evaluate a group of ``(index, prompt)`` records in one request.
+
+    Records whose answer is missing from the response or incomplete are
+    evaluated again one by one.
+    """
+    if len(group) == 1:
+        ix, user_prompt = group[0]
+        return [(ix, _evaluate_record(generate_json, user_prompt, journal))]
+
+    try:
+        response = generate_multi(user_prompt=_multi_record_prompt(group))
+        answers = {
+            str(item.get("id")): item
+            for item in response.get("answers", [])
+            if isinstance(item, dict)
+        }
+    except ValueError as err:
+        log.warning("multi-record prompt failed: %s", err)
+        answers = {}
+
+    results = []
+    for n, (ix, user_prompt) in enumerate(group, start=1):
+        answer_obj = answers.get(str(n), {})
+        answer_obj = {k: v for k, v in answer_obj.items() if k != "id"}
+        try:
+            _check_answer(answer_obj)
+        except ValueError as err:
+            log.info("evaluating record separately: %s", err)
+            results.append((ix, _evaluate_record(generate_json, user_prompt, journal)))
+            continue
+        if journal is not None:
+            journal.record(_record_key(user_prompt), answer_obj)
+        results.append((ix, answer_obj))
+    return results
+
+
+@dataclass
+class _CascadeStats:
+    screened: int = 0
+    included: int = 0
+    excluded: int = 0
+    escalated: int = 0
+    screening_seconds: float = 0.0
+    escalation_seconds: float = 0.0
+
+    def report(self, screening_model: str, model: str) -> None:
+        click.echo(
+            f"screening with {screening_model}: {self.screened} records in "
+            f"{self.screening_seconds:.1f}s, {self.included} included, "
+            f"{self.excluded} excluded; {self.escalated} escalated to {model} "
+            f"({self.escalation_seconds:.1f}s)",
+            err=True,
+        )
+
+
+def _is_confident(answer_obj: Optional[dict], threshold: float) -> bool:
+    confidence = (answer_obj or {}).get("confidence")
+    return isinstance(confidence, (int, float)) and confidence >= threshold
+
+
+def _screen_record(
+    evaluate: Callable[[str], dict], user_prompt: str
+) -> tuple[str, Optional[dict]]:
+    # a record the screening model can't answer is escalated rather than failed
+    try:
+        return user_prompt, evaluate(user_prompt)
+    except Exception as err:
+        log.warning("screening failed, escalating record: %s", err)
+        return user_prompt, None
+
+
+def _screen_records(
+    records: Iterable[tuple[Any, str]],
+    screen: Callable[[str], tuple[str, Optional[dict]]],
+    threshold: float,
+    journal: CheckpointJournal,
+    escalated: list[tuple[Any, str]],
+    stats: _CascadeStats,
+    concurrency: int = 1,
+    output: Optional[OutputDispatcher] = None,
+) -> Iterator[tuple[Any, dict]]:
+    """Screen ``(index, prompt)`` records with the screening model.
+
+    Yields ``(index, answer)`` pairs of the records screened with at least
+    ``threshold`` confidence. The other records are appended to ``escalated``.
+    """
+    for ix, (user_prompt, answer_obj) in _evaluate_records(
+        records, screen, concurrency, output
+    ):
+        stats.screened += 1
+        if not _is_confident(answer_obj, threshold):
+            escalated.append((ix, user_prompt))
+            continue
+        if answer_obj["answer"] == "include":
+            stats.included += 1
+        else:
+            stats.excluded += 1
+        journal.record(_record_key(user_prompt), answer_obj)
+        yield ix, answer_obj
+
+
+def _batch_answers(
+    generate_batch: Callable[..., Iterable[tuple[str, Any]]],
+    records: Iterable[tuple[Any, str]],
+    journal: CheckpointJournal,
+    unanswered: list[tuple[Any, str]],
+) -> Iterator[tuple[Any, dict]]:
+    """Evaluate ``(index, prompt)`` records in one provider-side batch.
+
+    Yields ``(index, answer)`` pairs once the batch has finished. Records the
+    batch left without a usable answer are appended to ``unanswered``.
+
+    The submitted batch is journaled with the keys of its records, so a
+    resumed run collects its answers rather than paying for it again.
+    """
+    indices: dict[str, list[Any]] = defaultdict(list)
+    prompts: dict[str, str] = {}
+    for ix, user_prompt in records:
+        key = _record_key(user_prompt)
+        indices[key].append(ix)
+        prompts[key] = user_prompt
+    if not prompts:
+        return
+
+    def _answers(batch_prompts: dict[str, str], **kwargs) -> Iterator[tuple[Any, dict]]:
+        for key, answer_obj in generate_batch(user_prompts=batch_prompts, **kwargs):
+            try:
+                if isinstance(answer_obj, Exception):
+                    raise answer_obj
+                _check_answer(answer_obj)
+            except ValueError as err:
+                log.warning("no usable batch answer, retrying record: %s", err)
+                unanswered.extend((ix, prompts[key]) for ix in indices[key])
+                continue
+            journal.record(key, answer_obj)
+            for ix in indices[key]:
+                yield ix, answer_obj
+
+    submitted = journal.get(_BATCH_JOURNAL_KEY)
+    if submitted is not None:
+        resumed = {k: prompts[k] for k in submitted["keys"] if k in prompts}
+        try:
+            # a failed batch raises before any answer is yielded
+            yield from _answers(resumed, submitted=submitted)
+        except BatchError as err:
+            log.warning("submitting again the records of a failed batch: %s", err)
+        else:
+            prompts = {k: v for k, v in prompts.items() if k not in resumed}
+    if prompts:
+        batch_keys = list(prompts)
+        yield from _answers(
+            prompts,
+            on_submitted=lambda batch: journal.record(
+                _BATCH_JOURNAL_KEY, {**batch, "keys": batch_keys}
+            ),
+        )
+
+
+def _criteria_text(rule_config: SelectionConfig) -> str:
+    lines = [rule_config.review_topic]
+    if rule_config.additional_context:
+        lines.append(rule_config.additional_context)
+    lines += [f"{c.label}: {c.description}" for c in rule_config.inclusion_criteria]
+    return os.linesep.join(lines)
+
+
+def _relevance(
+    embed: Callable[[list[str]], Any],
+    model: str,
+    records: list[tuple[Any, str]],
+    criteria_text: str,
+    cache: Optional[EmbeddingCache] = None,
+) -> list[float]:
+    """Return the embedding similarity of each record to the criteria."""
+    vectors = embed_texts(
+        embed,
+        model,
+        [user_prompt for _, user_prompt in records] + [criteria_text],
+        cache,
+    )
+    return cosine_similarity(vectors[:-1], vectors[-1]).tolist()
+
+
+def _rank_records(
+    records: list[tuple[Any, str]],
+    relevance: list[float],
+    auto_exclude_tail: float = 0.0,
+    most_relevant_first: bool = True,
+) -> tuple[list[tuple[Any, str]], list[tuple[Any, str]]]:
+    """Split records into those to evaluate and the least relevant tail.
+
+    The ``auto_exclude_tail`` fraction of least relevant records makes up the
+    tail. The other records keep their input order, or are sorted by
+    descending relevance if ``most_relevant_first`` is set.
+    """
+    order = sorted(range(len(records)), key=lambda i: relevance[i], reverse=True)
+    kept = len(records) - int(len(records) * auto_exclude_tail)
+    evaluated = order[:kept] if most_relevant_first else sorted(order[:kept])
+    return [records[i] for i in evaluated], [records[i] for i in order[kept:]]
+
+
+def _apply_answer(results_df: pd.DataFrame, ix: Any, answer_obj: dict) -> None:
+    status = answer_obj["answer"]
+    results_df.at[ix, INCLUDE_COL_NAME] = status
+    if status == "exclude":
+        results_df.at[ix, EXCLUDE_REASON_COL_NAME] = answer_obj["justification"]
+    elif status == "include":
+        results_df.at[ix, EXCLUDE_REASON_COL_NAME] = ""
 
 
 @click.command(_COMMAND_NAME)
@@ -71,9 +448,121 @@ _MAX_RETRIES = 3
     default=None,
     show_default=False,
 )
+@click.option(
+    "-j",
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="maximum number of records evaluated by the LLM at the same time",
+)
+@click.option(
+    "--batch",
+    is_flag=True,
+    default=False,
+    help=r"""submit the records to the provider's batch interface and wait for
+    the results instead of evaluating them one by one""",
+)
+@click.option(
+    "--batch-poll-seconds",
+    type=click.FloatRange(min=1),
+    default=60,
+    show_default=True,
+    help="how often the status of a submitted batch is checked",
+)
+@click.option(
+    "-k",
+    "--records-per-prompt",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help=r"""maximum number of records evaluated in a single LLM request; the
+    selection criteria are then sent once for all of them""",
+)
+@click.option(
+    "--prompt-token-budget",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PROMPT_TOKEN_BUDGET,
+    show_default=True,
+    help=r"""estimated tokens the records of a multi-record request may take
+    up; fewer records are packed into a request to stay within it""",
+)
+@click.option(
+    "--cascade",
+    is_flag=True,
+    default=False,
+    help=r"""screen every record with the assistant's --screening-model first
+    and evaluate only the records it is unsure about with --model""",
+)
+@click.option(
+    "--confidence-threshold",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_CONFIDENCE_THRESHOLD,
+    show_default=True,
+    help="minimum confidence of a screening answer accepted without escalation",
+)
+@click.option(
+    "--embedding-model",
+    type=click.STRING,
+    default=None,
+    help=r"""an Ollama embedding model used to rank records by similarity to
+    the selection criteria before any LLM request""",
+)
+@click.option(
+    "--embedding-api-key",
+    type=click.STRING,
+    default=None,
+    envvar="MWF_ASSISTANT_EMBEDDING_API_KEY",
+    help="API key of the Ollama endpoint serving --embedding-model",
+)
+@click.option(
+    "--embedding-cache",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help=r"""NumPy file caching record embeddings, which can be shared between
+    runs and inputs [default: next to the output workbook]""",
+)
+@click.option(
+    "--relevance-order/--input-order",
+    default=True,
+    show_default=True,
+    help="with --embedding-model, evaluate the most relevant records first",
+)
+@click.option(
+    "--auto-exclude-tail",
+    type=click.FloatRange(min=0, max=1, max_open=True),
+    default=0.0,
+    show_default=True,
+    help=r"""with --embedding-model, exclude this fraction of least relevant
+    records without asking the LLM""",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=True,
+    show_default=True,
+    help="reuse the answers journaled by an interrupted run with the same settings",
+)
 @click.pass_context
 def study_selection(
-    ctx, search_results, config_file, limit, ignore_attributes, sheet_name
+    ctx,
+    search_results,
+    config_file,
+    limit,
+    ignore_attributes,
+    sheet_name,
+    concurrency,
+    batch,
+    batch_poll_seconds,
+    records_per_prompt,
+    prompt_token_budget,
+    cascade,
+    confidence_threshold,
+    embedding_model,
+    embedding_api_key,
+    embedding_cache,
+    relevance_order,
+    auto_exclude_tail,
+    resume,
 ):
     """Use an LLM to select primary studies according to criteria.
 
@@ -98,65 +587,209 @@ def study_selection(
     except ConfigValidationError as err:
         raise click.UsageError(str(err))
 
+    output = ctx.with_resource(
+        OutputDispatcher(ctx.obj.output_mode, ctx.obj.output_file)
+    )
     provider = ctx.obj.provider_factory(
         on_error=make_stderr_callback(logger),
-        on_thinking=make_thinking_callback(),
-        on_text=write_stdout,
+        on_thinking=output.on_thinking,
+        on_text=output.on_text,
     )
+    if batch and not provider.supports_batches:
+        raise click.UsageError(
+            "the selected provider and model don't support batch mode"
+        )
+    if cascade and ctx.obj.screening_provider_factory is None:
+        raise click.UsageError("cascade mode needs a --screening-model")
     if not provider.ensure_model():
         exit(1)
+    screening_provider = None
+    if cascade:
+        screening_provider = ctx.obj.screening_provider_factory(
+            on_error=make_stderr_callback(logger),
+            on_thinking=output.on_thinking,
+            on_text=output.on_text,
+        )
+        if not screening_provider.ensure_model():
+            exit(1)
 
     json_generator = provider.new_json_generator()
     expected_json_schema = SelectionResponse.model_json_schema()
-    generate_json = partial(
-        json_generator.generate_json,
+    request = dict(
         system_prompt_template=load_template(SYSTEM_PROMPT_TEMPLATE),
         template_data=rule_config.model_dump(),
         response_schema=expected_json_schema,
     )
-
-    count = len(results_df) if limit is None else limit
-    non_evaluated_records = results_df[results_df["include"].isna()]
-    items = islice(non_evaluated_records.iterrows(), 0, count)
-
-    with click.progressbar(
-        items,
-        length=count,
-        label="processing search results",
-        fill_char=click.style("#", fg="green"),
-        empty_char=click.style("-", fg="white", dim=True),
-    ) as df_rows:
-        for ix, row in df_rows:
-            for retry_attempt in Retrying(
-                wait=wait_exponential(multiplier=2, max=4),
-                stop=stop_after_attempt(_MAX_RETRIES),
-                retry=retry_if_exception_type(Exception),
-            ):
-                with retry_attempt:
-                    row_str = os.linesep.join(
-                        f"{key}: {value}"
-                        for key, value in row.items()
-                        if key not in ignored_attrs
-                    )
-                    logger.info(
-                        "evaluating record %d /%d", ix + 1, len(non_evaluated_records)
-                    )
-                    answer_obj = generate_json(user_prompt=row_str)
-                    status = answer_obj["answer"]
-                    results_df.at[ix, "include"] = status
-
-                    if status == "exclude":
-                        results_df.at[ix, "exclude_reason"] = answer_obj[
-                            "justification"
-                        ]
-                    elif status == "include":
-                        results_df.at[ix, "exclude_reason"] = ""
-                    sleep(1)
+    generate_json = partial(json_generator.generate_json, **request)
 
     model_stem = ctx.obj.model_choice.replace(":", "_")
     output_path = (
         search_results_path.parent / f"{search_results_path.stem}-{model_stem}.xlsx"
     )
+    journal = CheckpointJournal(
+        output_path.with_suffix(".journal.jsonl"),
+        fingerprint(
+            _COMMAND_NAME,
+            ctx.obj.model_choice,
+            rule_config.model_dump(),
+            SYSTEM_PROMPT_TEMPLATE.read_text(),
+            expected_json_schema,
+            # screening answers are final above the threshold
+            [ctx.obj.screening_model_choice, confidence_threshold] if cascade else None,
+            [embedding_model, auto_exclude_tail] if auto_exclude_tail else None,
+            (
+                [
+                    MULTI_RECORD_PROMPT_TEMPLATE.read_text(),
+                    records_per_prompt,
+                    prompt_token_budget,
+                ]
+                if records_per_prompt > 1
+                else None
+            ),
+        ),
+        resume,
+    )
+
+    evaluate = partial(_evaluate_record, generate_json, journal=journal)
+    if records_per_prompt > 1:
+        generate_multi = partial(
+            json_generator.generate_json,
+            system_prompt_template=load_template(MULTI_RECORD_PROMPT_TEMPLATE),
+            template_data=rule_config.model_dump(),
+            response_schema=_multi_record_schema(expected_json_schema),
+        )
+        evaluate = partial(
+            _evaluate_group, generate_multi, generate_json, journal=journal
+        )
+
+    non_evaluated_records = results_df[results_df[INCLUDE_COL_NAME].isna()]
+    auto_excluded = []
+    if embedding_model is None:
+        count = len(non_evaluated_records)
+        if limit is not None:
+            count = min(count, limit)
+        records = (
+            (ix, _record_prompt(row, ignored_attrs))
+            for ix, row in islice(non_evaluated_records.iterrows(), 0, count)
+        )
+    else:
+        records = [
+            (ix, _record_prompt(row, ignored_attrs))
+            for ix, row in non_evaluated_records.iterrows()
+        ]
+        cache = EmbeddingCache(
+            embedding_cache or output_path.with_suffix(".embeddings.npz")
+        )
+        try:
+            relevance = _relevance(
+                # --api-key belongs to the LLM provider, which may not be Ollama
+                OllamaEmbedder(
+                    embedding_model, ctx.obj.ollama_endpoint, embedding_api_key
+                ),
+                embedding_model,
+                records,
+                _criteria_text(rule_config),
+                cache,
+            )
+        except Exception as err:
+            raise click.ClickException(f"embedding the records failed: {err}")
+        finally:
+            cache.save()
+        results_df.loc[[ix for ix, _ in records], RELEVANCE_COL_NAME] = relevance
+        records, auto_excluded = _rank_records(
+            records, relevance, auto_exclude_tail, relevance_order
+        )
+        # the limit applies to the records evaluated by the LLM
+        records = records[:limit]
+        count = len(records) + len(auto_excluded)
+
+    # answers are written to their own row as they complete, so the output
+    # doesn't depend on the order in which concurrent requests finish
+    with (
+        journal,
+        click.progressbar(
+            length=count,
+            label="processing search results",
+            fill_char=click.style("#", fg="green"),
+            empty_char=click.style("-", fg="white", dim=True),
+        ) as progress,
+    ):
+
+        def _resumed(ix, answer_obj):
+            _apply_answer(results_df, ix, answer_obj)
+            progress.update(1)
+
+        for ix, user_prompt in _resumed_records(auto_excluded, journal, _resumed):
+            answer_obj = {"answer": "exclude", "justification": AUTO_EXCLUDE_REASON}
+            journal.record(_record_key(user_prompt), answer_obj)
+            _apply_answer(results_df, ix, answer_obj)
+            progress.update(1)
+
+        pending = _resumed_records(records, journal, _resumed)
+        if cascade:
+            stats = _CascadeStats()
+            escalated = []
+            screen_json = partial(
+                screening_provider.new_json_generator().generate_json, **request
+            )
+            started = time.monotonic()
+            for ix, answer_obj in _screen_records(
+                pending,
+                partial(_screen_record, partial(_evaluate_record, screen_json)),
+                confidence_threshold,
+                journal,
+                escalated,
+                stats,
+                concurrency,
+                output,
+            ):
+                _apply_answer(results_df, ix, answer_obj)
+                progress.update(1)
+            stats.screening_seconds = time.monotonic() - started
+            stats.escalated = len(escalated)
+            pending = escalated
+            started = time.monotonic()
+
+        if batch:
+            unanswered = []
+            generate_batch = partial(
+                provider.generate_json_batch, poll_seconds=batch_poll_seconds, **request
+            )
+            try:
+                for ix, answer_obj in _batch_answers(
+                    generate_batch, pending, journal, unanswered
+                ):
+                    _apply_answer(results_df, ix, answer_obj)
+                    progress.update(1)
+            except BatchError as err:
+                raise click.ClickException(str(err))
+            # records without a usable batch answer are asked again one by one
+            pending = unanswered
+
+        if records_per_prompt > 1:
+            # each group is evaluated as one item, so groups run concurrently
+            groups = _pack_records(pending, records_per_prompt, prompt_token_budget)
+            # a group's answers are attributed to the indexes of its records
+            labelled = ((", ".join(str(ix) for ix, _ in g), g) for g in groups)
+            evaluated = (
+                answer
+                for _, answers in _evaluate_records(
+                    labelled, evaluate, concurrency, output
+                )
+                for answer in answers
+            )
+        else:
+            evaluated = _evaluate_records(pending, evaluate, concurrency, output)
+        for ix, answer_obj in evaluated:
+            logger.info("evaluated record %d /%d", ix + 1, len(non_evaluated_records))
+            _apply_answer(results_df, ix, answer_obj)
+            progress.update(1)
+
+    # the streamed answers are written before the summary
+    output.close()
+    if cascade:
+        stats.escalation_seconds = time.monotonic() - started
+        stats.report(ctx.obj.screening_model_choice, ctx.obj.model_choice)
     results_df.to_excel(output_path, index=False)
     click.echo(
         f"saved results to {click.style(output_path, bold=True)}", color=True, err=False
@@ -1,25 +1,22 @@
+import contextvars
+import json
 import logging
-from typing import Callable
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional, TextIO
 
 import click
 
+from mapwisefox.assistant.config import OutputMode
 
-def write_stdout(msg: str, *args) -> None:
-    output_text = msg % args if args else msg
-    click.echo(output_text, nl=False)
-
-
-def make_thinking_callback() -> Callable[[str], None]:
-    wrote_label = False
-
-    def _(msg: str) -> None:
-        nonlocal wrote_label
-        if not wrote_label:
-            click.secho("Thinking ... ", nl=True, color=True, fg="blue", italic=True)
-        click.secho(msg, nl=False, color=True, fg="blue", italic=True)
-        wrote_label = True
-
-    return _
+# the record whose LLM requests are running in the current thread or task
+_current_record: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_record", default=None
+)
+_Event = tuple[str, Optional[str], str, float]
 
 
 def make_stderr_callback(logger: logging.Logger) -> Callable[[str, Exception], None]:
@@ -27,3 +24,153 @@ def make_stderr_callback(logger: logging.Logger) -> Callable[[str, Exception], N
         logger.error(msg, exc_info=err)
 
     return _
+
+
+def _coalesce(events: list[_Event]) -> Iterator[_Event]:
+    """Merge adjacent text fragments of the same kind and record."""
+    merged = None
+    for event in events:
+        kind, record, text, _ = event
+        if (
+            merged is not None
+            and kind in {"text", "thinking"}
+            and merged[:2] == (kind, record)
+        ):
+            merged = (kind, record, merged[2] + text, merged[3])
+            continue
+        if merged is not None:
+            yield merged
+        merged = event
+    if merged is not None:
+        yield merged
+
+
+class OutputDispatcher:
+    """Writes the text streamed by LLM requests from a background thread.
+
+    The callbacks only queue text, so console output never slows requests
+    down. The writer takes everything queued since its last write and writes
+    it at once, formatted according to ``mode``:
+
+    - ``stream`` writes answers and thinking as they arrive;
+    - ``aggregated`` writes each record's answer once the record is done;
+    - ``jsonl`` writes one JSON event per line;
+    - ``quiet`` writes nothing.
+
+    Requests run inside :meth:`record` are attributed to that record.
+    """
+
+    MAX_BATCH = 1024
+
+    def __init__(
+        self, mode: OutputMode = OutputMode.stream, file: Optional[TextIO] = None
+    ) -> None:
+        self.__mode = mode
+        self.__file = file
+        self.__queue: queue.SimpleQueue[Optional[_Event]] = queue.SimpleQueue()
+        self.__answers: dict[Optional[str], list[str]] = {}
+        self.__wrote_thinking_label = False
+        self.__thread = None
+        if mode != OutputMode.quiet:
+            self.__thread = threading.Thread(
+                target=self.__run, name="llm-output", daemon=True
+            )
+            self.__thread.start()
+
+    def __enter__(self) -> "OutputDispatcher":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __put(self, kind: str, text: str = "") -> None:
+        if self.__thread is not None:
+            self.__queue.put((kind, _current_record.get(), text, time.time()))
+
+    def on_text(self, msg: str, *args) -> None:
+        self.__put("text", msg % args if args else msg)
+
+    def on_thinking(self, msg: str) -> None:
+        self.__put("thinking", msg)
+
+    @contextmanager
+    def record(self, label: Any) -> Iterator[None]:
+        token = _current_record.set(str(label))
+        self.__put("record_start")
+        try:
+            yield
+        finally:
+            self.__put("record_end")
+            _current_record.reset(token)
+
+    def scoped(self, label: Any, fn: Callable) -> Callable:
+        """Return ``fn`` wrapped to run inside :meth:`record`."""
+
+        @wraps(fn)
+        def _(*args, **kwargs):
+            with self.record(label):
+                return fn(*args, **kwargs)
+
+        return _
+
+    def close(self) -> None:
+        """Write everything queued so far and stop the writer thread."""
+        if self.__thread is None:
+            return
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+    def __drain(self) -> tuple[list[_Event], bool]:
+        events = [self.__queue.get()]
+        while len(events) < self.MAX_BATCH:
+            try:
+                events.append(self.__queue.get_nowait())
+            except queue.Empty:
+                break
+        if None in events:
+            return events[: events.index(None)], True
+        return events, False
+
+    def __run(self) -> None:
+        closed = False
+        while not closed:
+            events, closed = self.__drain()
+            chunks = [self.__format(event) for event in _coalesce(events)]
+            if closed and self.__mode == OutputMode.aggregated:
+                # answers streamed outside of a finished record
+                chunks.extend(self.__answer(r) for r in list(self.__answers))
+            if output := "".join(chunks):
+                click.echo(output, file=self.__file, nl=False)
+
+    def __answer(self, record: Optional[str]) -> str:
+        answer = "".join(self.__answers.pop(record, [])).strip()
+        if not answer:
+            return ""
+        if record is None:
+            return f"{answer}\n"
+        return f"{click.style(f'[{record}]', bold=True)} {answer}\n"
+
+    def __format(self, event: _Event) -> str:
+        kind, record, text, timestamp = event
+        if self.__mode == OutputMode.jsonl:
+            obj = {"time": timestamp, "event": kind, "record": record}
+            if kind in {"text", "thinking"}:
+                obj["text"] = text
+            return json.dumps(obj) + "\n"
+        if self.__mode == OutputMode.aggregated:
+            if kind == "text":
+                self.__answers.setdefault(record, []).append(text)
+            elif kind == "record_end":
+                return self.__answer(record)
+            return ""
+        if kind == "text":
+            return text
+        if kind != "thinking":
+            return ""
+        thinking = click.style(text, fg="blue", italic=True)
+        if not self.__wrote_thinking_label:
+            self.__wrote_thinking_label = True
+            label = click.style("Thinking ... ", fg="blue", italic=True)
+            return f"{label}\n{thinking}"
+        return thinking
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+from mapwisefox.assistant.tools.extras import try_import
+from mapwisefox.assistant.tools.logging import get_logger
+
+if TYPE_CHECKING:
+    import ollama
+
+log = get_logger("embeddings")
+DEFAULT_BATCH_SIZE = 64
+
+Embedder = Callable[[list[str]], Sequence[Sequence[float]]]
+
+
+class OllamaEmbedder:
+    """Embeds texts with an embedding model served by Ollama."""
+
+    def __init__(
+        self, model: str, ollama_host: str, api_key: Optional[str] = None
+    ) -> None:
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.__client: "ollama.Client" = try_import("ollama").Client(
+            host=ollama_host, headers=headers
+        )
+        self.__model = model
+
+    @property
+    def model(self) -> str:
+        return self.__model
+
+    def __call__(self, texts: list[str]) -> Sequence[Sequence[float]]:
+        return self.__client.embed(model=self.__model, input=texts).embeddings
+
+
+class EmbeddingCache:
+    """Vectors of embedded texts, stored in a NumPy ``.npz`` file.
+
+    Vectors are keyed on a digest of the embedding model and the text, so a
+    rerun, a different input file or new criteria reuse every text embedded
+    before. The file is rewritten atomically by :meth:`save`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.__path = Path(path)
+        self.__lock = threading.Lock()
+        self.__vectors: dict[str, np.ndarray] = self.__load()
+        self.__dirty = False
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+    def __load(self) -> dict[str, np.ndarray]:
+        try:
+            with np.load(self.__path) as data:
+                return dict(zip(data["keys"].tolist(), data["vectors"]))
+        except FileNotFoundError:
+            return {}
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as err:
+            log.warning("ignoring unreadable embedding cache %s: %s", self.__path, err)
+            return {}
+
+    def __len__(self) -> int:
+        return len(self.__vectors)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.__lock:
+            return self.__vectors.get(key)
+
+    def put(self, key: str, vector: Sequence[float]) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self.__lock:
+            cached = next(iter(self.__vectors.values()), None)
+            if cached is not None and cached.shape != vector.shape:
+                # a model with differently sized vectors replaces the old one
+                log.warning("dropping cached embeddings of another model")
+                self.__vectors.clear()
+            self.__vectors[key] = vector
+            self.__dirty = True
+
+    def save(self) -> None:
+        with self.__lock:
+            if not self.__dirty:
+                return
+            keys = list(self.__vectors)
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=self.__path.parent, suffix=".part.npz", delete=False
+            ) as f:
+                np.savez(
+                    f,
+                    keys=np.array(keys, dtype=str),
+                    vectors=np.stack([self.__vectors[k] for k in keys]),
+                )
+            os.replace(f.name, self.__path)
+            self.__dirty = False
+
+
+def embed_texts(
+    embed: Embedder,
+    model: str,
+    texts: list[str],
+    cache: Optional[EmbeddingCache] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> np.ndarray:
+    """Return one row vector per text, embedding only texts missing from ``cache``.
+
+    Missing texts are sent to ``embed`` in batches of up to ``batch_size``.
+    """
+    keys = [EmbeddingCache.key(model, text) for text in texts]
+    vectors: dict[str, np.ndarray] = {}
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if cache is not None and (vector := cache.get(key)) is not None:
+            vectors[key] = vector
+        else:
+            missing[key] = text
+
+    missing_keys = list(missing)
+    for start in range(0, len(missing_keys), batch_size):
+        batch = missing_keys[start : start + batch_size]
+        embedded = embed([missing[key] for key in batch])
+        for key, vector in zip(batch, embedded, strict=True):
+            vectors[key] = np.asarray(vector, dtype=np.float32)
+            if cache is not None:
+                cache.put(key, vector)
+    log.info(
+        "embedded %d texts, %d from the cache", len(texts), len(texts) - len(missing)
+    )
+    return np.stack([vectors[key] for key in keys]) if keys else np.empty((0, 0))
+
+
+def cosine_similarity(vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Return the cosine similarity of each row of ``vectors`` to ``query``."""
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+    return np.divide(
+        vectors @ query, norms, out=np.zeros(len(vectors)), where=norms > 0
+    )
@@ -1,14 +1,104 @@
 import hashlib
 import os
+import queue
 import re
+import sqlite3
+import tempfile
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlsplit
 from urllib.request import url2pathname
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from mapwisefox.assistant.tools.urlparse import UrlInfo
 
 
+class _CacheIndex:
+    """Size, modification time and SHA-256 of every file downloaded to a cache.
+
+    Entries are recorded when a download completes, so a later cache hit can
+    be validated with a single ``stat`` call instead of re-hashing the file.
+    Each entry is one row of an SQLite table, so recording a download doesn't
+    rewrite the index and processes sharing the cache keep each other's rows.
+    """
+
+    FILE_NAME = ".index.sqlite3"
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.__path = cache_dir / self.FILE_NAME
+        self.__lock = threading.Lock()
+        self.__db: sqlite3.Connection | None = None
+
+    def __connection(self) -> sqlite3.Connection:
+        if self.__db is None:
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            self.__db = sqlite3.connect(self.__path, check_same_thread=False)
+            self.__db.execute(
+                """CREATE TABLE IF NOT EXISTS downloads (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL
+                )"""
+            )
+            self.__db.commit()
+        return self.__db
+
+    def record(self, file_path: Path, sha256: str) -> None:
+        stat = file_path.stat()
+        with self.__lock:
+            db = self.__connection()
+            db.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?)",
+                (file_path.name, stat.st_size, stat.st_mtime_ns, sha256),
+            )
+            db.commit()
+
+    def sha256(self, file_path: Path) -> str | None:
+        """Return the recorded hash if ``file_path`` is unchanged since then."""
+        with self.__lock:
+            # looking up an empty cache doesn't create it
+            if self.__db is None and not self.__path.exists():
+                return None
+            entry = (
+                self.__connection()
+                .execute(
+                    "SELECT size, mtime_ns, sha256 FROM downloads WHERE name = ?",
+                    (file_path.name,),
+                )
+                .fetchone()
+            )
+        if entry is None:
+            return None
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != entry[:2]:
+            return None
+        return entry[2]
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+
+def _hash_file(file_path: Path, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class FileProvider:
     __FILENAME_RE = re.compile(r"filename=(.+)\b")
 
@@ -18,15 +108,33 @@ class FileProvider:
         chunk_size: int = 16384,
         timeout: int = 60,
         verify_tls: bool = True,
+        max_workers: int = 8,
+        max_per_host: int = 2,
+        verify_cache: bool = False,
     ) -> None:
         if cache_dir.exists() and not cache_dir.is_dir():
             raise ValueError(f"{cache_dir} exists and is not a directory")
         self.__cache_dir = Path(cache_dir).resolve()
-        self.__session = requests.Session()
+        self.__session = self.__new_session(max_workers)
         self.__cookie_jar = {}
         self.__chunk_size = chunk_size
         self.__timeout = timeout
         self.__verify_tls = verify_tls
+        self.__verify_cache = verify_cache
+        self.__index = _CacheIndex(self.__cache_dir)
+        self.__max_workers = max(1, max_workers)
+        self.__max_per_host = max(1, max_per_host)
+
+    @staticmethod
+    def __new_session(max_workers: int) -> requests.Session:
+        # one keep-alive pool per host, large enough for every download worker
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max(1, max_workers), pool_maxsize=max(1, max_workers)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
 
     @staticmethod
     def __local_filename(download_url: str) -> str:
@@ -36,21 +144,42 @@ class FileProvider:
         md5 = hashlib.md5(download_url.encode()).hexdigest()
         return f"{name}-{md5}.pdf"
 
-    def __download(self, url: str) -> Path:
+    def __is_cached(self, file_path: Path, file_hash_path: Path) -> bool:
+        if (indexed_hash := self.__index.sha256(file_path)) is not None:
+            if not self.__verify_cache:
+                return True
+            return _hash_file(file_path, self.__chunk_size) == indexed_hash
+
+        # files downloaded before the index existed only have a hash sidecar;
+        # verify them once and index them, so later runs skip the content read
+        if not (file_path.exists() and file_hash_path.exists()):
+            return False
+        with open(file_hash_path) as precomputed_hash:
+            expected_hash = precomputed_hash.readline().strip()
+        if _hash_file(file_path, self.__chunk_size) != expected_hash:
+            return False
+        self.__index.record(file_path, expected_hash)
+        return True
+
+    def __cache_paths(self, url: str) -> tuple[Path, Path]:
         local_filename = self.__local_filename(url)
-        file_path = self.__cache_dir / local_filename
-        file_hash_path = self.__cache_dir / f"{local_filename}.sha256"
-
-        should_download = True
-        if file_path.exists() and file_hash_path.exists():
-            with open(file_hash_path) as precomputed_hash:
-                hash1 = precomputed_hash.readline()
-            with open(file_path, "rb") as pdf:
-                hash2 = hashlib.sha256(pdf.read()).hexdigest()
-            should_download = hash1 != hash2
-        if not should_download:
-            return file_path
+        return (
+            self.__cache_dir / local_filename,
+            self.__cache_dir / f"{local_filename}.sha256",
+        )
 
+    def __local_path(self, url: str) -> Optional[Path]:
+        """Return the local path of ``url`` if fetching it needs no download."""
+        info = UrlInfo(url)
+        if info.scheme == "file":
+            return info.local_path
+        if info.scheme not in {"http", "https"}:
+            raise ValueError(f"URL scheme {info.scheme!r} is not supported")
+        file_path, file_hash_path = self.__cache_paths(url)
+        return file_path if self.__is_cached(file_path, file_hash_path) else None
+
+    def __download(self, url: str) -> Path:
+        file_path, file_hash_path = self.__cache_paths(url)
         with self.__session.get(
             url,
             verify=self.__verify_tls,
@@ -64,21 +193,97 @@ class FileProvider:
                 raise ValueError(f"can't handle content type {content_type!r}")
 
             self.__cache_dir.mkdir(parents=True, exist_ok=True)
-            with open(file_path, "wb+") as pdf:
-                for chunk in res.iter_content(chunk_size=self.__chunk_size):
-                    pdf.write(chunk)
-                pdf.seek(0, os.SEEK_SET)
-                new_hash = hashlib.sha256(pdf.read())
+            # stream into a private temporary file, so concurrent downloads of
+            # the same URL never observe (or leave behind) a partial PDF
+            with tempfile.NamedTemporaryFile(
+                "wb+", dir=self.__cache_dir, suffix=".part", delete=False
+            ) as pdf:
+                new_hash = hashlib.sha256()
+                try:
+                    for chunk in res.iter_content(chunk_size=self.__chunk_size):
+                        pdf.write(chunk)
+                        new_hash.update(chunk)
+                except BaseException:
+                    pdf.close()
+                    os.unlink(pdf.name)
+                    raise
+            os.replace(pdf.name, file_path)
             with open(file_hash_path, "w") as f:
                 f.write(new_hash.hexdigest())
+            self.__index.record(file_path, new_hash.hexdigest())
 
         return file_path
 
     def __call__(self, url: str) -> Path:
-        info = UrlInfo(url)
-        if info.scheme in {"http", "https"}:
-            return self.__download(url)
-        elif info.scheme == "file":
-            return info.local_path
-        else:
-            raise ValueError(f"URL scheme {info.scheme!r} is not supported")
+        if (local_path := self.__local_path(url)) is not None:
+            return local_path
+        return self.__download(url)
+
+    def close(self) -> None:
+        self.__index.close()
+        self.__session.close()
+
+    def fetch_many(self, urls: Iterable[str]) -> Iterator[tuple[str, Path | Exception]]:
+        """Fetch several URLs in parallel, yielding results as they complete.
+
+        Downloads run on a pool of ``max_workers`` threads sharing this
+        provider's keep-alive connection pool, with at most ``max_per_host``
+        concurrent downloads from the same host. Each distinct URL is fetched
+        once, and is yielded together with either its local path or the
+        exception that prevented fetching it.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return
+        results: queue.SimpleQueue = queue.SimpleQueue()
+        # the cache is checked first; downloads wait in a queue per host, so
+        # no worker is kept waiting for a host while other hosts have work
+        waiting: dict[str, deque[str]] = defaultdict(deque)
+        downloading: dict[str, int] = defaultdict(int)
+        submitted: set[Future] = set()
+        lock = threading.RLock()
+        closed = False
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.__max_workers, len(unique_urls)),
+            thread_name_prefix="file-provider",
+        ) as pool:
+
+            def _submit(url: str, download: bool) -> None:
+                f = pool.submit(self.__download if download else self.__local_path, url)
+                submitted.add(f)
+                f.add_done_callback(partial(_done, url, download))
+
+            def _done(url: str, downloaded: bool, f: Future) -> None:
+                host = urlsplit(url).netloc
+                with lock:
+                    submitted.discard(f)
+                    if closed:
+                        return
+                    if downloaded:
+                        downloading[host] -= 1
+                    try:
+                        local_path = f.result()
+                    except Exception as exc:
+                        results.put((url, exc))
+                    else:
+                        if local_path is None:
+                            waiting[host].append(url)
+                        else:
+                            results.put((url, local_path))
+                    while waiting[host] and downloading[host] < self.__max_per_host:
+                        downloading[host] += 1
+                        _submit(waiting[host].popleft(), download=True)
+
+            with lock:
+                for url in unique_urls:
+                    _submit(url, download=False)
+            try:
+                for _ in unique_urls:
+                    yield results.get()
+            finally:
+                with lock:
+                    closed = True
+                    pending = list(submitted)
+                for f in pending:
+                    f.cancel()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, IO, Optional
+
+from mapwisefox.assistant.tools.logging import get_logger
+
+_FORMAT_VERSION = 1
+log = get_logger("journal")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Return a digest identifying the settings ``parts`` of a run."""
+    material = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class CheckpointJournal:
+    """Append-only record of completed work, used to resume interrupted runs.
+
+    Each completed item is appended to a JSON Lines file and flushed to disk
+    before :meth:`record` returns, so a crash loses at most the item being
+    written. The first line holds a fingerprint of the run's settings; a
+    journal left by a run with different settings is started over instead of
+    resumed.
+    """
+
+    def __init__(self, path: Path, run_fingerprint: str, resume: bool = True) -> None:
+        self.__path = Path(path)
+        self.__fingerprint = run_fingerprint
+        self.__lock = threading.Lock()
+        self.__file: Optional[IO[str]] = None
+        self.__entries: dict[str, Any] = self.__load() if resume else {}
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def __load(self) -> dict[str, Any]:
+        try:
+            with open(self.__path, encoding="utf-8") as f:
+                header = self.__parse(f.readline())
+                if header != {
+                    "version": _FORMAT_VERSION,
+                    "fingerprint": self.__fingerprint,
+                }:
+                    log.warning(
+                        "starting over: %s was written with different settings",
+                        self.__path,
+                    )
+                    return {}
+                entries = {}
+                for line in f:
+                    # an interrupted write leaves a partial last line behind
+                    if (entry := self.__parse(line)) is not None:
+                        entries[entry["key"]] = entry["value"]
+                return entries
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def __parse(line: str) -> Optional[dict]:
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return None
+        return obj if isinstance(obj, dict) else None
+
+    def __open(self) -> IO[str]:
+        # rewrite the resumed entries first, which drops any partial line and
+        # any stale journal, then keep appending to the new file
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=self.__path.parent,
+            suffix=".part",
+            delete=False,
+            encoding="utf-8",
+        ) as f:
+            header = {"version": _FORMAT_VERSION, "fingerprint": self.__fingerprint}
+            f.write(json.dumps(header) + "\n")
+            for key, value in self.__entries.items():
+                f.write(json.dumps({"key": key, "value": value}) + "\n")
+        os.replace(f.name, self.__path)
+        return open(self.__path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.__entries.get(key, default)
+
+    def record(self, key: str, value: Any) -> None:
+        line = json.dumps({"key": key, "value": value}) + "\n"
+        with self.__lock:
+            if self.__file is None:
+                self.__file = self.__open()
+            self.__file.write(line)
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__entries[key] = value
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
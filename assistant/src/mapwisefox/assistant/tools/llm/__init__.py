@@ -1,5 +1,9 @@
 from ._types import ErrorCallback, TextCallback
-from ._provider import LLMProviderBase, JSONGenerator
+from ._rate_limit import RateLimiter, estimate_tokens, is_throttling_error
+from ._cache import ResponseCache
+from ._usage import TokenUsage
+from ._batch import BatchError, BatchRequest, BatchStatus
+from ._provider import BatchProviderMixin, LLMProviderBase, JSONGenerator
 from ._ollama import OllamaProvider, OllamaJSONGenerator
 from ._openai import OpenAIProvider, OpenAIJSONGenerator
 from ._anthropic import AnthropicProvider, AnthropicJSONGenerator
@@ -8,6 +12,15 @@ from ._bedrock import BedrockProvider, BedrockJSONGenerator
 
 __all__ = [
     "LLMProviderBase",
+    "BatchProviderMixin",
+    "RateLimiter",
+    "ResponseCache",
+    "TokenUsage",
+    "BatchError",
+    "BatchRequest",
+    "BatchStatus",
+    "is_throttling_error",
+    "estimate_tokens",
     "OllamaProvider",
     "OpenAIProvider",
     "JSONGenerator",
@@ -1,17 +1,29 @@
 import io
-import time
-from typing import Optional, TYPE_CHECKING, Any
+from typing import Callable, Iterator, Optional, TYPE_CHECKING, Any
 
 from pydantic import create_model
 
 from mapwisefox.assistant.tools.extras import try_import
-from mapwisefox.assistant.tools.llm._provider import LLMProviderBase, JSONGenerator
+from mapwisefox.assistant.tools.llm._batch import BatchRequest, BatchStatus
+from mapwisefox.assistant.tools.llm._provider import (
+    BatchProviderMixin,
+    JSONGenerator,
+    LLMProviderBase,
+)
 
 if TYPE_CHECKING:
     import anthropic
     import anthropic.types.beta as beta
 
 
+def _prompt_tokens(usage: "beta.BetaUsage") -> tuple[int, int]:
+    """Return the prompt tokens of a request and those read from the cache."""
+    # input_tokens only counts the tokens after the last cache breakpoint
+    cached = usage.cache_read_input_tokens or 0
+    written = usage.cache_creation_input_tokens or 0
+    return usage.input_tokens + cached + written, cached
+
+
 class AnthropicJSONGenerator(JSONGenerator):
     def __new__(cls, *args, **kwargs):
         proto = object.__new__(cls)
@@ -38,8 +50,15 @@ class AnthropicJSONGenerator(JSONGenerator):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client = client
+        self.__async_client: "Callable[[], anthropic.AsyncAnthropic] | None" = (
+            kwargs.pop("async_client", None)
+        )
         self.__model_name = model_name
         self.__max_retries = max_retries
         self.__thinking = self._new_thinking_obj(thinking)
@@ -86,45 +105,87 @@ class AnthropicJSONGenerator(JSONGenerator):
             return None
         return self._json_schema_to_pydantic(response_format)
 
-    def _generate_text(
-        self, system_prompt: str, user_prompt: str, response_format: str | dict
-    ) -> str:
-        time.sleep(5)
-        anthropic_output_format = self._new_output_format_obj(response_format)
-        max_tokens = 2050 if self.__thinking else 1024
-        prompt = self._BetaMessageParam(
-            role="user",
-            content="\n".join([system_prompt, user_prompt]),
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(model={self.__model_name!r}, "
+            f"thinking={self.__thinking!r})"
         )
-        with self.__client.beta.messages.stream(
+
+    def __stream_args(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> dict:
+        prompt = self._BetaMessageParam(role="user", content=user_prompt)
+        # the system prompt is repeated verbatim by the requests of a run, so
+        # Anthropic serves it from its prompt cache after the first request
+        system = [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        return dict(
             model=self.__model_name,
-            max_tokens=max_tokens,
+            max_tokens=2050 if self.__thinking else 1024,
             betas=["structured-outputs-2025-11-13"],
+            system=system,
             messages=[prompt],
-            output_format=anthropic_output_format,
+            output_format=self._new_output_format_obj(response_format),
             thinking=self.__thinking,
+        )
+
+    def __handle_event(self, buf: io.StringIO, event, thoughts: bool) -> bool:
+        if event.type == "message_start":
+            self._record_usage(*_prompt_tokens(event.message.usage))
+        if event.type == "message_delta":
+            # the final message_delta holds the total tokens of the answer
+            self._record_output_tokens(event.usage.output_tokens)
+        if event.type != "content_block_delta":
+            return thoughts
+        if event.delta.type == "thinking_delta":
+            self._thinking_callback(event.delta.thinking)
+            return True
+        if (event.delta.type == "text_delta") and (chunk_text := event.delta.text):
+            buf.write(chunk_text)
+            if thoughts:
+                self._text_callback("\n")
+                thoughts = False
+            self._text_callback(chunk_text)
+        return thoughts
+
+    def _generate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        with self.__client.beta.messages.stream(
+            **self.__stream_args(system_prompt, user_prompt, response_format)
         ) as stream:
             buf = io.StringIO()
             thoughts = False
             for event in stream:
-                if event.type != "content_block_delta":
-                    continue
-                if event.delta.type == "thinking_delta":
-                    self._thinking_callback(event.delta.thinking)
-                    thoughts = True
-                elif (event.delta.type == "text_delta") and (
-                    chunk_text := event.delta.text
-                ):
-                    buf.write(chunk_text)
-                    if thoughts:
-                        self._text_callback("\n")
-                        thoughts = False
-                    self._text_callback(chunk_text)
+                thoughts = self.__handle_event(buf, event, thoughts)
+            self._text_callback("\n")
+            return buf.getvalue()
+
+    async def _agenerate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        if self.__async_client is None:
+            return await super()._agenerate_text(
+                system_prompt, user_prompt, response_format
+            )
+        async with self.__async_client().beta.messages.stream(
+            **self.__stream_args(system_prompt, user_prompt, response_format)
+        ) as stream:
+            buf = io.StringIO()
+            thoughts = False
+            async for event in stream:
+                thoughts = self.__handle_event(buf, event, thoughts)
             self._text_callback("\n")
             return buf.getvalue()
 
 
-class AnthropicProvider(LLMProviderBase):
+class AnthropicProvider(BatchProviderMixin, LLMProviderBase):
     """Factory that returns Ollama clients for various tasks."""
 
     def __new__(cls, *args, **kwargs):
@@ -141,9 +202,17 @@ class AnthropicProvider(LLMProviderBase):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
+        self.__api_key = api_key
         self.__client = self.Anthropic(api_key=api_key)
 
+    def _new_async_client(self) -> "anthropic.AsyncAnthropic":
+        return try_import("anthropic").AsyncAnthropic(api_key=self.__api_key)
+
     def ensure_model(self) -> bool:
         try:
             model_info = self.__client.models.retrieve(self._model_name)
@@ -154,6 +223,58 @@ class AnthropicProvider(LLMProviderBase):
             )
             return False
 
+    def _batch_params(self, request: BatchRequest) -> dict:
+        params = {
+            "model": self._model_name,
+            "max_tokens": 1024,
+            "system": [
+                {
+                    "type": "text",
+                    "text": request.system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": [{"role": "user", "content": request.user_prompt}],
+        }
+        if isinstance(request.response_format, dict):
+            params["output_format"] = {
+                "type": "json_schema",
+                "schema": self.transform_schema(request.response_format),
+            }
+        return params
+
+    def _submit_batch(self, requests: list[BatchRequest]) -> str:
+        batch = self.__client.beta.messages.batches.create(
+            requests=[
+                {"custom_id": r.custom_id, "params": self._batch_params(r)}
+                for r in requests
+            ],
+            betas=["structured-outputs-2025-11-13"],
+        )
+        return batch.id
+
+    def _batch_status(self, batch_id: str) -> BatchStatus:
+        batch = self.__client.beta.messages.batches.retrieve(batch_id)
+        # requests that expire or are cancelled are reported with the results
+        if batch.processing_status == "ended":
+            return BatchStatus.ended
+        return BatchStatus.running
+
+    def _batch_results(self, batch_id: str) -> Iterator[tuple[str, str | Exception]]:
+        for entry in self.__client.beta.messages.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                yield entry.custom_id, ValueError(
+                    f"batch request {entry.result.type}: {entry.result!r}"
+                )
+                continue
+            message = entry.result.message
+            self._record_usage(
+                *_prompt_tokens(message.usage), message.usage.output_tokens
+            )
+            yield entry.custom_id, "".join(
+                block.text for block in message.content if block.type == "text"
+            )
+
     def new_json_generator(
         self, max_retries: int = 1, thinking: bool = False
     ) -> AnthropicJSONGenerator:
@@ -165,4 +286,9 @@ class AnthropicProvider(LLMProviderBase):
             on_error=self._error_callback,
             on_thinking=self._thinking_callback,
             on_text=self._text_callback,
+            rate_limiter=self._rate_limiter,
+            response_cache=self._response_cache,
+            token_usage=self._token_usage,
+            metrics=self._metrics,
+            async_client=self._async_client,
         )
@@ -0,0 +1,19 @@
+from enum import StrEnum
+from typing import NamedTuple
+
+
+class BatchStatus(StrEnum):
+    running = "running"
+    ended = "ended"
+    failed = "failed"
+
+
+class BatchRequest(NamedTuple):
+    custom_id: str
+    system_prompt: str
+    user_prompt: str
+    response_format: str | dict
+
+
+class BatchError(RuntimeError):
+    """Raised when the provider gives up on a whole batch."""
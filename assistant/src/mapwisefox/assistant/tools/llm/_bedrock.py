@@ -1,19 +1,17 @@
 import io
 import json
 import os
-from datetime import timedelta
+import uuid
 from functools import partial
-from typing import TYPE_CHECKING, Generator, Optional
-
-from tenacity import (
-    retry,
-    retry_if_exception,
-    wait_random_exponential,
-    stop_after_delay,
-)
+from typing import TYPE_CHECKING, Any, Generator, Iterator, Optional
 
 from mapwisefox.assistant.tools.extras import try_import
-from mapwisefox.assistant.tools.llm._provider import LLMProviderBase, JSONGenerator
+from mapwisefox.assistant.tools.llm._batch import BatchRequest, BatchStatus
+from mapwisefox.assistant.tools.llm._provider import (
+    BatchProviderMixin,
+    JSONGenerator,
+    LLMProviderBase,
+)
 
 if TYPE_CHECKING:
     import botocore
@@ -21,11 +19,9 @@ if TYPE_CHECKING:
     import botocore.exceptions
 
 
-def _is_throttling_exception(err: BaseException) -> bool:
-    if not hasattr(err, "response"):
-        return False
-    response = getattr(err, "response")
-    return response.get("Error", {}).get("Code") == "ThrottlingException"
+def _split_s3_uri(uri: str) -> tuple[str, str]:
+    bucket, _, key = uri.removeprefix("s3://").partition("/")
+    return bucket, key
 
 
 class BedrockJSONGenerator(JSONGenerator):
@@ -41,6 +37,10 @@ class BedrockJSONGenerator(JSONGenerator):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client = client
         self.__model_name = model_name
@@ -124,11 +124,6 @@ class BedrockJSONGenerator(JSONGenerator):
             f"no idea how to handle requests for model {self.__model_name}"
         )
 
-    @retry(
-        wait=wait_random_exponential(multiplier=1, max=60),
-        retry=retry_if_exception(_is_throttling_exception),
-        stop=stop_after_delay(timedelta(seconds=120)),
-    )
     def _perform_request(
         self, response_format: str | dict, system_prompt: str, user_prompt: str
     ) -> Optional[Generator]:
@@ -218,6 +213,10 @@ class BedrockJSONGenerator(JSONGenerator):
             if not (chunk_data := chunk.get("bytes")):
                 continue
             event_obj = json.loads(chunk_data)
+            if usage := event_obj.get("amazon-bedrock-invocationMetrics"):
+                self._record_usage(
+                    usage.get("inputTokenCount"), 0, usage.get("outputTokenCount")
+                )
             thoughts = self.__process_event_obj(buf, event_obj, thoughts)
 
         self._text_callback(os.linesep)
@@ -231,6 +230,13 @@ class BedrockJSONGenerator(JSONGenerator):
             result = result[: valid_json_closer + 1]
         return result
 
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(model={self.__model_name!r}, "
+            f"thinking={self.__thinking!r})"
+        )
+
     def _generate_text(
         self, system_prompt: str, user_prompt: str, response_format: str | dict
     ) -> str:
@@ -241,32 +247,45 @@ class BedrockJSONGenerator(JSONGenerator):
         return result
 
 
-class BedrockProvider(LLMProviderBase):
+class BedrockProvider(BatchProviderMixin, LLMProviderBase):
     def __new__(cls, *args, **kwargs):
         obj = object.__new__(cls)
-        if not hasattr(cls, "_guard") or not getattr(cls, "_guard"):
-            boto3_module = try_import("boto3")
-            obj.Bedrock = partial(boto3_module.client, "bedrock")
-            obj.BedrockClient = partial(boto3_module.client, "bedrock-runtime")
-            exceptions_module = try_import("botocore.exceptions")
-            obj.ClientError = exceptions_module.ClientError
-            obj.BotoCoreError = exceptions_module.BotoCoreError
-            obj.needs_region_prefix = str(kwargs.get("model") or "").startswith(
-                "anthropic."
-            )
-            cls._guard = True
+        boto3_module = try_import("boto3")
+        obj.Bedrock = partial(boto3_module.client, "bedrock")
+        obj.BedrockClient = partial(boto3_module.client, "bedrock-runtime")
+        obj.S3 = partial(boto3_module.client, "s3")
+        exceptions_module = try_import("botocore.exceptions")
+        obj.ClientError = exceptions_module.ClientError
+        obj.BotoCoreError = exceptions_module.BotoCoreError
+        obj.needs_region_prefix = str(kwargs.get("model") or "").startswith(
+            "anthropic."
+        )
         return obj
 
-    def __init__(self, model: str, api_key: str, **kwargs):
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        batch_s3_uri: Optional[str] = None,
+        batch_role_arn: Optional[str] = None,
+        **kwargs,
+    ):
         super().__init__(
             model,
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         os.environ["AWS_BEARER_TOKEN_BEDROCK"] = api_key
         self.__bedrock = self.Bedrock()
         self.__runtime_client = self.BedrockClient()
+        self.__batch_s3_uri = (batch_s3_uri or "").rstrip("/")
+        self.__batch_role_arn = batch_role_arn
+        self.__batch_record_ids: dict[str, dict[str, str]] = {}
 
     def ensure_model(self) -> bool:
         try:
@@ -280,14 +299,116 @@ class BedrockProvider(LLMProviderBase):
             )
             return False
 
+    @property
+    def __model_id(self) -> str:
+        return (
+            f"eu.{self._model_name}" if self.needs_region_prefix else self._model_name
+        )
+
+    @property
+    def supports_batches(self) -> bool:
+        # batch inference reads requests from S3 and writes the answers back
+        # there, using a service role that may access the bucket
+        return (
+            super().supports_batches
+            and bool(self.__batch_s3_uri and self.__batch_role_arn)
+            and "anthropic." in self._model_name
+        )
+
+    def _submit_batch(self, requests: list[BatchRequest]) -> str:
+        job_name = f"mapwisefox-{uuid.uuid4().hex}"
+        input_uri = f"{self.__batch_s3_uri}/{job_name}/input.jsonl"
+        # record identifiers are short, so keys are mapped back from the results
+        record_ids = {f"{i:011d}": r.custom_id for i, r in enumerate(requests)}
+        lines = os.linesep.join(
+            json.dumps(
+                {
+                    "recordId": record_id,
+                    "modelInput": json.loads(
+                        BedrockJSONGenerator._anthropic_request_body(
+                            r.response_format, r.system_prompt, r.user_prompt
+                        )
+                    ),
+                }
+            )
+            for record_id, r in zip(record_ids, requests)
+        )
+        bucket, key = _split_s3_uri(input_uri)
+        self.S3().put_object(Bucket=bucket, Key=key, Body=lines.encode())
+        job = self.__bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.__batch_role_arn,
+            modelId=self.__model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": input_uri}},
+            outputDataConfig={
+                "s3OutputDataConfig": {
+                    "s3Uri": f"{self.__batch_s3_uri}/{job_name}/output/"
+                }
+            },
+        )
+        self.__batch_record_ids[job["jobArn"]] = record_ids
+        return job["jobArn"]
+
+    def _batch_state(self, batch_id: str) -> dict[str, Any]:
+        # the record identifiers only map back to keys in the submitting process
+        return {"record_ids": self.__batch_record_ids.get(batch_id, {})}
+
+    def _restore_batch(self, batch_id: str, state: dict[str, Any]) -> None:
+        self.__batch_record_ids[batch_id] = state.get("record_ids", {})
+
+    def _batch_status(self, batch_id: str) -> BatchStatus:
+        status = self.__bedrock.get_model_invocation_job(jobIdentifier=batch_id)[
+            "status"
+        ]
+        if status in {"Completed", "PartiallyCompleted", "Expired"}:
+            return BatchStatus.ended
+        if status in {"Failed", "Stopped"}:
+            return BatchStatus.failed
+        return BatchStatus.running
+
+    def _batch_results(self, batch_id: str) -> Iterator[tuple[str, str | Exception]]:
+        job = self.__bedrock.get_model_invocation_job(jobIdentifier=batch_id)
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+        # answers are written below a folder named after the job identifier
+        bucket, prefix = _split_s3_uri(
+            f"{output_uri.rstrip('/')}/{batch_id.rsplit('/', 1)[-1]}/"
+        )
+        record_ids = self.__batch_record_ids.get(batch_id, {})
+        s3 = self.S3()
+        listing = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
+        for obj in listing.get("Contents", []):
+            if not obj["Key"].endswith(".jsonl.out"):
+                continue
+            body = s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read()
+            for line in body.decode().splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = record_ids.get(record["recordId"], record["recordId"])
+                if error := record.get("error"):
+                    yield key, ValueError(f"batch request failed: {error}")
+                    continue
+                output = record["modelOutput"]
+                if usage := output.get("usage"):
+                    self._record_usage(
+                        usage["input_tokens"], 0, usage.get("output_tokens", 0)
+                    )
+                yield key, "".join(
+                    c["text"] for c in output["content"] if c["type"] == "text"
+                )
+
     def new_json_generator(
         self, max_retries: int = 1, thinking: bool = False
     ) -> BedrockJSONGenerator:
         return BedrockJSONGenerator(
             self.__runtime_client,
-            f"eu.{self._model_name}" if self.needs_region_prefix else self._model_name,
+            self.__model_id,
             max_retries,
             on_error=self._error_callback,
             on_thinking=self._thinking_callback,
             on_text=self._text_callback,
+            rate_limiter=self._rate_limiter,
+            response_cache=self._response_cache,
+            token_usage=self._token_usage,
+            metrics=self._metrics,
         )
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from mapwisefox.assistant.tools.lru_store import SQLiteLRUStore
+
+_CACHE_FORMAT_VERSION = 1
+
+
+class ResponseCache:
+    """Content-addressed store of LLM answers.
+
+    Entries are keyed on everything that determines an answer: the
+    ``cache_key`` of the generator (provider, model and thinking settings),
+    the rendered system prompt, the user prompt and the response schema. They
+    are stored compressed in a single SQLite database, and when the stored
+    answers exceed ``max_size_bytes`` the least recently used are evicted.
+    """
+
+    def __init__(self, path: Path, max_size_bytes: int = 256 * 2**20) -> None:
+        self.__store = SQLiteLRUStore(path, "responses", ("generator",), max_size_bytes)
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def path(self) -> Path:
+        return self.__store.path
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @staticmethod
+    def key(
+        generator_key: str,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: str | dict,
+    ) -> str:
+        material = json.dumps(
+            [
+                _CACHE_FORMAT_VERSION,
+                generator_key,
+                system_prompt,
+                user_prompt,
+                response_format,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        text = self.__store.get(key)
+        with self.__lock:
+            if text is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+        return text
+
+    def put(self, key: str, generator_key: str, text: str) -> None:
+        self.__store.put(key, text, generator_key)
+
+    def close(self) -> None:
+        self.__store.close()
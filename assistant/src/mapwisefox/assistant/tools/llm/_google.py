@@ -1,9 +1,10 @@
 import io
 import os
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
 from mapwisefox.assistant.tools.extras import try_import
 from mapwisefox.assistant.tools.llm._provider import LLMProviderBase, JSONGenerator
+from mapwisefox.assistant.tools.llm._rate_limit import is_throttling_error
 
 if TYPE_CHECKING:
     import google.genai as genai
@@ -22,8 +23,15 @@ class GoogleJSONGenerator(JSONGenerator):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client: "genai.Client" = client
+        self.__async_client: "Callable[[], genai.client.AsyncClient] | None" = (
+            kwargs.pop("async_client", None)
+        )
         self.__model_name = model_name
         self.__max_retries = max_retries
         self.__thinking_cfg = self._get_thinking_config(thinking_level)
@@ -42,46 +50,104 @@ class GoogleJSONGenerator(JSONGenerator):
             return None
         return response_format
 
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(model={self.__model_name!r}, "
+            f"thinking={self.__thinking_cfg!r})"
+        )
+
+    def __stream_args(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> dict:
+        return dict(
+            model=self.__model_name,
+            contents=user_prompt,
+            config={
+                "system_instruction": system_prompt,
+                "response_mime_type": "application/json",
+                "response_json_schema": self._get_schema(response_format),
+                "thinking_config": self.__thinking_cfg,
+            },
+        )
+
+    def __handle_chunk(self, buf: io.StringIO, chunk, thoughts: bool) -> bool:
+        if chunk.candidates[0].content.parts is None:
+            return thoughts
+        for part in chunk.candidates[0].content.parts:
+            if not part.text:
+                continue
+            elif part.thought:
+                self._thinking_callback(part.text)
+                thoughts = True
+            else:
+                buf.write(part.text)
+                if thoughts:
+                    self._text_callback(os.linesep)
+                    thoughts = False
+                self._text_callback(part.text)
+        return thoughts
+
+    def __record_usage(self, usage) -> None:
+        if usage is not None:
+            # Gemini caches shared prompt prefixes implicitly
+            self._record_usage(
+                usage.prompt_token_count,
+                usage.cached_content_token_count,
+                usage.candidates_token_count,
+            )
+
     def _generate_text(
         self, system_prompt: str, user_prompt: str, response_format: str | dict
     ) -> str:
         try:
-            output_format = self._get_schema(response_format)
             buf = io.StringIO()
             thoughts = False
             stream = None
             retries = self.__max_retries
             while stream is None and retries > 0:
                 stream = self.__client.models.generate_content_stream(
-                    model=self.__model_name,
-                    contents=user_prompt,
-                    config={
-                        "system_instruction": system_prompt,
-                        "response_mime_type": "application/json",
-                        "response_json_schema": output_format,
-                        "thinking_config": self.__thinking_cfg,
-                    },
+                    **self.__stream_args(system_prompt, user_prompt, response_format)
                 )
                 retries -= 1
 
+            usage = None
             for chunk in stream:
-                if chunk.candidates[0].content.parts is None:
-                    continue
-                for part in chunk.candidates[0].content.parts:
-                    if not part.text:
-                        continue
-                    elif part.thought:
-                        self._thinking_callback(part.text)
-                        thoughts = True
-                    else:
-                        buf.write(part.text)
-                        if thoughts:
-                            self._text_callback(os.linesep)
-                            thoughts = False
-                        self._text_callback(part.text)
+                # only the last chunk reports the usage of the whole request
+                usage = chunk.usage_metadata or usage
+                thoughts = self.__handle_chunk(buf, chunk, thoughts)
+            self.__record_usage(usage)
             self._text_callback(os.linesep)
             return buf.getvalue()
         except Exception as e:
+            if is_throttling_error(e):
+                raise
+            self._error_callback("something went horribly wrong", e)
+            return ""
+
+    async def _agenerate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        if self.__async_client is None:
+            return await super()._agenerate_text(
+                system_prompt, user_prompt, response_format
+            )
+        try:
+            buf = io.StringIO()
+            thoughts = False
+            stream = await self.__async_client().models.generate_content_stream(
+                **self.__stream_args(system_prompt, user_prompt, response_format)
+            )
+            usage = None
+            async for chunk in stream:
+                usage = chunk.usage_metadata or usage
+                thoughts = self.__handle_chunk(buf, chunk, thoughts)
+            self.__record_usage(usage)
+            self._text_callback(os.linesep)
+            return buf.getvalue()
+        except Exception as e:
+            if is_throttling_error(e):
+                raise
             self._error_callback("something went horribly wrong", e)
             return ""
 
@@ -99,9 +165,20 @@ class GoogleProvider(LLMProviderBase):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client: "genai.Client" = self.Client(api_key=api_key)
 
+    def _new_async_client(self) -> "genai.client.AsyncClient":
+        return self.__client.aio
+
+    async def _close_async_client(self, client: "genai.client.AsyncClient") -> None:
+        # the async client shares the connections of the client it belongs to
+        pass
+
     def ensure_model(self) -> bool:
         try:
             model = self.__client.models.get(model=self._model_name)
@@ -121,4 +198,9 @@ class GoogleProvider(LLMProviderBase):
             on_error=self._error_callback,
             on_thinking=self._thinking_callback,
             on_text=self._text_callback,
+            rate_limiter=self._rate_limiter,
+            response_cache=self._response_cache,
+            token_usage=self._token_usage,
+            metrics=self._metrics,
+            async_client=self._async_client,
         )
@@ -0,0 +1,78 @@
+from mapwisefox.assistant.instrumentation import MetricsRegistry
+
+_PREFIX = "mwf_assistant_llm"
+
+
+class LLMMetrics:
+    """Records the requests of one provider and model in a metrics registry.
+
+    Every metric is labelled with the provider and the model, so a run that
+    uses a screening model reports both models side by side.
+    """
+
+    def __init__(self, registry: MetricsRegistry, provider: str, model: str) -> None:
+        self.__labels = {"provider": provider, "model": model}
+        self.__latency = registry.histogram(
+            f"{_PREFIX}_request_duration_seconds",
+            "time taken by the provider to answer a request",
+        )
+        self.__first_token = registry.histogram(
+            f"{_PREFIX}_time_to_first_token_seconds",
+            "time from sending a request to streaming its first token",
+        )
+        self.__requests = registry.counter(
+            f"{_PREFIX}_requests_total", "requests sent to the provider"
+        )
+        self.__input_tokens = registry.counter(
+            f"{_PREFIX}_input_tokens_total", "prompt tokens reported by the provider"
+        )
+        self.__cached_input_tokens = registry.counter(
+            f"{_PREFIX}_cached_input_tokens_total",
+            "prompt tokens read from the provider's prompt cache",
+        )
+        self.__output_tokens = registry.counter(
+            f"{_PREFIX}_output_tokens_total", "answer tokens reported by the provider"
+        )
+        self.__retries = registry.counter(
+            f"{_PREFIX}_retries_total", "requests sent again, by reason"
+        )
+        self.__decode_failures = registry.counter(
+            f"{_PREFIX}_json_decode_failures_total", "answers that weren't valid JSON"
+        )
+        self.__cache_hits = registry.counter(
+            f"{_PREFIX}_response_cache_hits_total",
+            "requests answered by the response cache",
+        )
+        self.__cache_misses = registry.counter(
+            f"{_PREFIX}_response_cache_misses_total",
+            "requests the response cache had no answer for",
+        )
+
+    def request(self, seconds: float, outcome: str = "ok") -> None:
+        self.__latency.observe(seconds, **self.__labels)
+        self.__requests.inc(outcome=outcome, **self.__labels)
+
+    def first_token(self, seconds: float) -> None:
+        self.__first_token.observe(seconds, **self.__labels)
+
+    def tokens(
+        self,
+        input_tokens: int = 0,
+        cached_input_tokens: int = 0,
+        output_tokens: int = 0,
+    ) -> None:
+        self.__input_tokens.inc(input_tokens or 0, **self.__labels)
+        self.__cached_input_tokens.inc(cached_input_tokens or 0, **self.__labels)
+        self.__output_tokens.inc(output_tokens or 0, **self.__labels)
+
+    def retry(self, reason: str) -> None:
+        self.__retries.inc(reason=reason, **self.__labels)
+
+    def json_decode_failure(self) -> None:
+        self.__decode_failures.inc(**self.__labels)
+
+    def cache_hit(self) -> None:
+        self.__cache_hits.inc(**self.__labels)
+
+    def cache_miss(self) -> None:
+        self.__cache_misses.inc(**self.__labels)
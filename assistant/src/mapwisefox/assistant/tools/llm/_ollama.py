@@ -1,6 +1,6 @@
 import io
 import os
-from typing import Optional, TYPE_CHECKING
+from typing import Callable, Optional, TYPE_CHECKING
 
 from mapwisefox.assistant.tools.extras import try_import
 from mapwisefox.assistant.tools.llm._provider import LLMProviderBase, JSONGenerator
@@ -10,6 +10,8 @@ if TYPE_CHECKING:
 
 
 class OllamaJSONGenerator(JSONGenerator):
+    KEEP_ALIVE = "30m"
+
     def __init__(
         self,
         client: "ollama.Client",
@@ -22,8 +24,15 @@ class OllamaJSONGenerator(JSONGenerator):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client = client
+        self.__async_client: "Callable[[], ollama.AsyncClient] | None" = kwargs.pop(
+            "async_client", None
+        )
         self.__model_name = model_name
         self.__max_retries = max_retries
         self.__thinking = self._coerce_thinking(thinking, model_name)
@@ -34,10 +43,17 @@ class OllamaJSONGenerator(JSONGenerator):
             return "medium" if thinking else "low"
         return thinking
 
-    def _generate_text(
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(model={self.__model_name!r}, "
+            f"thinking={self.__thinking!r})"
+        )
+
+    def __chat_args(
         self, system_prompt: str, user_prompt: str, response_format: str | dict
-    ) -> str:
-        response = self.__client.chat(
+    ) -> dict:
+        return dict(
             model=self.__model_name,
             messages=[
                 {
@@ -48,20 +64,55 @@ class OllamaJSONGenerator(JSONGenerator):
             stream=True,
             format=response_format,
             think=self.__thinking,
+            # a loaded model reuses the evaluated prefix of the previous prompt,
+            # so the system prompt shared by a run's requests is evaluated once
+            keep_alive=self.KEEP_ALIVE,
+        )
+
+    def __handle_chunk(self, buf: io.StringIO, chunk, thoughts: bool) -> bool:
+        if chunk.done:
+            # Ollama doesn't report how much of the prompt it reused
+            self._record_usage(chunk.prompt_eval_count, 0, chunk.eval_count)
+        if chunk.message.thinking:
+            self._thinking_callback(chunk.message.thinking)
+            return True
+        if chunk_text := chunk.message.content:
+            buf.write(chunk_text)
+            if thoughts:
+                self._text_callback("\n")
+                thoughts = False
+            self._text_callback(chunk_text)
+        return thoughts
+
+    def _generate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        response = self.__client.chat(
+            **self.__chat_args(system_prompt, user_prompt, response_format)
         )
 
         buf = io.StringIO()
         thoughts = False
         for chunk in response:
-            if chunk.message.thinking:
-                self._thinking_callback(chunk.message.thinking)
-                thoughts = True
-            elif chunk_text := chunk.message.content:
-                buf.write(chunk_text)
-                if thoughts:
-                    self._text_callback("\n")
-                    thoughts = False
-                self._text_callback(chunk_text)
+            thoughts = self.__handle_chunk(buf, chunk, thoughts)
+        self._text_callback("\n")
+        return buf.getvalue()
+
+    async def _agenerate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        if self.__async_client is None:
+            return await super()._agenerate_text(
+                system_prompt, user_prompt, response_format
+            )
+        response = await self.__async_client().chat(
+            **self.__chat_args(system_prompt, user_prompt, response_format)
+        )
+
+        buf = io.StringIO()
+        thoughts = False
+        async for chunk in response:
+            thoughts = self.__handle_chunk(buf, chunk, thoughts)
         self._text_callback("\n")
         return buf.getvalue()
 
@@ -83,12 +134,23 @@ class OllamaProvider(LLMProviderBase):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         headers = {}
         if api_key := kwargs.pop("api_key", None):
             headers["Authorization"] = f"Bearer {api_key}"
+        self.__host = ollama_host
+        self.__headers = headers
         self.__client = self.Client(host=ollama_host, headers=headers)
 
+    def _new_async_client(self) -> "ollama.AsyncClient":
+        return try_import("ollama").AsyncClient(
+            host=self.__host, headers=self.__headers
+        )
+
     def _download_model(self) -> bool:
         try:
             digest = ""
@@ -143,4 +205,9 @@ class OllamaProvider(LLMProviderBase):
             on_error=self._error_callback,
             on_thinking=self._thinking_callback,
             on_text=self._text_callback,
+            rate_limiter=self._rate_limiter,
+            response_cache=self._response_cache,
+            token_usage=self._token_usage,
+            metrics=self._metrics,
+            async_client=self._async_client,
         )
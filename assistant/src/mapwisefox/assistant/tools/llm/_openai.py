@@ -1,9 +1,16 @@
+import hashlib
 import io
+import json
 import os
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Iterator
 
 from mapwisefox.assistant.tools.extras import try_import
-from mapwisefox.assistant.tools.llm._provider import LLMProviderBase, JSONGenerator
+from mapwisefox.assistant.tools.llm._batch import BatchRequest, BatchStatus
+from mapwisefox.assistant.tools.llm._provider import (
+    BatchProviderMixin,
+    JSONGenerator,
+    LLMProviderBase,
+)
 
 
 if TYPE_CHECKING:
@@ -24,8 +31,15 @@ class OpenAIJSONGenerator(JSONGenerator):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
         self.__client: "openai.OpenAI" = client
+        self.__async_client: "Callable[[], openai.AsyncOpenAI] | None" = kwargs.pop(
+            "async_client", None
+        )
         self.__model_name = model_name
         self.__max_retries = max_retries
         self.__thinking = thinking
@@ -33,9 +47,31 @@ class OpenAIJSONGenerator(JSONGenerator):
             "openai.types.responses"
         ).ResponseFormatTextJSONSchemaConfigParam
 
-    def _generate_text(
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(model={self.__model_name!r}, "
+            f"thinking={self.__thinking!r})"
+        )
+
+    @staticmethod
+    def _prompt_cache_key(system_prompt: str) -> str:
+        return hashlib.sha256(system_prompt.encode()).hexdigest()[:32]
+
+    def __record_usage(
+        self, usage: "openai.types.responses.ResponseUsage | None"
+    ) -> None:
+        if usage is None:
+            return
+        self._record_usage(
+            usage.input_tokens,
+            usage.input_tokens_details.cached_tokens,
+            usage.output_tokens,
+        )
+
+    def __stream_args(
         self, system_prompt: str, user_prompt: str, response_format: str | dict
-    ) -> str:
+    ) -> dict:
         openai_format = (
             {"type": "json_object"}
             if isinstance(response_format, str)
@@ -47,30 +83,57 @@ class OpenAIJSONGenerator(JSONGenerator):
                 },
             )
         )
+        return dict(
+            model=self.__model_name,
+            instructions=system_prompt,
+            input=user_prompt,
+            # requests with the same key are routed to the same cache, so
+            # the shared system prompt is read from it instead of recomputed
+            prompt_cache_key=self._prompt_cache_key(system_prompt),
+            text_format=openai_format,
+            reasoning={"effort": self.__thinking},
+        )
+
+    def __handle_event(self, buf: io.StringIO, event) -> None:
+        if event.type == "response.output_text.delta":
+            self._text_callback(event.delta)
+            buf.write(event.delta)
+        if event.type == "response.completed":
+            self.__record_usage(event.response.usage)
+            self._text_callback("\n")
+        if event.type == "error":
+            self._error_callback("", ValueError(""))
+
+    def _generate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
         buf = io.StringIO()
         try:
             with self.__client.responses.stream(
-                model=self.__model_name,
-                instructions=system_prompt,
-                input=user_prompt,
-                text_format=openai_format,
-                reasoning={"effort": self.__thinking},
+                **self.__stream_args(system_prompt, user_prompt, response_format)
             ) as response:
                 for event in response:
-                    if event.type not in {
-                        "response.created",
-                        "response.output_text.delta",
-                        "response.completed",
-                        "error",
-                    }:
-                        continue
-                    if event.type == "response.output_text.delta":
-                        self._text_callback(event.delta)
-                        buf.write(event.delta)
-                    if event.type == "response.completed":
-                        self._text_callback("\n")
-                    if event.type == "error":
-                        self._error_callback("", ValueError(""))
+                    self.__handle_event(buf, event)
+            self._text_callback(os.linesep)
+        except TypeError:
+            pass
+
+        return buf.getvalue()
+
+    async def _agenerate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        if self.__async_client is None:
+            return await super()._agenerate_text(
+                system_prompt, user_prompt, response_format
+            )
+        buf = io.StringIO()
+        try:
+            async with self.__async_client().responses.stream(
+                **self.__stream_args(system_prompt, user_prompt, response_format)
+            ) as response:
+                async for event in response:
+                    self.__handle_event(buf, event)
             self._text_callback(os.linesep)
         except TypeError:
             pass
@@ -78,7 +141,7 @@ class OpenAIJSONGenerator(JSONGenerator):
         return buf.getvalue()
 
 
-class OpenAIProvider(LLMProviderBase):
+class OpenAIProvider(BatchProviderMixin, LLMProviderBase):
     """Factory that returns Ollama clients for various tasks."""
 
     def __new__(cls, *args, **kwargs):
@@ -94,9 +157,17 @@ class OpenAIProvider(LLMProviderBase):
             kwargs.pop("on_error", None),
             kwargs.pop("on_thinking", None),
             kwargs.pop("on_text", None),
+            rate_limiter=kwargs.pop("rate_limiter", None),
+            response_cache=kwargs.pop("response_cache", None),
+            token_usage=kwargs.pop("token_usage", None),
+            metrics=kwargs.pop("metrics", None),
         )
+        self.__api_key = api_key
         self.__client = self.OpenAI(api_key=api_key)
 
+    def _new_async_client(self) -> "openai.AsyncOpenAI":
+        return try_import("openai").AsyncOpenAI(api_key=self.__api_key)
+
     def ensure_model(self) -> bool:
         try:
             model = self.__client.models.retrieve(self._model_name)
@@ -105,6 +176,85 @@ class OpenAIProvider(LLMProviderBase):
             self._error_callback("error loading OpenAI model", err)
             return False
 
+    def _batch_line(self, request: BatchRequest) -> str:
+        text_format = (
+            {
+                "type": "json_schema",
+                "name": "response-schema",
+                "schema": request.response_format,
+            }
+            if isinstance(request.response_format, dict)
+            else {"type": "json_object"}
+        )
+        body = {
+            "model": self._model_name,
+            "instructions": request.system_prompt,
+            "input": request.user_prompt,
+            "text": {"format": text_format},
+            "reasoning": {"effort": "low"},
+            "prompt_cache_key": OpenAIJSONGenerator._prompt_cache_key(
+                request.system_prompt
+            ),
+        }
+        return json.dumps(
+            {
+                "custom_id": request.custom_id,
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": body,
+            }
+        )
+
+    def _submit_batch(self, requests: list[BatchRequest]) -> str:
+        lines = os.linesep.join(self._batch_line(r) for r in requests)
+        batch_file = self.__client.files.create(
+            file=("batch.jsonl", lines.encode()), purpose="batch"
+        )
+        batch = self.__client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def _batch_status(self, batch_id: str) -> BatchStatus:
+        status = self.__client.batches.retrieve(batch_id).status
+        # an expired batch still holds the answers completed in time
+        if status in {"completed", "expired"}:
+            return BatchStatus.ended
+        if status in {"failed", "cancelled"}:
+            return BatchStatus.failed
+        return BatchStatus.running
+
+    def _result_text(self, line: dict) -> str | Exception:
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            return ValueError(f"batch request failed: {line.get('error') or response}")
+        body = response["body"]
+        if usage := body.get("usage"):
+            self._record_usage(
+                usage["input_tokens"],
+                usage.get("input_tokens_details", {}).get("cached_tokens", 0),
+                usage.get("output_tokens", 0),
+            )
+        return "".join(
+            part["text"]
+            for item in body["output"]
+            if item["type"] == "message"
+            for part in item["content"]
+            if part["type"] == "output_text"
+        )
+
+    def _batch_results(self, batch_id: str) -> Iterator[tuple[str, str | Exception]]:
+        batch = self.__client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id is None:
+                continue
+            for line in self.__client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    obj = json.loads(line)
+                    yield obj["custom_id"], self._result_text(obj)
+
     def new_json_generator(
         self, max_retries: int = 1, thinking: str = "low"
     ) -> OpenAIJSONGenerator:
@@ -116,4 +266,9 @@ class OpenAIProvider(LLMProviderBase):
             on_error=self._error_callback,
             on_thinking=self._thinking_callback,
             on_text=self._text_callback,
+            rate_limiter=self._rate_limiter,
+            response_cache=self._response_cache,
+            token_usage=self._token_usage,
+            metrics=self._metrics,
+            async_client=self._async_client,
         )
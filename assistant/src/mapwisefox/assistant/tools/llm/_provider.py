@@ -1,11 +1,37 @@
+import asyncio
+import contextvars
 import json
 import re
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import Callable, Iterator, Optional, Any
 
 import jinja2
 
+from mapwisefox.assistant.instrumentation import MetricsRegistry
 from mapwisefox.assistant.tools.llm import ErrorCallback, TextCallback
+from mapwisefox.assistant.tools.llm._batch import BatchError, BatchRequest, BatchStatus
+from mapwisefox.assistant.tools.llm._cache import ResponseCache
+from mapwisefox.assistant.tools.llm._metrics import LLMMetrics
+from mapwisefox.assistant.tools.llm._rate_limit import (
+    RateLimiter,
+    estimate_tokens,
+    is_throttling_error,
+)
+from mapwisefox.assistant.tools.llm._usage import TokenUsage
+from mapwisefox.assistant.tools.logging import get_logger
+
+log = get_logger("llm")
+_JSON_BLOCK = re.compile(r"`+\w*\s*([{].+[}])\s*`+", re.M | re.S | re.U)
+# when the request being streamed was sent, until its first token arrives
+_awaiting_first_token: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "awaiting_first_token", default=None
+)
+
+
+def _strip_code_fences(llm_text: str) -> str:
+    return _JSON_BLOCK.sub(r"\1", llm_text)
 
 
 class JSONGenerator(ABC):
@@ -19,55 +45,254 @@ class JSONGenerator(ABC):
         on_thinking: Optional[TextCallback] = None,
         on_text: Optional[TextCallback] = None,
         max_retries: int = 1,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        token_usage: Optional[TokenUsage] = None,
+        metrics: Optional[LLMMetrics] = None,
     ) -> None:
         self._error_callback = on_error or self._no_op
-        self._thinking_callback = on_thinking or self._no_op
-        self._text_callback = on_text or self._no_op
+        self._thinking_callback = self.__timed(on_thinking or self._no_op, metrics)
+        self._text_callback = self.__timed(on_text or self._no_op, metrics)
         self.__max_retries = max_retries
-        self.__regex = re.compile(r"`+\w*\s*([{].+[}])\s*`+", re.M | re.S | re.U)
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._response_cache = response_cache
+        self._token_usage = token_usage or TokenUsage()
+        self._metrics = metrics
+
+    @staticmethod
+    def __timed(callback: TextCallback, metrics: Optional[LLMMetrics]) -> TextCallback:
+        if metrics is None:
+            return callback
+
+        def _(*args, **kwargs):
+            if (sent := _awaiting_first_token.get()) is not None:
+                _awaiting_first_token.set(None)
+                metrics.first_token(time.monotonic() - sent)
+            return callback(*args, **kwargs)
+
+        return _
+
+    def _record_usage(
+        self,
+        input_tokens: Optional[int],
+        cached_input_tokens: Optional[int] = 0,
+        output_tokens: Optional[int] = 0,
+    ) -> None:
+        self._token_usage.record(input_tokens, cached_input_tokens)
+        if self._metrics is not None:
+            self._metrics.tokens(input_tokens, cached_input_tokens, output_tokens)
+
+    def _record_output_tokens(self, output_tokens: Optional[int]) -> None:
+        """Record answer tokens reported apart from the request's prompt tokens."""
+        if self._metrics is not None:
+            self._metrics.tokens(output_tokens=output_tokens)
+
+    @property
+    def cache_key(self) -> str:
+        """Identify the provider, model and settings that answer requests.
+
+        Generators whose answers depend on options (model, thinking, ...) must
+        include them, so cached answers are never shared between differently
+        configured generators.
+        """
+        return type(self).__qualname__
 
     @abstractmethod
     def _generate_text(
         self, system_prompt: str, user_prompt: str, response_format: str | dict
     ) -> str:
+        """Return the LLM's answer to ``user_prompt``.
+
+        Callers keep the system prompt stable across requests and vary the user
+        prompt, so implementations send the system prompt first and mark it as
+        cacheable where the provider supports prompt caching.
+        """
         pass
 
+    async def _agenerate_text(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        """Async counterpart of :meth:`_generate_text`.
+
+        Generators built on an SDK with an async client override this; the
+        default runs :meth:`_generate_text` on a worker thread.
+        """
+        return await asyncio.to_thread(
+            self._generate_text, system_prompt, user_prompt, response_format
+        )
+
+    def __retry_throttled(self, err: Exception, throttled: int) -> bool:
+        if (
+            not is_throttling_error(err)
+            or throttled >= self._rate_limiter.max_throttle_retries
+        ):
+            return False
+        self._rate_limiter.throttled()
+        self._error_callback("LLM provider throttled the request", err)
+        if self._metrics is not None:
+            self._metrics.retry("throttled")
+        return True
+
+    def __sent(self) -> tuple[float, contextvars.Token]:
+        sent = time.monotonic()
+        return sent, _awaiting_first_token.set(sent)
+
+    def __received(self, sent: float, token: contextvars.Token, outcome: str) -> None:
+        _awaiting_first_token.reset(token)
+        if self._metrics is not None:
+            self._metrics.request(time.monotonic() - sent, outcome)
+
+    def __generate_text_within_limits(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        tokens = estimate_tokens(system_prompt, user_prompt)
+        throttled = 0
+        while True:
+            self._rate_limiter.acquire(tokens)
+            sent, token = self.__sent()
+            try:
+                text = self._generate_text(system_prompt, user_prompt, response_format)
+            except Exception as err:
+                self.__received(sent, token, "error")
+                if not self.__retry_throttled(err, throttled):
+                    raise
+                throttled += 1
+                continue
+            self.__received(sent, token, "ok")
+            self._rate_limiter.succeeded()
+            return text
+
+    async def __agenerate_text_within_limits(
+        self, system_prompt: str, user_prompt: str, response_format: str | dict
+    ) -> str:
+        tokens = estimate_tokens(system_prompt, user_prompt)
+        throttled = 0
+        while True:
+            await self._rate_limiter.aacquire(tokens)
+            sent, token = self.__sent()
+            try:
+                text = await self._agenerate_text(
+                    system_prompt, user_prompt, response_format
+                )
+            except Exception as err:
+                self.__received(sent, token, "error")
+                if not self.__retry_throttled(err, throttled):
+                    raise
+                throttled += 1
+                continue
+            self.__received(sent, token, "ok")
+            self._rate_limiter.succeeded()
+            return text
+
+    def __request(
+        self,
+        system_prompt_template: jinja2.Template,
+        template_data: dict[str, Any],
+        user_prompt: str,
+        response_schema: Optional[dict[str, Any]],
+    ) -> tuple[str, str | dict, Optional[str]]:
+        system_prompt = system_prompt_template.render(**template_data)
+        response_format = response_schema or "json"
+        cache_key = None
+        if self._response_cache is not None:
+            cache_key = self._response_cache.key(
+                self.cache_key, system_prompt, user_prompt, response_format
+            )
+        return system_prompt, response_format, cache_key
+
+    def __cached(self, cache_key: Optional[str]) -> Optional[dict[str, Any]]:
+        if cache_key is None:
+            return None
+        cached = self._response_cache.get(cache_key)
+        if self._metrics is not None and cached:
+            self._metrics.cache_hit()
+        elif self._metrics is not None:
+            self._metrics.cache_miss()
+        return json.loads(cached) if cached else None
+
+    def __answered(
+        self, cache_key: Optional[str], answer_text: str, answer_obj: dict[str, Any]
+    ) -> dict[str, Any]:
+        if cache_key is not None:
+            self._response_cache.put(cache_key, self.cache_key, answer_text)
+        return answer_obj
+
+    def __report_failed_attempt(self, err: ValueError, attempts: int) -> None:
+        if isinstance(err, json.JSONDecodeError):
+            message = f"decoding LLM answer as JSON failed; {attempts} retries left"
+        else:
+            message = f"value error while generating text; {attempts} retries left"
+        self._error_callback(message, err)
+        if self._metrics is None:
+            return
+        if isinstance(err, json.JSONDecodeError):
+            self._metrics.json_decode_failure()
+        if attempts > 1:
+            self._metrics.retry("invalid_answer")
+
     def generate_json(
         self,
         system_prompt_template: jinja2.Template,
         template_data: dict[str, Any],
         user_prompt: str,
         response_schema: Optional[dict[str, Any]] = None,
+        refresh: bool = False,
     ) -> dict[str, Any]:
-        answered = False
-        answer_text = ""
-        answer_obj: dict[str, Any] = {}
-        attempts = self.__max_retries
+        """Ask the LLM for a JSON answer, retrying answers that aren't JSON.
+
+        With a response cache, a cached answer to the same request is returned
+        without contacting the provider, unless ``refresh`` is set; a fresh
+        answer then replaces it.
+        """
+        system_prompt, response_format, cache_key = self.__request(
+            system_prompt_template, template_data, user_prompt, response_schema
+        )
+        if not refresh and (cached := self.__cached(cache_key)) is not None:
+            return cached
 
-        while not answered and attempts > 0:
+        answer_text = ""
+        for attempts in range(self.__max_retries, 0, -1):
             try:
-                system_prompt = system_prompt_template.render(**template_data)
-                llm_text = self._generate_text(
-                    system_prompt, user_prompt, response_schema or "json"
-                )
-                answer_text = self.__regex.sub(r"\1", llm_text)
-                answer_obj = json.loads(answer_text)
-                answered = True
-            except json.JSONDecodeError as err:
-                self._error_callback(
-                    f"decoding LLM answer as JSON failed; {attempts} retries left", err
+                llm_text = self.__generate_text_within_limits(
+                    system_prompt, user_prompt, response_format
                 )
+                answer_text = _strip_code_fences(llm_text)
+                return self.__answered(cache_key, answer_text, json.loads(answer_text))
             except ValueError as err:
-                self._error_callback(
-                    f"value error while generating text; {attempts} retries left", err
-                )
-            finally:
-                attempts -= 1
+                self.__report_failed_attempt(err, attempts)
+        raise ValueError(f"LLM answered non-JSON value: {answer_text!r}")
 
-        if not answered and attempts == 0:
-            raise ValueError(f"LLM answered non-JSON value: {answer_text!r}")
+    async def agenerate_json(
+        self,
+        system_prompt_template: jinja2.Template,
+        template_data: dict[str, Any],
+        user_prompt: str,
+        response_schema: Optional[dict[str, Any]] = None,
+        refresh: bool = False,
+    ) -> dict[str, Any]:
+        """Async counterpart of :meth:`generate_json`.
 
-        return answer_obj
+        Many requests can be awaited concurrently from one event loop; they
+        share the generator's rate limiter, response cache and, for providers
+        with an async client, its connection pool.
+        """
+        system_prompt, response_format, cache_key = self.__request(
+            system_prompt_template, template_data, user_prompt, response_schema
+        )
+        if not refresh and (cached := self.__cached(cache_key)) is not None:
+            return cached
+
+        answer_text = ""
+        for attempts in range(self.__max_retries, 0, -1):
+            try:
+                llm_text = await self.__agenerate_text_within_limits(
+                    system_prompt, user_prompt, response_format
+                )
+                answer_text = _strip_code_fences(llm_text)
+                return self.__answered(cache_key, answer_text, json.loads(answer_text))
+            except ValueError as err:
+                self.__report_failed_attempt(err, attempts)
+        raise ValueError(f"LLM answered non-JSON value: {answer_text!r}")
 
 
 class LLMProviderBase(ABC):
@@ -77,11 +302,54 @@ class LLMProviderBase(ABC):
         on_error: Optional[ErrorCallback] = None,
         on_thinking: Optional[ErrorCallback] = None,
         on_text: Optional[ErrorCallback] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        token_usage: Optional[TokenUsage] = None,
+        metrics: Optional[MetricsRegistry] = None,
     ) -> None:
         self._model_name = model
         self._error_callback = on_error
         self._thinking_callback = on_thinking
         self._text_callback = on_text
+        self._rate_limiter = rate_limiter
+        self._response_cache = response_cache
+        self._token_usage = token_usage
+        self._metrics = (
+            None
+            if metrics is None
+            else LLMMetrics(metrics, self.provider_name, self._model_name)
+        )
+        self.__async_client = None
+        self.__async_client_lock = threading.Lock()
+
+    def _new_async_client(self) -> Any:
+        """Create the provider SDK's async client, or ``None`` if it has none."""
+        return None
+
+    def _async_client(self) -> Any:
+        """Return the async client shared by every generator of the provider.
+
+        The client is created on first use, so all async requests of a run go
+        through one connection pool.
+        """
+        with self.__async_client_lock:
+            if self.__async_client is None:
+                self.__async_client = self._new_async_client()
+            return self.__async_client
+
+    async def _close_async_client(self, client: Any) -> None:
+        await client.close()
+
+    async def aclose(self) -> None:
+        """Close the connections of the shared async client, if one was created."""
+        with self.__async_client_lock:
+            client, self.__async_client = self.__async_client, None
+        if client is not None:
+            await self._close_async_client(client)
+
+    @property
+    def provider_name(self) -> str:
+        return type(self).__name__.removesuffix("Provider").lower()
 
     @abstractmethod
     def ensure_model(self) -> bool:
@@ -92,3 +360,104 @@ class LLMProviderBase(ABC):
         self, max_retries: int = 1, thinking: bool = False
     ) -> JSONGenerator:
         pass
+
+    def _record_usage(
+        self,
+        input_tokens: int,
+        cached_input_tokens: int = 0,
+        output_tokens: Optional[int] = 0,
+    ) -> None:
+        if self._token_usage is not None:
+            self._token_usage.record(input_tokens, cached_input_tokens)
+        if self._metrics is not None:
+            self._metrics.tokens(input_tokens, cached_input_tokens, output_tokens)
+
+    @property
+    def supports_batches(self) -> bool:
+        """Whether the provider can answer requests through a batch interface."""
+        return isinstance(self, BatchProviderMixin)
+
+
+class BatchProviderMixin(ABC):
+    """Answers requests through the batch interface of a provider.
+
+    Mixed into the providers that have one, ahead of :class:`LLMProviderBase`.
+    """
+
+    @abstractmethod
+    def _submit_batch(self, requests: list[BatchRequest]) -> str:
+        """Submit ``requests`` as one batch and return the batch identifier."""
+
+    @abstractmethod
+    def _batch_status(self, batch_id: str) -> BatchStatus:
+        pass
+
+    @abstractmethod
+    def _batch_results(self, batch_id: str) -> Iterator[tuple[str, str | Exception]]:
+        """Yield the answer text, or the error, of each request in the batch."""
+
+    def _batch_state(self, batch_id: str) -> dict[str, Any]:
+        """Return what another process needs to collect the batch's results."""
+        return {}
+
+    def _restore_batch(self, batch_id: str, state: dict[str, Any]) -> None:
+        pass
+
+    def generate_json_batch(
+        self,
+        system_prompt_template: jinja2.Template,
+        template_data: dict[str, Any],
+        user_prompts: dict[str, str],
+        response_schema: Optional[dict[str, Any]] = None,
+        poll_seconds: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        submitted: Optional[dict[str, Any]] = None,
+        on_submitted: Optional[Callable[[dict[str, Any]], None]] = None,
+    ) -> Iterator[tuple[str, dict[str, Any] | Exception]]:
+        """Answer every ``user_prompts`` value in one provider-side batch.
+
+        Submits the batch, waits for the provider to finish it, and yields
+        ``(key, answer)`` pairs, where ``answer`` is the decoded JSON or the
+        exception explaining why the request has no usable answer. Batches
+        take minutes to hours; ``poll_seconds`` sets how often their status is
+        checked.
+
+        The submitted batch is passed to ``on_submitted`` before waiting for
+        it, so that a later run can pass it back as ``submitted`` to collect
+        its answers instead of submitting the requests again.
+        """
+        if submitted is None:
+            system_prompt = system_prompt_template.render(**template_data)
+            response_format = response_schema or "json"
+            batch_id = self._submit_batch(
+                [
+                    BatchRequest(key, system_prompt, user_prompt, response_format)
+                    for key, user_prompt in user_prompts.items()
+                ]
+            )
+            log.info("submitted batch %s of %d requests", batch_id, len(user_prompts))
+            if on_submitted is not None:
+                on_submitted({"id": batch_id, "state": self._batch_state(batch_id)})
+        else:
+            batch_id = submitted["id"]
+            self._restore_batch(batch_id, submitted.get("state", {}))
+            log.info("collecting batch %s submitted by an earlier run", batch_id)
+        while (status := self._batch_status(batch_id)) == BatchStatus.running:
+            sleep(poll_seconds)
+        if status == BatchStatus.failed:
+            raise BatchError(f"provider failed batch {batch_id}")
+
+        unanswered = dict.fromkeys(user_prompts)
+        for key, answer in self._batch_results(batch_id):
+            if key not in unanswered:
+                continue
+            del unanswered[key]
+            if isinstance(answer, Exception):
+                yield key, answer
+                continue
+            try:
+                yield key, json.loads(_strip_code_fences(answer))
+            except ValueError as err:
+                yield key, ValueError(f"LLM answered non-JSON value: {answer!r}", err)
+        for key in unanswered:
+            yield key, ValueError(f"batch {batch_id} has no answer for {key}")
@@ -0,0 +1,148 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+_THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException"}
+# refills are inexact, so treat a bucket this close to sufficient as sufficient
+_EPSILON = 1e-6
+
+
+def is_throttling_error(err: BaseException) -> bool:
+    """Whether ``err`` is a provider's way of saying "too many requests"."""
+    for attr in ("status_code", "code", "status"):
+        if getattr(err, attr, None) == 429:
+            return True
+    response = getattr(err, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code") in _THROTTLING_CODES
+    return getattr(response, "status_code", None) == 429
+
+
+def estimate_tokens(*texts: str) -> int:
+    # roughly four characters per token for English prose
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = None
+
+    def refill(self, now: float, rate_factor: float) -> None:
+        if self.updated is not None:
+            elapsed = now - self.updated
+            self.level = min(
+                self.capacity, self.level + elapsed * self.rate * rate_factor
+            )
+        self.updated = now
+
+    def wait_time(self, amount: float, rate_factor: float) -> float:
+        # requests larger than the bucket only wait for a full bucket and then
+        # leave it in debt, so they are delayed but never starved
+        needed = min(amount, self.capacity) - self.level
+        return 0.0 if needed <= _EPSILON else needed / (self.rate * rate_factor)
+
+
+class RateLimiter:
+    """Shared request and token budget for the calls made to an LLM provider.
+
+    Every request first acquires one request from the requests-per-minute
+    budget and its estimated prompt tokens from the tokens-per-minute budget,
+    waiting only as long as needed to stay within them. Budgets that are not
+    set are unlimited.
+
+    When the provider throttles a request anyway, all callers back off
+    exponentially and the budgets are halved; they recover gradually as
+    requests succeed again.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        max_backoff_seconds: float = 60.0,
+        max_throttle_retries: int = 6,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.__requests = (
+            None
+            if requests_per_minute is None
+            else _TokenBucket(requests_per_minute, burst_seconds)
+        )
+        self.__tokens = (
+            None
+            if tokens_per_minute is None
+            else _TokenBucket(tokens_per_minute, burst_seconds)
+        )
+        self.__max_backoff = max_backoff_seconds
+        self.__max_throttle_retries = max_throttle_retries
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__lock = threading.Lock()
+        self.__rate_factor = 1.0
+        self.__throttled = 0
+        self.__blocked_until = 0.0
+
+    @property
+    def max_throttle_retries(self) -> int:
+        return self.__max_throttle_retries
+
+    @property
+    def rate_factor(self) -> float:
+        return self.__rate_factor
+
+    def __buckets(self, tokens: int) -> list[tuple[_TokenBucket, float]]:
+        buckets = []
+        if self.__requests is not None:
+            buckets.append((self.__requests, 1.0))
+        if self.__tokens is not None:
+            buckets.append((self.__tokens, float(tokens)))
+        return buckets
+
+    def __try_acquire(self, tokens: int) -> float:
+        """Take the budget of a request, or return how long to wait for it."""
+        with self.__lock:
+            now = self.__clock()
+            buckets = self.__buckets(tokens)
+            for bucket, _ in buckets:
+                bucket.refill(now, self.__rate_factor)
+            delay = max(
+                [self.__blocked_until - now]
+                + [b.wait_time(amount, self.__rate_factor) for b, amount in buckets]
+            )
+            if delay <= 0:
+                for bucket, amount in buckets:
+                    bucket.level -= amount
+            return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request using ``tokens`` prompt tokens may be sent."""
+        while (delay := self.__try_acquire(tokens)) > 0:
+            self.__sleep(delay)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Wait without blocking the event loop until a request may be sent."""
+        while (delay := self.__try_acquire(tokens)) > 0:
+            await asyncio.sleep(delay)
+
+    def throttled(self) -> None:
+        """Record that the provider rejected a request for exceeding its limits."""
+        with self.__lock:
+            backoff = min(self.__max_backoff, 2.0**self.__throttled)
+            self.__throttled += 1
+            self.__rate_factor = max(0.05, self.__rate_factor / 2)
+            self.__blocked_until = max(
+                self.__blocked_until,
+                self.__clock() + backoff * random.uniform(0.5, 1.0),
+            )
+
+    def succeeded(self) -> None:
+        with self.__lock:
+            self.__throttled = 0
+            self.__rate_factor = min(1.0, self.__rate_factor * 1.25)
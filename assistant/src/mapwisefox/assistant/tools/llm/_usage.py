@@ -0,0 +1,34 @@
+import threading
+
+
+class TokenUsage:
+    """Prompt tokens reported by the LLM provider, summed over requests.
+
+    ``cached_input_tokens`` counts the prompt tokens the provider read from
+    its prompt cache instead of processing them again. One instance is shared
+    by every generator of a run, so it's safe to update from several threads.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__requests = 0
+        self.__input_tokens = 0
+        self.__cached_input_tokens = 0
+
+    @property
+    def requests(self) -> int:
+        return self.__requests
+
+    @property
+    def input_tokens(self) -> int:
+        return self.__input_tokens
+
+    @property
+    def cached_input_tokens(self) -> int:
+        return self.__cached_input_tokens
+
+    def record(self, input_tokens: int, cached_input_tokens: int = 0) -> None:
+        with self.__lock:
+            self.__requests += 1
+            self.__input_tokens += input_tokens or 0
+            self.__cached_input_tokens += cached_input_tokens or 0
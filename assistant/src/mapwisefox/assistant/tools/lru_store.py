@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+
+class SQLiteLRUStore:
+    """Compressed texts in one SQLite table, evicted least recently used first.
+
+    Each row holds a key, the ``columns`` describing the text, its compressed
+    size, the time it was last read or written, and the compressed text. The
+    total size of the stored texts is read once when the database is opened
+    and kept up to date by :meth:`put`, so the oldest rows are only queried
+    when a write takes the store over ``max_size_bytes``.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        table: str,
+        columns: Sequence[str],
+        max_size_bytes: int,
+    ) -> None:
+        self.__path = Path(path).resolve()
+        self.__table = table
+        self.__columns = tuple(columns)
+        self.__max_size_bytes = max_size_bytes
+        self.__lock = threading.Lock()
+        self.__db: sqlite3.Connection | None = None
+        self.__total_size = 0
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def __connection(self) -> sqlite3.Connection:
+        if self.__db is None:
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            self.__db = sqlite3.connect(self.__path, check_same_thread=False)
+            columns = "".join(f"{c} TEXT NOT NULL, " for c in self.__columns)
+            self.__db.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.__table} (
+                    key TEXT PRIMARY KEY,
+                    {columns}size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    contents BLOB NOT NULL
+                )"""
+            )
+            self.__db.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.__table}_lru"
+                f" ON {self.__table} (last_access)"
+            )
+            self.__db.commit()
+            (self.__total_size,) = self.__db.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM {self.__table}"
+            ).fetchone()
+        return self.__db
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Hold the store's connection to run further statements on its database."""
+        with self.__lock:
+            db = self.__connection()
+            yield db
+            db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.transaction() as db:
+            row = db.execute(
+                f"SELECT contents FROM {self.__table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                f"UPDATE {self.__table} SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return zlib.decompress(row[0]).decode()
+
+    def put(self, key: str, text: str, *values: str) -> None:
+        """Store ``text`` under ``key``, described by a value for each column."""
+        contents = zlib.compress(text.encode())
+        placeholders = ", ".join("?" * (len(self.__columns) + 4))
+        with self.transaction() as db:
+            replaced = db.execute(
+                f"SELECT size FROM {self.__table} WHERE key = ?", (key,)
+            ).fetchone()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.__table} VALUES ({placeholders})",
+                (key, *values, len(contents), time.time(), contents),
+            )
+            self.__total_size += len(contents) - (replaced[0] if replaced else 0)
+            if self.__total_size > self.__max_size_bytes:
+                self.__evict(db)
+
+    def __evict(self, db: sqlite3.Connection) -> None:
+        evicted = []
+        rows = db.execute(f"SELECT key, size FROM {self.__table} ORDER BY last_access")
+        for key, size in rows:
+            if self.__total_size <= self.__max_size_bytes:
+                break
+            evicted.append((key,))
+            self.__total_size -= size
+        rows.close()
+        db.executemany(f"DELETE FROM {self.__table} WHERE key = ?", evicted)
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
@@ -3,7 +3,10 @@ from mapwisefox.assistant.tools.pdf._base import (
     FileContentsExtractionError,
     ExtractionFailureReason,
 )
-from mapwisefox.assistant.tools.pdf._caching import CachingFileContentsExtractor
+from mapwisefox.assistant.tools.pdf._caching import (
+    CachingFileContentsExtractor,
+    ExtractionCache,
+)
 from mapwisefox.assistant.tools.pdf._preprocessor import ensure_page_dimensions
 
 __all__ = [
@@ -11,5 +14,6 @@ __all__ = [
     "FileContentsExtractor",
     "FileContentsExtractionError",
     "CachingFileContentsExtractor",
+    "ExtractionCache",
     "ensure_page_dimensions",
 ]
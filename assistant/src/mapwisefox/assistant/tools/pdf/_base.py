@@ -8,6 +8,16 @@ class FileContentsExtractor(ABC):
     def read_file(self, file: str | Path) -> str:
         pass
 
+    @property
+    def cache_key(self) -> str:
+        """Identify the configuration that determines this extractor's output.
+
+        Extractors whose output depends on options (resolution, models, ...)
+        must include them, so cached texts are never shared between differently
+        configured extractors.
+        """
+        return type(self).__qualname__
+
 
 class ExtractionFailureReason(StrEnum):
     Generic = "uncaught error"
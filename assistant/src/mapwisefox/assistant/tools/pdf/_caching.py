@@ -1,19 +1,140 @@
+import hashlib
+import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
+from mapwisefox.assistant.tools.lru_store import SQLiteLRUStore
 from mapwisefox.assistant.tools.pdf import FileContentsExtractor
 
 
+_CACHE_FORMAT_VERSION = 1
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def _file_sha256(file: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed store of extracted document texts.
+
+    Entries are keyed on the SHA-256 of the source document and the
+    ``cache_key`` of the extractor that produced them, and stored compressed
+    in a single SQLite database. When the stored texts exceed
+    ``max_size_bytes``, the least recently used entries are evicted.
+
+    The digest of each document is stored with its size and modification
+    time, so warm runs only hash documents that changed since they were
+    last seen.
+    """
+
+    FILE_NAME = ".extraction-cache.sqlite3"
+
+    def __init__(self, cache_dir: Path, max_size_bytes: int = 512 * 2**20) -> None:
+        self.__store = SQLiteLRUStore(
+            Path(cache_dir) / self.FILE_NAME,
+            "extractions",
+            ("document_sha256", "extractor"),
+            max_size_bytes,
+        )
+        self.__hashes: dict[tuple[Path, int, int], str] = {}
+        self.__hash_table_ready = False
+
+    @property
+    def path(self) -> Path:
+        return self.__store.path
+
+    @contextmanager
+    def __hash_table(self) -> Iterator[sqlite3.Connection]:
+        with self.__store.transaction() as db:
+            if not self.__hash_table_ready:
+                db.execute(
+                    """CREATE TABLE IF NOT EXISTS document_hashes (
+                        path TEXT PRIMARY KEY,
+                        size INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        sha256 TEXT NOT NULL
+                    )"""
+                )
+                self.__hash_table_ready = True
+            yield db
+
+    def __stored_hash(self, file: Path, size: int, mtime_ns: int) -> str | None:
+        with self.__hash_table() as db:
+            row = db.execute(
+                "SELECT sha256 FROM document_hashes"
+                " WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (str(file), size, mtime_ns),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def __store_hash(self, file: Path, size: int, mtime_ns: int, digest: str):
+        with self.__hash_table() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO document_hashes VALUES (?, ?, ?, ?)",
+                (str(file), size, mtime_ns, digest),
+            )
+
+    def document_hash(self, file: Path) -> str:
+        stat = file.stat()
+        memo_key = (file, stat.st_size, stat.st_mtime_ns)
+        if (digest := self.__hashes.get(memo_key)) is not None:
+            return digest
+        # the content is read only when the file changed since it was hashed
+        digest = self.__stored_hash(*memo_key)
+        if digest is None:
+            digest = _file_sha256(file)
+            self.__store_hash(*memo_key, digest)
+        self.__hashes[memo_key] = digest
+        return digest
+
+    @staticmethod
+    def key(document_sha256: str, extractor_key: str) -> str:
+        material = f"{_CACHE_FORMAT_VERSION}:{document_sha256}:{extractor_key}"
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        return self.__store.get(key)
+
+    def put(self, key: str, document_sha256: str, extractor_key: str, text: str):
+        self.__store.put(key, text, document_sha256, extractor_key)
+
+    def close(self) -> None:
+        self.__store.close()
+
+    def __enter__(self) -> "ExtractionCache":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
 class CachingFileContentsExtractor(FileContentsExtractor):
-    def __init__(self, cache_dir: Path, extractor: FileContentsExtractor) -> None:
-        self.__cache_dir = Path(cache_dir).resolve()
+    def __init__(
+        self, cache: ExtractionCache | Path, extractor: FileContentsExtractor
+    ) -> None:
+        self.__cache = (
+            cache if isinstance(cache, ExtractionCache) else ExtractionCache(cache)
+        )
         self.__extractor = extractor
 
+    @property
+    def cache_key(self) -> str:
+        return self.__extractor.cache_key
+
     def read_file(self, file: str | Path) -> str:
-        cached_file_path = self.__cache_dir / f"{file.stem}.txt"
-        if cached_file_path.exists():
-            return cached_file_path.read_text()
+        file = Path(file).resolve()
+        document_sha256 = self.__cache.document_hash(file)
+        extractor_key = str(self.__extractor.cache_key)
+        key = self.__cache.key(document_sha256, extractor_key)
+        if (text := self.__cache.get(key)) is not None:
+            return text
 
         text = self.__extractor.read_file(file)
-        self.__cache_dir.mkdir(parents=True, exist_ok=True)
-        cached_file_path.write_text(text)
+        self.__cache.put(key, document_sha256, extractor_key, text)
         return text
@@ -1,7 +1,13 @@
 import gc
-from multiprocessing import Lock, Pipe, Process
+import os
+import sys
+import threading
+import weakref
+from importlib.metadata import PackageNotFoundError, version
+from multiprocessing import Pipe, Process
 from multiprocessing.connection import Connection
 from pathlib import Path
+from queue import Queue
 from typing import Callable
 
 import torch
@@ -18,18 +24,171 @@ from mapwisefox.assistant.tools.pdf._base import (
 )
 
 
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # peak rather than current RSS, reported in bytes on macOS and in KiB elsewhere
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _convert(
+    converter: DocumentConverter, fpath: Path, error_callback: Callable
+) -> tuple[bool, str]:
+    backend = None
+    try:
+        conversion_result = converter.convert(fpath)
+        backend = conversion_result.input._backend
+        return True, conversion_result.document.export_to_markdown()
+    except ConversionError:
+        error_callback("failed to convert %r", fpath.name)
+        return False, "conversion error"
+    except Exception as exc:
+        error_callback("failed to process %r: %s", fpath.name, exc)
+        return False, "unhandled error"
+    finally:
+        if backend is not None:
+            backend.unload()
+            del backend
+        if torch.backends.mps.is_available() and torch.backends.mps.is_built():
+            torch.mps.empty_cache()
+        gc.collect()
+
+
+def _docling_worker(
+    conn: Connection,
+    format_options: dict[InputFormat, PdfFormatOption],
+    error_callback: Callable,
+) -> None:
+    # the converter, and the models it loads, live as long as the worker
+    converter = DocumentConverter(format_options=format_options)
+    try:
+        while (fpath := conn.recv()) is not None:
+            ok, result = _convert(converter, Path(fpath), error_callback)
+            conn.send((ok, result, _rss_bytes()))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+class _DoclingWorker:
+    def __init__(
+        self,
+        format_options: dict[InputFormat, PdfFormatOption],
+        error_callback: Callable,
+    ) -> None:
+        self.__conn, worker_conn = Pipe()
+        self.__process = Process(
+            target=_docling_worker,
+            args=(worker_conn, format_options, error_callback),
+        )
+        self.__process.start()
+        self.documents = 0
+        self.baseline_rss: int | None = None
+        self.rss = 0
+
+    def convert(self, fpath: Path, timeout_seconds: float) -> tuple[bool, str] | None:
+        """Convert a document, returning ``None`` if it times out."""
+        self.__conn.send(str(fpath))
+        if not self.__conn.poll(timeout=timeout_seconds):
+            return None
+        try:
+            ok, result, self.rss = self.__conn.recv()
+        except EOFError:
+            return False, f"worker exited with code {self.__process.exitcode}"
+        self.documents += 1
+        if self.baseline_rss is None:
+            # measured after the first document, once the models are loaded
+            self.baseline_rss = self.rss
+        return ok, result
+
+    @property
+    def is_alive(self) -> bool:
+        return self.__process.is_alive()
+
+    @property
+    def rss_growth(self) -> int:
+        return self.rss - (self.baseline_rss or self.rss)
+
+    def stop(self, timeout_seconds: float = 5.0) -> None:
+        try:
+            self.__conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.__process.join(timeout_seconds)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.__process.exitcode is None:
+            self.__process.terminate()
+            self.__process.join()
+        self.__conn.close()
+
+
+def _stop_workers(workers: set[_DoclingWorker]) -> None:
+    for worker in list(workers):
+        worker.stop()
+    workers.clear()
+
+
 class DoclingExtractor(FileContentsExtractor):
     def __init__(
         self,
         docling_artifacts_path: Path | None = None,
         error_callback: Callable | None = None,
         timeout_seconds: float = 60.0,
+        workers: int = 1,
+        max_documents_per_worker: int = 50,
+        max_worker_rss_growth_mb: int | None = 2048,
     ):
+        """Initialize a new Docling extractor.
+
+        Documents are converted by a pool of long-lived worker processes,
+        started on first use, each loading the Docling models once.
+
+        :param timeout_seconds: the maximum time a worker may spend converting
+            a single document before it is terminated. Default=**``60.0``**
+        :param workers: the number of documents converted in parallel.
+            Default=**``1``**
+        :param max_documents_per_worker: a worker is replaced after converting
+            this many documents. Default=**``50``**
+        :param max_worker_rss_growth_mb: a worker is replaced when its resident
+            memory has grown by more than this since its first document; ``None``
+            disables the check. Default=**``2048``**
+        """
         pdf_options = self.__pdf_pipeline_options(docling_artifacts_path)
         self._format_options = self.__create_format_options(pdf_options)
         self._error_callback = error_callback or self._noop_error_callback
         self._timeout_seconds = timeout_seconds
-        self.__lock = Lock()
+        self.__max_documents = max(1, max_documents_per_worker)
+        self.__max_rss_growth = (
+            None
+            if max_worker_rss_growth_mb is None
+            else max_worker_rss_growth_mb * 2**20
+        )
+        # idle slots hold a running worker, or None until one is needed
+        self.__idle: Queue[_DoclingWorker | None] = Queue()
+        for _ in range(max(1, workers)):
+            self.__idle.put(None)
+        self.__workers: set[_DoclingWorker] = set()
+        self.__workers_lock = threading.Lock()
+        self.__finalizer = weakref.finalize(self, _stop_workers, self.__workers)
+
+    @property
+    def cache_key(self) -> str:
+        try:
+            docling_version = version("docling")
+        except PackageNotFoundError:
+            docling_version = "unknown"
+        return f"{type(self).__qualname__}(docling={docling_version}, ocr=True, tables=True)"
 
     @classmethod
     def _noop_error_callback(cls, *_, **__):
@@ -60,65 +219,63 @@ class DoclingExtractor(FileContentsExtractor):
 
         return options
 
-    def _docling_process(self, conn: Connection, fpath: Path):
-        backend = None
-        converter = DocumentConverter(format_options=self._format_options)
-        try:
-            conversion_result = converter.convert(fpath)
-            backend = conversion_result.input._backend
-            doc = conversion_result.document
-            conn.send(doc.export_to_markdown())
-        except ConversionError:
-            self._error_callback("failed to convert %r", fpath.name)
-            conn.send("conversion error")
-            raise
-        except Exception as exc:
-            self._error_callback("failed to process %r: %s", fpath.name, exc)
-            conn.send("unhandled error")
-            raise
-        finally:
-            if backend is not None:
-                backend.unload()
-                del backend
-            del converter
-            if torch.backends.mps.is_available() and torch.backends.mps.is_built():
-                torch.mps.empty_cache()
-            gc.collect()
+    def __start_worker(self) -> _DoclingWorker:
+        worker = _DoclingWorker(self._format_options, self._error_callback)
+        with self.__workers_lock:
+            self.__workers.add(worker)
+        return worker
+
+    def __retire(self, worker: _DoclingWorker, graceful: bool = True) -> None:
+        with self.__workers_lock:
+            self.__workers.discard(worker)
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+
+    def __is_worn_out(self, worker: _DoclingWorker) -> bool:
+        return worker.documents >= self.__max_documents or (
+            self.__max_rss_growth is not None
+            and worker.rss_growth > self.__max_rss_growth
+        )
 
     def read_file(self, file: str | Path) -> str:
-        result = ""
-        timed_out = True
+        fpath = Path(file).resolve()
+        worker = self.__idle.get()
         try:
-            fpath = Path(file).resolve()
-            self.__lock.acquire()
-            recv_conn, send_conn = Pipe()
-            process = Process(
-                target=self._docling_process,
-                args=(send_conn, fpath),
-            )
-            process.start()
-
-            if recv_conn.poll(timeout=self._timeout_seconds):
-                result = recv_conn.recv()
-                timed_out = False
-            else:
-                process.terminate()
-            process.join()
-        except Exception as exc:
-            raise FileContentsExtractionError(
-                ExtractionFailureReason.Generic, file, str(exc)
-            )
-        finally:
-            self.__lock.release()
+            try:
+                worker = worker or self.__start_worker()
+                response = worker.convert(fpath, self._timeout_seconds)
+            except Exception as exc:
+                if worker is not None:
+                    self.__retire(worker, graceful=False)
+                    worker = None
+                raise FileContentsExtractionError(
+                    ExtractionFailureReason.Generic, file, str(exc)
+                )
 
-        if timed_out:
-            raise FileContentsExtractionError(ExtractionFailureReason.Timeout, fpath)
-        if process.exitcode != 0:
-            raise FileContentsExtractionError(
-                ExtractionFailureReason.BackendError, fpath, result
-            )
+            if response is None:
+                self.__retire(worker, graceful=False)
+                worker = None
+                raise FileContentsExtractionError(
+                    ExtractionFailureReason.Timeout, fpath
+                )
+            if not worker.is_alive or self.__is_worn_out(worker):
+                self.__retire(worker)
+                worker = None
+
+            ok, result = response
+            if not ok:
+                raise FileContentsExtractionError(
+                    ExtractionFailureReason.BackendError, fpath, result
+                )
+            return result
+        finally:
+            self.__idle.put(worker)
 
-        return result
+    def close(self) -> None:
+        """Stop all worker processes."""
+        self.__finalizer()
 
 
 if __name__ == "__main__":
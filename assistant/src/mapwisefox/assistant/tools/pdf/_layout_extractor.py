@@ -1,21 +1,64 @@
 import itertools
-import os
 import shutil
+import threading
+import time
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, wait
-from functools import partial
+from dataclasses import dataclass, field
 from pathlib import Path
 from types import ModuleType
+from typing import Iterable, Iterator
 
+import numpy as np
 from PIL.PpmImagePlugin import PpmImageFile
 from layoutparser.elements import layout_elements
 from layoutparser.models import AutoLayoutModel
 from PIL import ImageDraw
 
-from mapwisefox.assistant.tools.pdf._types import LayoutBox, Rect, Point, Size
+from mapwisefox.assistant.tools.pdf._spatial import RectIndex, greedy_overlap_merge
+from mapwisefox.assistant.tools.pdf._types import LayoutBlocks, LayoutBox, Size
+from mapwisefox.assistant.tools.pipeline import pipelined
+
+
+@dataclass
+class LayoutStats:
+    """Statistics of the last layout extraction.
+
+    Times are in nanoseconds; ``model_load_ns`` is zero whenever an already
+    loaded model was reused. ``peak_page_bytes`` is the largest amount of
+    rendered page image data held in memory at once.
+    """
+
+    model_load_ns: int = 0
+    render_ns: int = 0
+    inference_ns: int = 0
+    pages: int = 0
+    peak_page_bytes: int = 0
+
+
+@dataclass
+class DocumentLayout:
+    file_path: Path
+    image_sizes: dict[int, Size] = field(default_factory=dict)
+    layout_blocks: dict[int, LayoutBlocks] = field(default_factory=dict)
+
+    @property
+    def page_layouts(self) -> dict[int, list[LayoutBox]]:
+        layouts = defaultdict(list)
+        for page_no, blocks in self.layout_blocks.items():
+            layouts[page_no] = blocks.to_boxes()
+        return layouts
+
+
+def _identity(item):
+    return item
 
 
 class PdfLayoutExtractor:
+    # layout models are expensive to build, so they are shared by every
+    # extractor in the process that uses the same model configuration
+    __models: dict[tuple, AutoLayoutModel] = {}
+    __models_lock = threading.Lock()
+
     @staticmethod
     def __ensure_poppler() -> ModuleType:
         """
@@ -59,6 +102,9 @@ Then re-run the extractor."""
         label_map: dict[int, str] = None,
         min_merge_overlap_ratio=0.5,
         debug: bool = False,
+        batch_size: int = 4,
+        max_queued_pages: int = 8,
+        pages_per_render: int = 4,
     ):
         """Initialize a new layout extractor.
 
@@ -79,6 +125,12 @@ Then re-run the extractor."""
         smaller one of the boxes at least by this factor. Default=**``0.9``**.
         :param debug: whether to generate debug images with layout boxes plotted
         on the extracted PDF page. Default=**``False``**
+        :param batch_size: the number of page images passed to the layout model
+        at once. Default=**``4``**
+        :param max_queued_pages: the maximum number of rendered page images
+        waiting for layout inference. Default=**``8``**
+        :param pages_per_render: the number of pages rendered to images by each
+        Poppler invocation. Default=**``4``**
         """
         self.__config_path = config_path
         self.__model_path = model_path
@@ -90,9 +142,15 @@ Then re-run the extractor."""
             5: "Figure",
         }
         self.__overlap_min = min_merge_overlap_ratio
-        self.__layout_boxes: dict[int, list[LayoutBox]] = defaultdict(list)
+        self.__layout_blocks: dict[int, LayoutBlocks] = {}
         self.__image_sizes: dict[int, Size] = {}
         self.__dpi = dpi
+        self.__batch_size = max(1, batch_size)
+        self.__max_queued_pages = max(1, max_queued_pages)
+        self.__pages_per_render = max(1, pages_per_render)
+        self.__page_bytes = 0
+        self.__page_bytes_lock = threading.Lock()
+        self.__stats = LayoutStats()
         self.__init_debug_images__(debug)
 
     def __init_debug_images__(self, debug: bool):
@@ -112,43 +170,205 @@ Then re-run the extractor."""
     def image_sizes(self) -> dict[int, Size]:
         return self.__image_sizes
 
+    @property
+    def layout_blocks(self) -> dict[int, LayoutBlocks]:
+        return self.__layout_blocks
+
     @property
     def page_layouts(self) -> dict[int, list[LayoutBox]]:
-        return self.__layout_boxes
+        layouts = defaultdict(list)
+        for page_no, blocks in self.__layout_blocks.items():
+            layouts[page_no] = blocks.to_boxes()
+        return layouts
+
+    @property
+    def stats(self) -> LayoutStats:
+        return self.__stats
+
+    @property
+    def __model_key(self) -> tuple:
+        return (
+            self.__config_path,
+            self.__model_path,
+            tuple(sorted(self.__label_map.items())),
+        )
+
+    def __load_model(self) -> tuple[AutoLayoutModel, int]:
+        key = self.__model_key
+        with self.__models_lock:
+            if (model := self.__models.get(key)) is not None:
+                return model, 0
+            start = time.perf_counter_ns()
+            model = AutoLayoutModel(
+                config_path=self.__config_path,
+                model_path=self.__model_path,
+                label_map=self.__label_map,
+                extra_config=dict(weights_only=False),
+            )
+            self.__models[key] = model
+            return model, time.perf_counter_ns() - start
+
+    def warm_up(self) -> int:
+        """Load the layout model ahead of the first extraction.
+
+        :return: the time spent loading the model, in nanoseconds; zero if it
+            was already loaded.
+        """
+        return self.__load_model()[1]
+
+    def unload(self) -> None:
+        """Release the layout model, so it is loaded again on next use."""
+        with self.__models_lock:
+            self.__models.pop(self.__model_key, None)
 
     @classmethod
     def __is_supported(cls, element: layout_elements.TextBlock) -> bool:
         return element.type in {"Text", "List", "Title"}
 
-    @classmethod
-    def __to_layout_box(cls, element: layout_elements.TextBlock) -> LayoutBox:
-        x0, y0, x1, y1 = element.block.coordinates
-        return LayoutBox(
-            types=[], bounds=Rect(Point(x0, y0), Point(x1, y1))
-        ).ensure_type(element.type)
-
-    def __greedy_overlap_merge(self, boxes: list[LayoutBox]) -> list[LayoutBox]:
-        q = list(boxes)
-        result = []
-        while len(q) > 0:
-            current = q.pop(0)
-            i = 0
-            while i < len(q):
-                candidate = q[i]
-                if current.bounds.overlap_ratio(candidate.bounds) >= self.__overlap_min:
-                    current = current.union(candidate)
-                    del q[i]
-                    i = 0
-                else:
-                    i += 1
-            result.append(current)
-        return result
-
-    def _process_page(self, model, image):
-        layout = model.detect(image)
-        return self.__greedy_overlap_merge(
-            list(map(self.__to_layout_box, filter(self.__is_supported, layout)))
+    def __greedy_overlap_merge(self, blocks: LayoutBlocks) -> LayoutBlocks:
+        index = RectIndex(blocks.coords)
+        return blocks.merge(greedy_overlap_merge(index, self.__overlap_min))
+
+    def __to_page_layout(self, layout) -> LayoutBlocks:
+        elements = list(filter(self.__is_supported, layout))
+        coords = np.array(
+            [element.block.coordinates for element in elements], dtype=np.float64
+        ).reshape(-1, 4)
+        types = [[element.type] for element in elements]
+        return self.__greedy_overlap_merge(LayoutBlocks(types, coords))
+
+    @staticmethod
+    def __detect_tensor_batch(model, images: list) -> list:
+        import torch
+
+        inputs, infos = zip(
+            *(model.preprocessor.preprocess(model.image_loader(i)) for i in images)
         )
+        batch = torch.cat(inputs).to(model.device)
+        batch_info = {
+            key: torch.cat([info[key] for info in infos]).to(model.device)
+            for key in infos[0]
+        }
+        with torch.no_grad():
+            outputs = model.model(batch, batch_info)
+        return [model.gather_output(outputs[i : i + 1]) for i in range(len(images))]
+
+    def _detect_batch(self, model, images: list) -> list[LayoutBlocks]:
+        # layoutparser only exposes single-image detection; EfficientDet models
+        # accept a batch tensor, so feed them all the pages in one forward pass
+        if len(images) > 1 and type(model).__name__ == "EfficientDetLayoutModel":
+            layouts = self.__detect_tensor_batch(model, images)
+        else:
+            layouts = [model.detect(image) for image in images]
+        return [self.__to_page_layout(layout) for layout in layouts]
+
+    @staticmethod
+    def __image_bytes(image) -> int:
+        return image.size[0] * image.size[1] * len(image.getbands())
+
+    def __track_page_bytes(self, delta: int) -> None:
+        with self.__page_bytes_lock:
+            self.__page_bytes += delta
+            self.__stats.peak_page_bytes = max(
+                self.__stats.peak_page_bytes, self.__page_bytes
+            )
+
+    def __page_ranges(
+        self,
+        pdf2image: ModuleType,
+        file_path: Path,
+        first_page: int | None,
+        last_page: int | None,
+    ) -> Iterator[tuple[int, int]]:
+        page_count = pdf2image.pdfinfo_from_path(file_path)["Pages"]
+        first = first_page or 1
+        last = page_count if last_page is None else min(last_page, page_count)
+        for start in range(first, last + 1, self.__pages_per_render):
+            yield start, min(start + self.__pages_per_render - 1, last)
+
+    def __render_pages(
+        self,
+        pdf2image: ModuleType,
+        documents: list[DocumentLayout],
+        first_page: int | None,
+        last_page: int | None,
+    ) -> Iterator[tuple[DocumentLayout, int | None, object]]:
+        # page numbers are zero-based, unless a first page is requested
+        page_offset = 0 if first_page is not None else -1
+        for document in documents:
+            for start, end in self.__page_ranges(
+                pdf2image, document.file_path, first_page, last_page
+            ):
+                render_start = time.perf_counter_ns()
+                images = pdf2image.convert_from_path(
+                    document.file_path,
+                    dpi=self.__dpi,
+                    first_page=start,
+                    last_page=end,
+                )
+                self.__stats.render_ns += time.perf_counter_ns() - render_start
+                self.__track_page_bytes(sum(map(self.__image_bytes, images)))
+                images.reverse()
+                page_no = start + page_offset
+                while images:
+                    # hand over each image, so only queued pages stay in memory
+                    image = images.pop()
+                    document.image_sizes[page_no] = Size(image.size[0], image.size[1])
+                    yield document, page_no, image
+                    page_no += 1
+            yield document, None, None
+
+    def __run_batch(self, model, batch: list) -> None:
+        start = time.perf_counter_ns()
+        layouts = self._detect_batch(model, [image for _, _, image in batch])
+        self.__stats.inference_ns += time.perf_counter_ns() - start
+        self.__stats.pages += len(batch)
+        for (document, page_no, image), boxes in zip(batch, layouts):
+            document.layout_blocks[page_no] = boxes
+            self._write_debug_image(document.file_path, page_no, image, boxes)
+        self.__track_page_bytes(-sum(self.__image_bytes(i) for _, _, i in batch))
+        batch.clear()
+
+    def detect_documents(
+        self,
+        files: Iterable[str | Path],
+        first_page: int | None = None,
+        last_page: int | None = None,
+    ) -> Iterator[DocumentLayout]:
+        """Detect the page layouts of several PDF files.
+
+        Pages are rendered ``pages_per_render`` at a time on a background
+        thread into a bounded queue and passed to the layout model in batches
+        of ``batch_size`` images, which may span consecutive documents. Each
+        image is released as soon as its layout is detected, so memory use
+        does not grow with the number of pages. Documents are yielded in order, as soon
+        as all their pages have been processed.
+        """
+        pdf2image = self.__ensure_poppler()
+        documents = [DocumentLayout(Path(file).resolve()) for file in files]
+        model, model_load_ns = self.__load_model()
+        self.__stats = LayoutStats(model_load_ns=model_load_ns)
+        self.__page_bytes = 0
+        pages = pipelined(
+            _identity,
+            self.__render_pages(pdf2image, documents, first_page, last_page),
+            maxsize=self.__max_queued_pages,
+            name="layout-render",
+        )
+        batch, rendered = [], []
+        for document, page_no, image in pages:
+            if page_no is None:
+                rendered.append(document)
+            else:
+                batch.append((document, page_no, image))
+                if len(batch) < self.__batch_size:
+                    continue
+                self.__run_batch(model, batch)
+            if not batch:
+                yield from rendered
+                rendered.clear()
+        self.__run_batch(model, batch)
+        yield from rendered
 
     def __call__(
         self,
@@ -156,64 +376,33 @@ Then re-run the extractor."""
         first_page: int | None = None,
         last_page: int | None = None,
     ) -> Path:
-        pdf2image = self.__ensure_poppler()
         self.__image_sizes.clear()
-        self.__layout_boxes.clear()
-        file_path = Path(file).resolve()
-        process_page = partial(
-            self._process_page,
-            model=AutoLayoutModel(
-                config_path=self.__config_path,
-                model_path=self.__model_path,
-                label_map=self.__label_map,
-                extra_config=dict(weights_only=False),
-            ),
-        )
-        images = {
-            page_no: image
-            for page_no, image in enumerate(
-                pdf2image.convert_from_path(
-                    file_path,
-                    dpi=self.__dpi,
-                    first_page=first_page,
-                    last_page=last_page,
-                ),
-                first_page if first_page is not None else 0,
-            )
-        }
-        self.__image_sizes = {
-            page_no: Size(image.size[0], image.size[1])
-            for page_no, image in images.items()
-        }
-        with ThreadPoolExecutor(max_workers=os.cpu_count() - 1) as pool:
-            futures = {
-                pool.submit(process_page, image=image): page_no
-                for page_no, image in images.items()
-            }
-            wait(futures)
-            for f in futures:
-                page_no = futures[f]
-                self.__layout_boxes[page_no] = f.result()
-                self._write_debug_image(file_path, page_no, images[page_no])
-
-        return file_path
+        self.__layout_blocks.clear()
+        (document,) = self.detect_documents([file], first_page, last_page)
+        self.__image_sizes = document.image_sizes
+        self.__layout_blocks = document.layout_blocks
+        return document.file_path
 
     def _write_debug_image(
-        self, file_path: Path, page_no: int, page_image: PpmImageFile
+        self,
+        file_path: Path,
+        page_no: int,
+        page_image: PpmImageFile,
+        boxes: LayoutBlocks,
     ):
         if not self._debug:
             return
         img = page_image.copy()
         draw = ImageDraw.Draw(img)
-        for box in self.__layout_boxes[page_no]:
-            colors = [self._debug_color_map[t] for t in box.types]
+        for types, (x0, y0, x1, y1) in zip(boxes.types, boxes.coords):
+            colors = [self._debug_color_map[t] for t in types]
             w = 2
             for i, color in enumerate(colors):
                 padding = 2 * w * i
                 draw.rectangle(
                     [
-                        (box.bounds.start.x - padding, box.bounds.start.y - padding),
-                        (box.bounds.end.x + padding, box.bounds.end.y + padding),
+                        (x0 - padding, y0 - padding),
+                        (x1 + padding, y1 + padding),
                     ],
                     outline=colors[i],
                     width=w,
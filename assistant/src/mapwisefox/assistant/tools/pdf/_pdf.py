@@ -1,10 +1,15 @@
 import abc
 import io
 from pathlib import Path
+from typing import Iterator
 
 from mapwisefox.assistant.tools.pdf._text_extractor import PdfTextExtractor
-from mapwisefox.assistant.tools.pdf._layout_extractor import PdfLayoutExtractor
-from mapwisefox.assistant.tools.pdf._types import LayoutBox, TextItem
+from mapwisefox.assistant.tools.pdf._layout_extractor import (
+    LayoutStats,
+    PdfLayoutExtractor,
+)
+from mapwisefox.assistant.tools.pdf._spatial import RectIndex
+from mapwisefox.assistant.tools.pdf._types import LayoutBlocks, TextBlocks
 from mapwisefox.assistant.tools.pdf._base import FileContentsExtractor
 
 
@@ -16,9 +21,29 @@ class BasicPdfContentsExtractor(FileContentsExtractor, metaclass=abc.ABCMeta):
         layout_model: str = "lp://PubLayNet/tf_efficientdet_d0/config",
     ):
         self._min_overlap_ratio = text_to_layout_min_overlap_ratio
+        self.__dpi = dpi
+        self.__layout_model = layout_model
         self.__text_extractor = PdfTextExtractor()
         self.__layout_extractor = PdfLayoutExtractor(dpi, config_path=layout_model)
 
+    @property
+    def cache_key(self) -> str:
+        return (
+            f"{type(self).__qualname__}(dpi={self.__dpi}, "
+            f"layout_model={self.__layout_model!r}, "
+            f"min_overlap_ratio={self._min_overlap_ratio})"
+        )
+
+    @property
+    def layout_stats(self) -> LayoutStats:
+        return self.__layout_extractor.stats
+
+    def warm_up(self) -> None:
+        self.__layout_extractor.warm_up()
+
+    def unload(self) -> None:
+        self.__layout_extractor.unload()
+
     def __compute_text_to_layout_scale(self) -> dict[int, tuple[float, float]]:
         return {
             page_no: (
@@ -30,19 +55,20 @@ class BasicPdfContentsExtractor(FileContentsExtractor, metaclass=abc.ABCMeta):
 
     def __compute_boxes_by_page(
         self, scale: dict[int, tuple[float, float]]
-    ) -> dict[int, tuple[list[LayoutBox], list[TextItem]]]:
+    ) -> dict[int, tuple[LayoutBlocks, TextBlocks]]:
+        text_blocks = self.__text_extractor.text_blocks
         boxes_by_page = {
             page_no: (
-                [box.scale(scale[page_no][0], scale[page_no][1]) for box in boxes],
-                self.__text_extractor.text_items.get(page_no, []),
+                blocks.scale(scale[page_no][0], scale[page_no][1]),
+                text_blocks.get(page_no) or TextBlocks.from_rows([]),
             )
-            for page_no, boxes in self.__layout_extractor.page_layouts.items()
+            for page_no, blocks in self.__layout_extractor.layout_blocks.items()
         }
         return boxes_by_page
 
     @abc.abstractmethod
     def _prepare_output(
-        self, by_page: dict[int, tuple[list[LayoutBox], list[TextItem]]]
+        self, by_page: dict[int, tuple[LayoutBlocks, TextBlocks]]
     ) -> str:
         pass
 
@@ -82,29 +108,28 @@ class BasicPdfTextExtractor(BasicPdfContentsExtractor):
             existing.append(new_text)
         return existing
 
-    def __find_overlaps(self, text_item: TextItem, boxes: list[LayoutBox]):
-        return [
-            box
-            for box in boxes
-            if box.bounds.overlap_ratio(text_item.bounds) >= self._min_overlap_ratio
-        ]
+    def __find_overlaps(
+        self, texts: TextBlocks, boxes: LayoutBlocks
+    ) -> Iterator[tuple[str, list[str]]]:
+        index = RectIndex(boxes.coords)
+        overlaps = index.overlapping_many(texts.coords, self._min_overlap_ratio)
+        for text, overlapping in zip(texts.texts, overlaps):
+            yield text, [t for i in overlapping for t in boxes.types[i]]
 
     def _prepare_output(
-        self, by_page: dict[int, tuple[list[LayoutBox], list[TextItem]]]
+        self, by_page: dict[int, tuple[LayoutBlocks, TextBlocks]]
     ) -> str:
         output_buffer = io.StringIO()
         current_type: str | None = None
         current_texts: list[str] = []
 
         for page_no, (layout_boxes, text_items) in by_page.items():
-            for text_item in text_items:
-                overlapping_boxes = self.__find_overlaps(text_item, layout_boxes)
-                if len(overlapping_boxes) < 1:
+            for text, overlapping_types in self.__find_overlaps(
+                text_items, layout_boxes
+            ):
+                if len(overlapping_types) < 1:
                     continue
-                box_type = max(
-                    (t for box in overlapping_boxes for t in box.types),
-                    key=self._get_box_type_priority,
-                )
+                box_type = max(overlapping_types, key=self._get_box_type_priority)
 
                 if current_type != box_type:
                     if len(current_texts) > 0:
@@ -114,7 +139,7 @@ class BasicPdfTextExtractor(BasicPdfContentsExtractor):
                     current_type = box_type
                     current_texts = []
 
-                self.__append_text(current_texts, text_item.text)
+                self.__append_text(current_texts, text)
 
         if len(current_texts) > 0:
             output_buffer.write(self._join_texts(current_type, current_texts))
@@ -0,0 +1,150 @@
+import math
+from collections import defaultdict
+from typing import Iterable
+
+import numpy as np
+
+from mapwisefox.assistant.tools.pdf._types import Rect
+
+_DENSE_MAX_RECTS = 256
+_DENSE_CHUNK_PAIRS = 1 << 18
+
+
+def rect_coords(rects: Iterable[Rect]) -> np.ndarray:
+    """Return an ``(N, 4)`` array of ``x0, y0, x1, y1`` rectangle coordinates."""
+    coords = [(r.start.x, r.start.y, r.end.x, r.end.y) for r in rects]
+    return np.array(coords, dtype=np.float64).reshape(-1, 4)
+
+
+def overlap_ratios(rects: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Vectorized :meth:`Rect.overlap_ratio` of broadcastable coordinate arrays."""
+    inter_w = np.minimum(rects[..., 2], others[..., 2]) - np.maximum(
+        rects[..., 0], others[..., 0]
+    )
+    inter_h = np.minimum(rects[..., 3], others[..., 3]) - np.maximum(
+        rects[..., 1], others[..., 1]
+    )
+    intersects = (inter_w >= 0) & (inter_h >= 0)
+    inter_area = np.where(intersects, inter_w * inter_h, 0.0)
+    min_area = np.minimum(_areas(rects), _areas(others))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(min_area == 0, 0.0, inter_area / min_area)
+
+
+def _areas(coords: np.ndarray) -> np.ndarray:
+    return np.abs(coords[..., 2] - coords[..., 0]) * np.abs(
+        coords[..., 3] - coords[..., 1]
+    )
+
+
+class RectIndex:
+    """Uniform grid over a fixed set of rectangles.
+
+    Each rectangle is registered in every grid cell it covers, so the
+    rectangles that may overlap a query are found by looking up only the
+    cells the query covers. Rectangles sharing no cell with the query have no
+    positive overlap with it.
+    """
+
+    def __init__(self, coords: np.ndarray, cell_size: float | None = None) -> None:
+        self.__coords = coords
+        lo = np.minimum(coords[:, :2], coords[:, 2:])
+        hi = np.maximum(coords[:, :2], coords[:, 2:])
+        self.__cell_size = cell_size or self.__default_cell_size(hi - lo)
+        self.__cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i, ((cx0, cy0), (cx1, cy1)) in enumerate(
+            zip(self.__cell_of(lo), self.__cell_of(hi))
+        ):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.__cells[(cx, cy)].append(i)
+
+    @staticmethod
+    def __default_cell_size(sizes: np.ndarray) -> float:
+        if len(sizes) == 0:
+            return 1.0
+        size = float(np.median(sizes.max(axis=1)))
+        return size if math.isfinite(size) and size > 0 else 1.0
+
+    def __cell_of(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self.__cell_size).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.__coords)
+
+    @property
+    def coords(self) -> np.ndarray:
+        return self.__coords
+
+    def candidates(self, rect: np.ndarray) -> np.ndarray:
+        """Return the sorted indices of rectangles sharing a cell with ``rect``."""
+        lo = np.minimum(rect[:2], rect[2:])
+        hi = np.maximum(rect[:2], rect[2:])
+        (cx0, cy0), (cx1, cy1) = self.__cell_of(np.stack([lo, hi]))
+        found = set()
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.__cells):
+            for (cx, cy), indices in self.__cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.update(indices)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    found.update(self.__cells.get((cx, cy), ()))
+        return np.fromiter(sorted(found), dtype=np.int64, count=len(found))
+
+    def overlapping(self, rect: np.ndarray, min_ratio: float) -> np.ndarray:
+        """Return the sorted indices of rectangles overlapping ``rect`` by at
+        least ``min_ratio``."""
+        if min_ratio <= 0:
+            # non-overlapping rectangles qualify too, so there is nothing to prune
+            return np.arange(len(self.__coords))
+        candidates = self.candidates(rect)
+        ratios = overlap_ratios(rect, self.__coords[candidates])
+        return candidates[ratios >= min_ratio]
+
+    def overlapping_many(self, rects: np.ndarray, min_ratio: float) -> list[np.ndarray]:
+        """Return :meth:`overlapping` for each row of ``rects``."""
+        if len(self.__coords) > _DENSE_MAX_RECTS:
+            return [self.overlapping(rect, min_ratio) for rect in rects]
+        # few rectangles (a page of layout boxes): comparing every pair in one
+        # vectorized pass is cheaper than a grid lookup per query
+        result = []
+        rows = max(1, _DENSE_CHUNK_PAIRS // max(1, len(self.__coords)))
+        for start in range(0, len(rects), rows):
+            ratios = overlap_ratios(
+                rects[start : start + rows, None, :], self.__coords[None, :, :]
+            )
+            matches = ratios >= min_ratio
+            result.extend(np.flatnonzero(row) for row in matches)
+        return result
+
+
+def greedy_overlap_merge(index: RectIndex, min_ratio: float) -> list[list[int]]:
+    """Group rectangles that overlap by at least ``min_ratio``.
+
+    Rectangles are taken in order; each one absorbs the first remaining
+    rectangle overlapping it, grows to their union and starts over, until no
+    remaining rectangle overlaps it. Returns the indices of every group, in
+    the order they were merged.
+    """
+    coords = index.coords
+    alive = np.ones(len(index), dtype=bool)
+    groups = []
+    for first in range(len(index)):
+        if not alive[first]:
+            continue
+        alive[first] = False
+        group = [first]
+        current = coords[first].copy()
+        while True:
+            matches = index.overlapping(current, min_ratio)
+            matches = matches[alive[matches]]
+            if len(matches) == 0:
+                break
+            nxt = int(matches[0])
+            alive[nxt] = False
+            group.append(nxt)
+            current[:2] = np.minimum(current[:2], coords[nxt, :2])
+            current[2:] = np.maximum(current[2:], coords[nxt, 2:])
+        groups.append(group)
+    return groups
@@ -7,7 +7,7 @@ from pathlib import Path
 import stopwords
 from pypdf import PdfReader
 
-from ._types import Point, Rect, Size, TextItem
+from ._types import Size, TextBlocks, TextItem
 
 
 EN_STOPWORDS = set(stopwords.get_stopwords("english"))
@@ -16,23 +16,28 @@ EN_STOPWORDS = set(stopwords.get_stopwords("english"))
 class PdfTextExtractor:
     def __init__(self):
         self._page_sizes: dict[int, Size] = {}
-        self._text_items: dict[int, list[TextItem]] = defaultdict(list)
+        self._text_rows: dict[int, list[tuple]] = defaultdict(list)
+        self._text_blocks: dict[int, TextBlocks] = {}
+
+    @property
+    def text_blocks(self) -> dict[int, TextBlocks]:
+        return self._text_blocks
 
     @property
     def text_items(self) -> dict[int, list[TextItem]]:
-        return self._text_items
+        items = defaultdict(list)
+        for page, blocks in self._text_blocks.items():
+            items[page] = blocks.to_items()
+        return items
 
     @property
     def page_sizes(self) -> dict[int, Size]:
         return self._page_sizes
 
     @classmethod
-    def __apply_matrix(cls, m: list[float], x: float, y: float) -> Point:
+    def __apply_matrix(cls, m: list[float], x: float, y: float) -> tuple[float, float]:
         a, b, c, d, e, f = m
-        return Point(
-            a * x + c * y + e,
-            b * x + d * y + f,
-        )
+        return a * x + c * y + e, b * x + d * y + f
 
     @classmethod
     def __compute_font_size(cls, font_size, user_matrix) -> float:
@@ -87,21 +92,31 @@ class PdfTextExtractor:
     @classmethod
     def __compute_text_size(
         cls, text: str, font_size: float, font_dictionary: dict | None
-    ) -> Size:
+    ) -> tuple[float, float]:
         ascent, descent = cls.__compute_ascent_descent(font_dictionary)
         text_height = (ascent + descent) * font_size
         text_width = cls.__estimate_text_width(font_dictionary, font_size, text)
 
-        return Size(text_width, text_height)
+        return text_width, text_height
 
     @classmethod
     def __from_top_left(
-        cls, page_height: float, origin: Point, text_size: Size
-    ) -> Rect:
-        return Rect(
-            start=Point(origin.x, page_height - origin.y - text_size.height),
-            end=Point(origin.x + text_size.width, page_height - origin.y),
-        )
+        cls,
+        page_height: float,
+        origin: tuple[float, float],
+        text_size: tuple[float, float],
+    ) -> tuple[float, float, float, float]:
+        (x, y), (width, height) = origin, text_size
+        return x, page_height - y - height, x + width, page_height - y
+
+    @staticmethod
+    def __vertical_norm(bounds: tuple[float, ...], relative_height: float) -> float:
+        center_y = (bounds[1] + bounds[3]) / 2
+        if center_y > relative_height:
+            return 1.0
+        if center_y < 0:
+            return 0.0
+        return round(center_y / relative_height, 4)
 
     @staticmethod
     def __is_text_valid(text) -> bool:
@@ -139,22 +154,18 @@ class PdfTextExtractor:
         text_bounds = self.__from_top_left(page_size.height, origin, text_size)
 
         # remove headers and footers
-        y_norm = text_bounds.vertical_norm(page_size.height)
+        y_norm = self.__vertical_norm(text_bounds, page_size.height)
         if y_norm < 0.1 or y_norm > 0.9:
             return
 
-        text_item = TextItem(
-            text=text,
-            font_size=actual_font_size,
-            font_dict=font_dictionary,
-            bounds=text_bounds,
+        self._text_rows[page].append(
+            (text, actual_font_size, font_dictionary, *text_bounds)
         )
 
-        self._text_items[page].append(text_item)
-
     def __call__(self, file: str | Path) -> Path:
         self._page_sizes.clear()
-        self._text_items.clear()
+        self._text_rows.clear()
+        self._text_blocks.clear()
         file_path = Path(file).resolve()
         with PdfReader(file_path) as r:
             for page_number, page in enumerate(r.pages):
@@ -162,4 +173,8 @@ class PdfTextExtractor:
                 self._page_sizes[page_number] = Size(page_w, page_h)
                 visit_page_text = partial(self.__visit_text, page_number)
                 page.extract_text(visitor_text=visit_page_text)
+        self._text_blocks.update(
+            (page, TextBlocks.from_rows(rows)) for page, rows in self._text_rows.items()
+        )
+        self._text_rows.clear()
         return file_path
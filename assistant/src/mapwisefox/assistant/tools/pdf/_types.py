@@ -1,3 +1,6 @@
+from typing import Iterable
+
+import numpy as np
 from pydantic.dataclasses import dataclass
 
 
@@ -138,3 +141,123 @@ class LayoutBox:
 
     def scale(self, sx: float = 1.0, sy: float = 1.0) -> "LayoutBox":
         return LayoutBox(types=self.types, bounds=self.bounds.scale(sx, sy))
+
+
+class TextBlocks:
+    """The text items of one page, stored column-wise.
+
+    ``coords`` holds one ``x0, y0, x1, y1`` row per item. Extractors use this
+    representation internally; :meth:`to_items` converts it to
+    :class:`TextItem` instances.
+    """
+
+    __slots__ = ("texts", "font_sizes", "font_dicts", "coords")
+
+    def __init__(
+        self,
+        texts: list[str],
+        font_sizes: np.ndarray,
+        font_dicts: list[dict | None],
+        coords: np.ndarray,
+    ) -> None:
+        self.texts = texts
+        self.font_sizes = font_sizes
+        self.font_dicts = font_dicts
+        self.coords = coords
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[tuple[str, float, dict | None, float, float, float, float]]
+    ) -> "TextBlocks":
+        rows = list(rows)
+        return cls(
+            [row[0] for row in rows],
+            np.array([row[1] for row in rows], dtype=np.float64),
+            [row[2] for row in rows],
+            np.array([row[3:] for row in rows], dtype=np.float64).reshape(-1, 4),
+        )
+
+    @classmethod
+    def from_items(cls, items: Iterable[TextItem]) -> "TextBlocks":
+        return cls.from_rows(
+            (
+                item.text,
+                item.font_size,
+                item.font_dict,
+                item.bounds.start.x,
+                item.bounds.start.y,
+                item.bounds.end.x,
+                item.bounds.end.y,
+            )
+            for item in items
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def to_items(self) -> list[TextItem]:
+        return [
+            TextItem(text, float(font_size), font_dict, _to_rect(coords))
+            for text, font_size, font_dict, coords in zip(
+                self.texts, self.font_sizes, self.font_dicts, self.coords
+            )
+        ]
+
+
+class LayoutBlocks:
+    """The layout boxes of one page, stored column-wise.
+
+    ``coords`` holds one ``x0, y0, x1, y1`` row per box and ``types`` the
+    layout types of each box. :meth:`to_boxes` converts them to
+    :class:`LayoutBox` instances.
+    """
+
+    __slots__ = ("types", "coords")
+
+    def __init__(self, types: list[list[str]], coords: np.ndarray) -> None:
+        self.types = types
+        self.coords = coords
+
+    @classmethod
+    def from_boxes(cls, boxes: Iterable[LayoutBox]) -> "LayoutBlocks":
+        boxes = list(boxes)
+        return cls(
+            [list(box.types) for box in boxes],
+            np.array(
+                [
+                    (b.bounds.start.x, b.bounds.start.y, b.bounds.end.x, b.bounds.end.y)
+                    for b in boxes
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 4),
+        )
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def to_boxes(self) -> list[LayoutBox]:
+        return [
+            LayoutBox(types=list(types), bounds=_to_rect(coords))
+            for types, coords in zip(self.types, self.coords)
+        ]
+
+    def scale(self, sx: float = 1.0, sy: float = 1.0) -> "LayoutBlocks":
+        return LayoutBlocks(self.types, self.coords * (sx, sy, sx, sy))
+
+    def merge(self, groups: Iterable[list[int]]) -> "LayoutBlocks":
+        """Replace each group of boxes by their union, like :meth:`LayoutBox.union`."""
+        types, coords = [], []
+        for group in groups:
+            group_coords = self.coords[group]
+            coords.append(
+                np.concatenate(
+                    [group_coords[:, :2].min(axis=0), group_coords[:, 2:].max(axis=0)]
+                )
+            )
+            types.append(list(dict.fromkeys(t for i in group for t in self.types[i])))
+        return LayoutBlocks(types, np.array(coords, dtype=np.float64).reshape(-1, 4))
+
+
+def _to_rect(coords: np.ndarray) -> Rect:
+    x0, y0, x1, y1 = map(float, coords)
+    return Rect(Point(x0, y0), Point(x1, y1))
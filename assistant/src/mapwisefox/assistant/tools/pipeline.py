@@ -0,0 +1,87 @@
+import threading
+from queue import Full, Queue
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+_POLL_SECONDS = 0.1
+
+
+class _Done:
+    pass
+
+
+class _Failed:
+    def __init__(self, exc: Exception) -> None:
+        self.exc = exc
+
+
+def pipelined(
+    stage: Callable[[T], U],
+    items: Iterable[T],
+    maxsize: int = 1,
+    name: Optional[str] = None,
+    workers: int = 1,
+) -> Iterator[U]:
+    """Apply ``stage`` to each of ``items`` on a background thread.
+
+    Results are handed to the consumer through a queue holding at most
+    ``maxsize`` items, so the stage never runs more than ``maxsize`` items
+    ahead. Chaining calls builds a multi-stage pipeline in which every stage
+    runs concurrently with the others. Exceptions raised by a stage are
+    re-raised in the consumer.
+
+    With more than one worker, the stage is applied to several items at once
+    on separate threads, and results are yielded in completion order.
+    """
+    workers = max(1, workers)
+    results: Queue = Queue(maxsize=max(1, maxsize))
+    stopped = threading.Event()
+    source = iter(items)
+    source_lock = threading.Lock()
+    running = [workers]
+
+    def _put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=_POLL_SECONDS)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _next():
+        with source_lock:
+            return next(source, _Done)
+
+    def _run():
+        try:
+            while (item := _next()) is not _Done:
+                if not _put(stage(item)):
+                    return
+            _put(_Done())
+        except Exception as exc:
+            _put(_Failed(exc))
+        finally:
+            with source_lock:
+                running[0] -= 1
+                # the source can only be closed once no worker is advancing it
+                if running[0] == 0 and (close := getattr(items, "close", None)):
+                    close()
+
+    for i in range(workers):
+        thread_name = name if workers == 1 or name is None else f"{name}-{i}"
+        threading.Thread(target=_run, name=thread_name, daemon=True).start()
+    try:
+        done = 0
+        while done < workers:
+            item = results.get()
+            if isinstance(item, _Done):
+                done += 1
+                continue
+            if isinstance(item, _Failed):
+                raise item.exc
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,116 @@
+import math
+import os
+import re
+from collections import Counter
+
+from mapwisefox.assistant.tools.llm import estimate_tokens
+
+_HEADING = re.compile(r"^#{1,6}\s", re.M)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_TERM = re.compile(r"\w+", re.U)
+DEFAULT_CHUNK_TOKENS = 512
+
+
+def _terms(text: str) -> list[str]:
+    return _TERM.findall(text.lower())
+
+
+def split_sections(markdown: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> list[str]:
+    """Split ``markdown`` into chunks at its headings.
+
+    Sections longer than ``max_tokens`` estimated tokens are split further at
+    paragraph breaks. A single paragraph is never split, so a chunk may still
+    exceed the limit.
+    """
+    starts = [m.start() for m in _HEADING.finditer(markdown)]
+    bounds = zip([0] + starts, starts + [len(markdown)])
+    chunks = []
+    for start, end in bounds:
+        section = markdown[start:end].strip()
+        if not section:
+            continue
+        if estimate_tokens(section) <= max_tokens:
+            chunks.append(section)
+            continue
+        current, tokens = [], 0
+        for paragraph in _PARAGRAPH_BREAK.split(section):
+            paragraph_tokens = estimate_tokens(paragraph)
+            if current and tokens + paragraph_tokens > max_tokens:
+                chunks.append((os.linesep * 2).join(current))
+                current, tokens = [], 0
+            current.append(paragraph)
+            tokens += paragraph_tokens
+        if current:
+            chunks.append((os.linesep * 2).join(current))
+    return chunks
+
+
+class ChunkIndex:
+    """In-memory BM25 index over the chunks of one document.
+
+    Built once per document and queried once per question, so every question
+    is sent only the chunks most relevant to it.
+    """
+
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.__chunks = chunks
+        self.__k1 = k1
+        self.__b = b
+        self.__term_counts = [Counter(_terms(chunk)) for chunk in chunks]
+        self.__lengths = [sum(counts.values()) for counts in self.__term_counts]
+        self.__sizes = [estimate_tokens(chunk) for chunk in chunks]
+        # documents without a single term would otherwise divide by zero
+        self.__avg_length = sum(self.__lengths) / max(1, len(chunks)) or 1.0
+        document_frequency = Counter(
+            term for counts in self.__term_counts for term in counts
+        )
+        n = len(chunks)
+        self.__idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    @classmethod
+    def from_markdown(
+        cls, markdown: str, max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    ) -> "ChunkIndex":
+        return cls(split_sections(markdown, max_chunk_tokens))
+
+    @property
+    def chunks(self) -> list[str]:
+        return self.__chunks
+
+    def scores(self, query: str) -> list[float]:
+        query_terms = set(_terms(query)) & self.__idf.keys()
+        scores = []
+        for counts, length in zip(self.__term_counts, self.__lengths):
+            norm = self.__k1 * (1 - self.__b + self.__b * length / self.__avg_length)
+            scores.append(
+                sum(
+                    self.__idf[t] * counts[t] * (self.__k1 + 1) / (counts[t] + norm)
+                    for t in query_terms
+                    if t in counts
+                )
+            )
+        return scores
+
+    def context(self, query: str, token_budget: int) -> str:
+        """Return the chunks that best match ``query`` within ``token_budget``.
+
+        Chunks are picked by descending score, skipping those that no longer
+        fit, and joined in document order. A document that fits the budget is
+        returned whole, and the best chunk is returned even if it alone exceeds
+        the budget.
+        """
+        sizes = self.__sizes
+        if sum(sizes) <= token_budget:
+            picked = range(len(self.__chunks))
+        else:
+            scores = self.scores(query)
+            ranked = sorted(range(len(self.__chunks)), key=lambda i: -scores[i])
+            picked, used = [], 0
+            for i in ranked:
+                if not picked or used + sizes[i] <= token_budget:
+                    picked.append(i)
+                    used += sizes[i]
+        return (os.linesep * 2).join(self.__chunks[i] for i in sorted(picked))
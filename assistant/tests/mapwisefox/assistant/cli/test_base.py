@@ -1,6 +1,11 @@
+import json
+
 import pytest
 
-from mapwisefox.assistant._base import assistant
+from mapwisefox.assistant._base import _report_token_usage, assistant
+from mapwisefox.assistant.config import AssistantParams
+from mapwisefox.assistant.instrumentation import MetricsRegistry
+from mapwisefox.assistant.tools.llm import OllamaProvider, OpenAIProvider, TokenUsage
 
 
 @pytest.mark.parametrize(
@@ -44,3 +49,122 @@ def test_assistant_requires_api_key_for_openai(
 
     assert result.exit_code != 0
     assert "API key" in result.output
+
+
+@pytest.mark.parametrize(
+    "limits, exit_ok",
+    [(["--rpm", "50", "--tpm", "40000"], True), (["--rpm", "0"], False)],
+)
+def test_assistant_validates_rate_limits(
+    runner, valid_selection_config_path, limits, exit_ok
+):
+    result = runner.invoke(
+        assistant,
+        limits
+        + [
+            "validate-config",
+            "--kind",
+            "study-selection",
+            "--config-file",
+            str(valid_selection_config_path),
+        ],
+    )
+
+    assert (result.exit_code == 0) is exit_ok, result.output
+
+
+def test_assistant_reports_token_usage_only_when_recorded(capsys):
+    usage = TokenUsage()
+    _report_token_usage(usage)
+    usage.record(1500, 1024)
+    _report_token_usage(usage)
+
+    err = capsys.readouterr().err
+    assert (
+        err == "LLM prompt tokens: 1500, 1024 read from the provider's prompt cache\n"
+    )
+
+
+def test_assistant_builds_screening_provider_factory_only_when_asked(
+    runner, valid_selection_config_path
+):
+    validate = [
+        "validate-config",
+        "--kind",
+        "study-selection",
+        "--config-file",
+        str(valid_selection_config_path),
+    ]
+    cascading, plain = AssistantParams(), AssistantParams()
+
+    runner.invoke(
+        assistant,
+        ["-p", "openai", "--api-key", "key", "--screening-model", "small"] + validate,
+        obj=cascading,
+    )
+    runner.invoke(assistant, validate, obj=plain)
+
+    assert cascading.provider_factory.func is OpenAIProvider
+    assert cascading.screening_provider_factory.func is OllamaProvider
+    assert cascading.screening_provider_factory.keywords["model"] == "small"
+    assert cascading.screening_model_choice == "small"
+    assert plain.screening_provider_factory is None
+
+
+def test_assistant_never_sends_the_main_api_key_to_the_screening_provider(
+    runner, valid_selection_config_path
+):
+    validate = [
+        "validate-config",
+        "--kind",
+        "study-selection",
+        "--config-file",
+        str(valid_selection_config_path),
+    ]
+    local, hosted = AssistantParams(), AssistantParams()
+    main = ["-p", "openai", "--api-key", "main-key", "--screening-model", "small"]
+
+    runner.invoke(assistant, main + validate, obj=local)
+    runner.invoke(
+        assistant,
+        main
+        + ["--screening-provider", "openai", "--screening-api-key", "screening-key"]
+        + validate,
+        obj=hosted,
+    )
+    missing = runner.invoke(
+        assistant, main + ["--screening-provider", "anthropic"] + validate
+    )
+
+    assert local.screening_provider_factory.keywords["api_key"] is None
+    assert hosted.screening_provider_factory.keywords["api_key"] == "screening-key"
+    assert hosted.provider_factory.keywords["api_key"] == "main-key"
+    assert missing.exit_code == 2
+    assert "--screening-api-key" in missing.output
+
+
+def test_assistant_writes_metrics_files_only_when_asked(
+    runner, valid_selection_config_path, tmp_path
+):
+    validate = [
+        "validate-config",
+        "--kind",
+        "study-selection",
+        "--config-file",
+        str(valid_selection_config_path),
+    ]
+    measured, plain = AssistantParams(), AssistantParams()
+    json_path, prom_path = tmp_path / "run.json", tmp_path / "run.prom"
+
+    result = runner.invoke(
+        assistant,
+        ["--metrics-json", str(json_path), "--metrics-prom", str(prom_path)] + validate,
+        obj=measured,
+    )
+    runner.invoke(assistant, validate, obj=plain)
+
+    assert result.exit_code == 0, result.output
+    assert isinstance(measured.provider_factory.keywords["metrics"], MetricsRegistry)
+    assert plain.provider_factory.keywords["metrics"] is None
+    assert json.loads(json_path.read_text())["metrics"] == {}
+    assert prom_path.exists()
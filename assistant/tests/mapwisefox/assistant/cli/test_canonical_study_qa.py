@@ -69,7 +69,7 @@ def test_canonical_qa_accepts_http_pdf_for_each_reader(
     assert "# reporting" in output.loc[0, "evaluation"]
     assert len(http_responses.calls) == 1
     reader_factory.assert_called_once_with(
-        reader_type, "lp://PubLayNet/tf_efficientdet_d0/config"
+        reader_type, "lp://PubLayNet/tf_efficientdet_d0/config", workers=1
     )
 
 
@@ -130,7 +130,7 @@ def test_canonical_qa_accepts_local_file_url_without_http(
     assert (local_input.parent / "selected-results-gpt_oss.xlsx").exists()
     assert len(http_responses.calls) == 0
     reader_factory.assert_called_once_with(
-        reader_type, "lp://PubLayNet/tf_efficientdet_d0/config"
+        reader_type, "lp://PubLayNet/tf_efficientdet_d0/config", workers=1
     )
 
 
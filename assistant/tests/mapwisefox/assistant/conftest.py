@@ -3,6 +3,12 @@ import json
 import pytest
 from click.testing import CliRunner
 
+from mapwisefox.assistant.tools.llm import (
+    BatchProviderMixin,
+    BatchStatus,
+    LLMProviderBase,
+)
+
 
 @pytest.fixture
 def runner():
@@ -50,3 +56,47 @@ def valid_selection_config_path(tmp_path, study_selection_config):
     path = tmp_path / "selection.json"
     path.write_text(json.dumps(study_selection_config))
     return path
+
+
+class FakeBatchProvider(BatchProviderMixin, LLMProviderBase):
+    """Provider answering batches locally with ``answer(user_prompt)``.
+
+    Batches finish after ``polls`` status checks; answers that are exceptions
+    are reported as failed requests, and ``None`` answers are left out.
+    """
+
+    def __init__(self, answer, polls=1, status=BatchStatus.ended):
+        super().__init__("fake")
+        self.answer = answer
+        self.polls = polls
+        self.status = status
+        self.batches = []
+        self.generator = None
+
+    def ensure_model(self) -> bool:
+        return True
+
+    def new_json_generator(self, max_retries=1, thinking=False):
+        return self.generator
+
+    def _submit_batch(self, requests):
+        self.batches.append(requests)
+        return f"batch-{len(self.batches)}"
+
+    def _batch_status(self, batch_id):
+        self.polls -= 1
+        return BatchStatus.running if self.polls > 0 else self.status
+
+    def _batch_results(self, batch_id):
+        for request in self.batches[int(batch_id.removeprefix("batch-")) - 1]:
+            answer = self.answer(request.user_prompt)
+            if answer is None:
+                continue
+            yield request.custom_id, (
+                answer if isinstance(answer, Exception) else json.dumps(answer)
+            )
+
+
+@pytest.fixture
+def fake_batch_provider():
+    return FakeBatchProvider
@@ -0,0 +1,92 @@
+import json
+import threading
+
+import pytest
+
+from mapwisefox.assistant.instrumentation import MetricsRegistry
+
+
+def test_counter_sums_increments_per_label_set():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "requests")
+
+    counter.inc(model="a")
+    counter.inc(2, model="a")
+    counter.inc(model="b")
+
+    assert (counter.value(model="a"), counter.value(model="b")) == (3, 1)
+    assert counter.value(model="c") == 0
+
+
+def test_counter_is_safe_to_update_from_several_threads():
+    counter = MetricsRegistry().counter("requests_total")
+    threads = [
+        threading.Thread(target=lambda: [counter.inc() for _ in range(1000)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value() == 4000
+
+
+def test_histogram_summary_has_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "latency", buckets=(1, 5))
+
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value, model="a")
+
+    (values,) = registry.summary()["metrics"]["latency_seconds"]["values"]
+    assert values == {
+        "labels": {"model": "a"},
+        "count": 4,
+        "sum": 14.5,
+        "buckets": {"1.0": 2, "5.0": 3, "+Inf": 4},
+    }
+
+
+def test_registry_returns_the_metric_registered_under_a_name():
+    registry = MetricsRegistry()
+
+    assert registry.counter("n") is registry.counter("n")
+    with pytest.raises(ValueError, match="counter"):
+        registry.histogram("n")
+
+
+def test_registry_formats_metrics_for_prometheus():
+    registry = MetricsRegistry()
+    registry.counter("tokens_total", "tokens").inc(5, model='say "hi"')
+    registry.histogram("latency_seconds", "latency", buckets=(1,)).observe(
+        0.5, model="a"
+    )
+
+    assert registry.to_prometheus() == (
+        "# HELP tokens_total tokens\n"
+        "# TYPE tokens_total counter\n"
+        'tokens_total{model="say \\"hi\\""} 5\n'
+        "# HELP latency_seconds latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{model="a",le="1.0"} 1\n'
+        'latency_seconds_bucket{model="a",le="+Inf"} 1\n'
+        'latency_seconds_sum{model="a"} 0.5\n'
+        'latency_seconds_count{model="a"} 1\n'
+    )
+
+
+def test_registry_writes_json_and_prometheus_files(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("tokens_total").inc(3)
+
+    registry.write_json(tmp_path / "out" / "metrics.json")
+    registry.write_prometheus(tmp_path / "out" / "metrics.prom")
+
+    summary = json.loads((tmp_path / "out" / "metrics.json").read_text())
+    assert summary["metrics"]["tokens_total"]["values"] == [{"labels": {}, "value": 3}]
+    assert "tokens_total 3" in (tmp_path / "out" / "metrics.prom").read_text()
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "metrics.json",
+        "metrics.prom",
+    ]
@@ -1,7 +1,12 @@
+import threading
+from pathlib import Path
 from unittest.mock import MagicMock
 
+import pandas as pd
+
 from mapwisefox.assistant.config import ReaderType
 from mapwisefox.assistant.quality_assessment import _study_qa as qa
+from mapwisefox.assistant.tools.pdf import ExtractionCache
 
 
 def test_reader_factory_uses_custom_reader(monkeypatch):
@@ -31,3 +36,294 @@ def test_get_default_pdf_reader_uses_pdf_extractor(monkeypatch):
     pdf.BasicPdfMarkdownExtractor.assert_called_once_with(
         dpi=150, layout_model="layout"
     )
+
+
+_CRITERIA = [
+    {
+        "label": label,
+        "category": "reporting",
+        "question": f"{label}?",
+        "description": label,
+        "scoring": "1 to 10",
+    }
+    for label in ("c1", "c2", "c3")
+]
+
+
+def _papers(count):
+    return [
+        ((i, f"https://x/{i}.pdf", Path(f"/tmp/{i}.pdf")), f"text {i}")
+        for i in range(count)
+    ]
+
+
+def test_evaluate_papers_keeps_requests_in_flight_concurrently():
+    barrier = threading.Barrier(4, timeout=5)
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        barrier.wait()
+        return {"score": 5, "reason": template_data["question"]}
+
+    results = qa._evaluate_papers(
+        _papers(4), generate_json, {"topic": "t"}, _CRITERIA[:1], concurrency=4
+    )
+
+    assert sorted(results) == [0, 1, 2, 3]
+
+
+def test_evaluate_papers_orders_results_independently_of_completion():
+    def generate_json(template_data, user_prompt, refresh=False):
+        return {"score": len(user_prompt), "reason": template_data["question"]}
+
+    results = qa._evaluate_papers(
+        _papers(3), generate_json, {"topic": "t"}, _CRITERIA, concurrency=8
+    )
+
+    assert list(results) == [0, 1, 2]
+    assert [list(r) for r in results.values()] == [["c1", "c2", "c3"]] * 3
+    assert results[2]["c3"] == {"score": 6, "reason": "c3?"}
+
+
+def test_evaluate_papers_drops_only_the_failing_paper():
+    def generate_json(template_data, user_prompt, refresh=False):
+        if user_prompt == "text 1":
+            raise RuntimeError("LLM failure")
+        return {"score": 5, "reason": "ok"}
+
+    results = qa._evaluate_papers(
+        _papers(3), generate_json, {"topic": "t"}, _CRITERIA, concurrency=2
+    )
+
+    assert sorted(results) == [0, 2]
+
+
+def test_extract_pdf_contents_streams_papers_and_collects_failures(tmp_path):
+    paper = tmp_path / "paper.pdf"
+    paper.write_bytes(b"%PDF")
+    df = pd.DataFrame({"url": ["ok", "missing", "ok"]})
+
+    provider = MagicMock()
+    provider.fetch_many.side_effect = lambda urls: (
+        (url, ValueError("bad download") if url == "missing" else paper) for url in urls
+    )
+
+    reader = MagicMock()
+    reader.read_file.return_value = "paper text"
+
+    papers, failed = qa._extract_pdf_contents(
+        df, "url", provider, reader, MagicMock(), ExtractionCache(tmp_path), 1
+    )
+
+    assert [key[0] for key, _ in papers] == [0, 2]
+    assert failed == [(1, "missing")]
+
+
+def test_score_criterion_bypasses_cached_answers_when_retrying():
+    refreshes = []
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        refreshes.append(refresh)
+        return {"score": 5 if refresh else None, "reason": "ok"}
+
+    result = qa._score_criterion(generate_json, {}, "text", "c1", max_retries=2)
+
+    assert result["score"] == 5
+    assert refreshes == [False, True]
+
+
+def _combined(answer):
+    calls = []
+
+    def generate_combined(template_data, user_prompt, response_schema):
+        calls.append((template_data, response_schema))
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return generate_combined, calls
+
+
+def test_evaluate_papers_scores_all_criteria_in_one_combined_request():
+    generate_combined, calls = _combined(
+        {c["label"]: {"score": 7, "reason": c["question"]} for c in _CRITERIA}
+    )
+    generate_json = MagicMock()
+
+    results = qa._evaluate_papers(
+        _papers(2),
+        generate_json,
+        {"topic": "t"},
+        _CRITERIA,
+        generate_combined=generate_combined,
+    )
+
+    assert results[1] == {
+        "c1": {"score": 7, "reason": "c1?"},
+        "c2": {"score": 7, "reason": "c2?"},
+        "c3": {"score": 7, "reason": "c3?"},
+    }
+    assert len(calls) == 2
+    assert calls[0][0]["criteria"] == _CRITERIA
+    assert calls[0][1]["required"] == ["c1", "c2", "c3"]
+    generate_json.assert_not_called()
+
+
+def test_evaluate_papers_scores_criteria_missing_from_combined_answer_separately():
+    generate_combined, _ = _combined(
+        {"c1": {"score": 7, "reason": "ok"}, "c3": {"score": None, "reason": "?"}}
+    )
+    asked = []
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        asked.append(template_data["question"])
+        return {"score": 4, "reason": "separately"}
+
+    results = qa._evaluate_papers(
+        _papers(1),
+        generate_json,
+        {"topic": "t"},
+        _CRITERIA,
+        generate_combined=generate_combined,
+    )
+
+    assert sorted(asked) == ["c2?", "c3?"]
+    assert list(results[0]) == ["c1", "c2", "c3"]
+    assert results[0]["c1"]["score"] == 7
+    assert results[0]["c3"]["score"] == 4
+
+
+def test_evaluate_papers_falls_back_when_combined_answer_is_not_json():
+    generate_combined, _ = _combined(ValueError("LLM answered non-JSON value"))
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        return {"score": 4, "reason": "separately"}
+
+    results = qa._evaluate_papers(
+        _papers(1),
+        generate_json,
+        {"topic": "t"},
+        _CRITERIA,
+        generate_combined=generate_combined,
+    )
+
+    assert [r["score"] for r in results[0].values()] == [4, 4, 4]
+
+
+def _template(suffix=""):
+    return qa.load_template(
+        Path(qa.__file__).parent / f"{Path(qa.__file__).stem}{suffix}.j2"
+    )
+
+
+def test_combined_template_lists_every_criterion():
+    prompt = _template("_combined").render(
+        topic="entity resolution", criteria=_CRITERIA
+    )
+
+    assert all(f"### {c['label']}" in prompt for c in _CRITERIA)
+    assert '"c3": {"score": 6.5' in prompt
+
+
+def test_paper_first_sends_paper_as_system_prompt_and_criterion_as_user_prompt():
+    generate_json = MagicMock(return_value={"score": 5, "reason": "ok"})
+    ask = qa.partial(
+        qa._paper_first,
+        qa.partial(generate_json, system_prompt_template=_template()),
+        _template("_criterion"),
+    )
+
+    for c in _CRITERIA[:2]:
+        ask(template_data=qa._extract_context({"topic": "t"}, c), user_prompt="paper")
+
+    (first, second) = [c.kwargs for c in generate_json.call_args_list]
+    assert first["template_data"] == second["template_data"]
+    assert first["template_data"] == {"topic": "t", "paper": "paper"}
+    assert first["user_prompt"].startswith("## EVALUATION CRITERIA\n\nc1\n")
+    assert "\nc2\n" in second["user_prompt"]
+    system_prompt = _template().render(**first["template_data"])
+    assert system_prompt.endswith("-----\npaper\n-----")
+
+
+def test_sections_in_request_keeps_the_system_prompt_shared_by_requests():
+    generate_json = MagicMock(return_value={"score": 5, "reason": "ok"})
+    ask = qa.partial(
+        qa._sections_in_request,
+        qa.partial(generate_json, system_prompt_template=_template()),
+        _template("_criterion"),
+    )
+
+    for c, sections in zip(_CRITERIA[:2], ["## Method", "## Threats"]):
+        ask(template_data=qa._extract_context({"topic": "t"}, c), user_prompt=sections)
+
+    (first, second) = [c.kwargs for c in generate_json.call_args_list]
+    assert first["template_data"] == second["template_data"] == {"topic": "t"}
+    assert first["user_prompt"].startswith(
+        "-----\n## Method\n-----\n\n## EVALUATION CRITERIA\n\nc1\n"
+    )
+    assert second["user_prompt"].startswith("-----\n## Threats\n-----")
+    system_prompt = _template().render(**first["template_data"])
+    assert system_prompt.endswith("be critical.")
+
+
+def test_evaluate_papers_sends_each_criterion_only_its_relevant_sections():
+    paper = "\n\n".join(
+        f"## {title}\n\n{body * 40}"
+        for title, body in [
+            ("Method", "we sampled participants "),
+            ("Threats", "validity threats are discussed "),
+            ("Results", "accuracy improved markedly "),
+        ]
+    )
+    criteria = [
+        dict(_CRITERIA[0], label="threats", question="validity threats?"),
+        dict(_CRITERIA[1], label="sample", question="participants sampled?"),
+    ]
+    prompts = {}
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        prompts[template_data["question"]] = user_prompt
+        return {"score": 5, "reason": "ok"}
+
+    qa._evaluate_papers(
+        [((0, "https://x/0.pdf", Path("/tmp/0.pdf")), paper)],
+        generate_json,
+        {"topic": "t"},
+        criteria,
+        context_budget=300,
+    )
+
+    assert prompts["validity threats?"].startswith("## Threats")
+    assert prompts["participants sampled?"].startswith("## Method")
+    assert "## Results" not in "".join(prompts.values())
+
+
+def test_evaluate_papers_retrieves_sections_for_criteria_scored_separately():
+    paper = "\n\n".join(
+        f"## {title}\n\n{body * 40}"
+        for title, body in [
+            ("Method", "we sampled participants "),
+            ("Threats", "validity threats are discussed "),
+        ]
+    )
+    criteria = [
+        dict(_CRITERIA[0], label="threats", question="validity threats?"),
+        dict(_CRITERIA[1], label="sample", question="participants sampled?"),
+    ]
+    generate_combined, _ = _combined(ValueError("LLM answered non-JSON value"))
+    prompts = {}
+
+    def generate_json(template_data, user_prompt, refresh=False):
+        prompts[template_data["question"]] = user_prompt
+        return {"score": 5, "reason": "ok"}
+
+    qa._evaluate_papers(
+        [((0, "https://x/0.pdf", Path("/tmp/0.pdf")), paper)],
+        generate_json,
+        {"topic": "t"},
+        criteria,
+        generate_combined=generate_combined,
+        context_budget=300,
+    )
+
+    assert "## Method" not in prompts["validity threats?"]
+    assert "## Threats" not in prompts["participants sampled?"]
@@ -48,6 +48,24 @@ def valid_qa_config_path(tmp_path):
     return path
 
 
+def _args(input_file, config_path, *options):
+    # downloads and the extraction cache stay in the test's directory
+    return [
+        str(input_file),
+        "--config",
+        str(config_path),
+        "-D",
+        str(input_file.parent),
+        *options,
+    ]
+
+
+def _file_provider(result):
+    provider = MagicMock()
+    provider.fetch_many.side_effect = lambda urls: ((url, result) for url in urls)
+    return provider
+
+
 def _obj_that_stops_after_ensure_model():
     provider = MagicMock()
     provider.ensure_model.return_value = False
@@ -73,7 +91,7 @@ def test_study_qa_verifies_tls_by_default(
 
     runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=_obj_that_stops_after_ensure_model(),
     )
 
@@ -97,12 +115,7 @@ def test_study_qa_can_disable_tls_verification(
 
     runner.invoke(
         study_qa,
-        [
-            str(input_file),
-            "--config",
-            str(valid_qa_config_path),
-            "--insecure-skip-tls-verify",
-        ],
+        _args(input_file, valid_qa_config_path, "--insecure-skip-tls-verify"),
         obj=_obj_that_stops_after_ensure_model(),
     )
 
@@ -116,7 +129,7 @@ def test_study_qa_reports_error_for_invalid_config_without_touching_provider(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(invalid_qa_config_path)],
+        _args(input_file, invalid_qa_config_path),
         obj=obj,
     )
 
@@ -145,7 +158,7 @@ def test_study_qa_public_command_writes_scores_and_evaluation(
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
-        MagicMock(return_value=MagicMock(return_value=paper)),
+        MagicMock(return_value=_file_provider(paper)),
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
@@ -154,7 +167,7 @@ def test_study_qa_public_command_writes_scores_and_evaluation(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=AssistantParams(provider_factory=provider_factory, model_choice="gpt_oss"),
     )
 
@@ -185,7 +198,7 @@ def test_study_qa_public_command_leaves_unscored_criterion_empty(
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
-        MagicMock(return_value=MagicMock(return_value=paper)),
+        MagicMock(return_value=_file_provider(paper)),
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
@@ -194,7 +207,7 @@ def test_study_qa_public_command_leaves_unscored_criterion_empty(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=AssistantParams(
             provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
         ),
@@ -231,7 +244,7 @@ def test_study_qa_public_command_uses_failsafe_reader_after_reader_failure(
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
-        MagicMock(return_value=MagicMock(return_value=paper)),
+        MagicMock(return_value=_file_provider(paper)),
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
@@ -244,7 +257,7 @@ def test_study_qa_public_command_uses_failsafe_reader_after_reader_failure(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=AssistantParams(
             provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
         ),
@@ -267,7 +280,7 @@ def test_study_qa_public_command_records_download_failure(
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
-        MagicMock(return_value=MagicMock(side_effect=ValueError("bad download"))),
+        MagicMock(return_value=_file_provider(ValueError("bad download"))),
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.reader_factory", MagicMock()
@@ -275,7 +288,7 @@ def test_study_qa_public_command_records_download_failure(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=AssistantParams(
             provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
         ),
@@ -304,7 +317,7 @@ def test_study_qa_public_command_skips_evaluation_failure(
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
-        MagicMock(return_value=MagicMock(return_value=paper)),
+        MagicMock(return_value=_file_provider(paper)),
     )
     monkeypatch.setattr(
         "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
@@ -313,10 +326,95 @@ def test_study_qa_public_command_skips_evaluation_failure(
 
     result = runner.invoke(
         study_qa,
-        [str(input_file), "--config", str(valid_qa_config_path)],
+        _args(input_file, valid_qa_config_path),
         obj=AssistantParams(
             provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
         ),
     )
 
     assert result.exit_code == 0, result.output
+
+
+def test_study_qa_public_command_resumes_journaled_scores(
+    runner, input_file, valid_qa_config_path, tmp_path, monkeypatch
+):
+    paper = tmp_path / "paper.pdf"
+    paper.write_bytes(b"pdf")
+    data = pd.DataFrame([{"url": "file:///paper.pdf", "re1": None}])
+    provider = MagicMock()
+    provider.ensure_model.return_value = True
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.return_value = {"score": 8, "reason": "clearly reported"}
+    reader = MagicMock()
+    reader.read_file.return_value = "paper text"
+    file_provider = _file_provider(paper)
+
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.load_df",
+        lambda *args, **kwargs: data.copy(),
+    )
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
+        MagicMock(return_value=file_provider),
+    )
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
+        MagicMock(return_value=reader),
+    )
+    obj = AssistantParams(
+        provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
+    )
+    args = _args(input_file, valid_qa_config_path)
+    runner.invoke(study_qa, args, obj=obj)
+    generate_json.reset_mock()
+    file_provider.fetch_many.reset_mock()
+
+    result = runner.invoke(study_qa, args, obj=obj)
+
+    assert result.exit_code == 0, result.output
+    generate_json.assert_not_called()
+    assert list(file_provider.fetch_many.call_args.args[0]) == []
+    output = pd.read_excel(input_file.parent / "papers-gpt_oss.xlsx")
+    assert output.loc[0, "re1"] == 8
+    assert "clearly reported" in output.loc[0, "evaluation"]
+
+
+def test_study_qa_public_command_starts_over_when_scoring_mode_changes(
+    runner, input_file, valid_qa_config_path, tmp_path, monkeypatch
+):
+    paper = tmp_path / "paper.pdf"
+    paper.write_bytes(b"pdf")
+    data = pd.DataFrame([{"url": "file:///paper.pdf", "re1": None}])
+    provider = MagicMock()
+    provider.ensure_model.return_value = True
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.return_value = {"score": 8, "reason": "clearly reported"}
+    reader = MagicMock()
+    reader.read_file.return_value = "paper text"
+
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.load_df",
+        lambda *args, **kwargs: data.copy(),
+    )
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.FileProvider",
+        MagicMock(return_value=_file_provider(paper)),
+    )
+    monkeypatch.setattr(
+        "mapwisefox.assistant.quality_assessment._study_qa.reader_factory",
+        MagicMock(return_value=reader),
+    )
+    obj = AssistantParams(
+        provider_factory=MagicMock(return_value=provider), model_choice="gpt_oss"
+    )
+    runner.invoke(study_qa, _args(input_file, valid_qa_config_path), obj=obj)
+    generate_json.reset_mock()
+
+    result = runner.invoke(
+        study_qa,
+        _args(input_file, valid_qa_config_path, "--scoring-mode", "combined"),
+        obj=obj,
+    )
+
+    assert result.exit_code == 0, result.output
+    generate_json.assert_called()
@@ -3,24 +3,31 @@ from pathlib import Path
 from mapwisefox.assistant.tools import load_template
 
 
-TEMPLATE_PATH = (
+TEMPLATE_DIR = (
     Path(__file__).parents[4]
     / "src"
     / "mapwisefox"
     / "assistant"
     / "quality_assessment"
-    / "_study_qa.j2"
 )
 
 
-def test_qa_template_renders_criterion_context():
-    rendered = load_template(TEMPLATE_PATH).render(
+def test_qa_template_renders_topic_and_paper():
+    rendered = load_template(TEMPLATE_DIR / "_study_qa.j2").render(
+        topic="entity resolution", paper="paper text"
+    )
+
+    assert "entity resolution" in rendered
+    assert rendered.endswith("-----\npaper text\n-----")
+
+
+def test_qa_criterion_template_renders_criterion_context():
+    rendered = load_template(TEMPLATE_DIR / "_study_qa_criterion.j2").render(
         topic="entity resolution",
         question="Is the method clear?",
         description="Assess the reported method.",
         scoring="1 to 10",
     )
 
-    assert "entity resolution" in rendered
     assert "Assess the reported method." in rendered
     assert "1 to 10" in rendered
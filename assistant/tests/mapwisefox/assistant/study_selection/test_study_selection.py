@@ -1,11 +1,23 @@
+import io
 import json
+import threading
 from unittest.mock import MagicMock
 
 import pandas as pd
 import pytest
+from tenacity import wait_none
 
-from mapwisefox.assistant.config import AssistantParams, SelectionResponse
-from mapwisefox.assistant.study_selection._study_selection import study_selection
+from mapwisefox.assistant.config import (
+    AssistantParams,
+    OutputMode,
+    SelectionResponse,
+)
+from mapwisefox.assistant.study_selection._study_selection import (
+    _evaluate_records,
+    _pack_records,
+    study_selection,
+)
+from mapwisefox.assistant.tools.llm import BatchStatus
 
 
 @pytest.fixture
@@ -189,3 +201,523 @@ def test_study_selection_reports_error_for_invalid_config(
 
     assert result.exit_code != 0
     provider_factory.assert_not_called()
+
+
+@pytest.fixture
+def many_results_path(tmp_path):
+    path = tmp_path / "many.xlsx"
+    pd.DataFrame([{"title": f"T{i}", "abstract": f"A{i}"} for i in range(12)]).to_excel(
+        path, index=False
+    )
+    return path
+
+
+def _answer_by_title(user_prompt, **_):
+    title = user_prompt.splitlines()[0].split(": ")[1]
+    if int(title[1:]) % 2:
+        return {"answer": "exclude", "justification": f"odd {title}"}
+    return {"answer": "include"}
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_study_selection_writes_answers_to_their_rows_with_concurrency(
+    runner, valid_selection_config_path, many_results_path, concurrency
+):
+    provider = _fake_provider()
+    provider.new_json_generator.return_value.generate_json.side_effect = (
+        _answer_by_title
+    )
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(many_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--concurrency",
+            concurrency,
+        ],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    assert result.exit_code == 0, result.output
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+    assert written.loc[3, "exclude_reason"] == "odd T3"
+
+
+def test_study_selection_aggregates_streamed_answers_per_record(
+    runner, valid_selection_config_path, many_results_path
+):
+    provider = _fake_provider()
+    provider_factory = MagicMock(return_value=provider)
+
+    def stream_title(user_prompt, **_):
+        on_text = provider_factory.call_args.kwargs["on_text"]
+        for fragment in user_prompt.splitlines()[0].split(": "):
+            on_text(fragment)
+        return {"answer": "include"}
+
+    provider.new_json_generator.return_value.generate_json.side_effect = stream_title
+    out = io.StringIO()
+    obj = _obj(provider_factory)
+    obj.output_mode, obj.output_file = OutputMode.aggregated, out
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(many_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--concurrency",
+            "4",
+        ],
+        obj=obj,
+    )
+
+    assert result.exit_code == 0, result.output
+    lines = out.getvalue().splitlines()
+    assert sorted(lines) == sorted(f"[{i}] titleT{i}" for i in range(12))
+
+
+def test_study_selection_retries_incomplete_answers(
+    runner, valid_selection_config_path, search_results_path, monkeypatch
+):
+    monkeypatch.setattr(
+        "mapwisefox.assistant.study_selection._study_selection._RETRY_WAIT",
+        wait_none(),
+    )
+    provider = _fake_provider(answers=[{}, {"answer": "include"}])
+
+    result = runner.invoke(
+        study_selection,
+        [str(search_results_path), "--config-file", str(valid_selection_config_path)],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    assert result.exit_code == 0, result.output
+    written = pd.read_excel(search_results_path.parent / "results-gpt_oss.xlsx")
+    assert written.loc[0, "include"] == "include"
+
+
+def test_evaluate_records_keeps_requests_in_flight():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def evaluate(user_prompt):
+        barrier.wait()
+        return {"answer": user_prompt}
+
+    results = dict(_evaluate_records(((i, str(i)) for i in range(3)), evaluate, 3))
+
+    assert results == {i: {"answer": str(i)} for i in range(3)}
+
+
+def test_study_selection_resumes_journaled_answers(
+    runner, valid_selection_config_path, many_results_path
+):
+    args = [str(many_results_path), "--config-file", str(valid_selection_config_path)]
+    interrupted = _fake_provider()
+    interrupted.new_json_generator.return_value.generate_json.side_effect = [
+        {"answer": "include"},
+        {"answer": "exclude", "justification": "odd T1"},
+        KeyboardInterrupt(),
+    ]
+    runner.invoke(study_selection, args, obj=_obj(MagicMock(return_value=interrupted)))
+    resumed = _fake_provider()
+    generate_json = resumed.new_json_generator.return_value.generate_json
+    generate_json.side_effect = _answer_by_title
+
+    result = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=resumed))
+    )
+
+    assert result.exit_code == 0, result.output
+    assert generate_json.call_count == 10
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+
+
+def test_study_selection_no_resume_evaluates_every_record(
+    runner, valid_selection_config_path, search_results_path
+):
+    args = [
+        str(search_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+    ]
+    runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=_fake_provider()))
+    )
+    provider = _fake_provider()
+
+    runner.invoke(
+        study_selection,
+        args + ["--no-resume"],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    provider.new_json_generator.return_value.generate_json.assert_called_once()
+
+
+def test_study_selection_batch_mode_merges_batch_answers(
+    runner, valid_selection_config_path, many_results_path, fake_batch_provider
+):
+    def answer(user_prompt):
+        # T3 comes back incomplete and T5 is missing from the batch results
+        if user_prompt.startswith("title: T3"):
+            return {"answer": "exclude"}
+        if user_prompt.startswith("title: T5"):
+            return None
+        return _answer_by_title(user_prompt)
+
+    provider = fake_batch_provider(answer)
+    provider.generator = MagicMock()
+    provider.generator.generate_json.side_effect = _answer_by_title
+    args = [
+        str(many_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+        "--batch",
+    ]
+
+    result = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=provider))
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(provider.batches) == 1 and len(provider.batches[0]) == 12
+    retried = [
+        c.kwargs["user_prompt"].splitlines()[0]
+        for c in provider.generator.generate_json.call_args_list
+    ]
+    assert sorted(retried) == ["title: T3", "title: T5"]
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+    assert written.loc[3, "exclude_reason"] == "odd T3"
+
+    resumed = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=provider))
+    )
+
+    assert resumed.exit_code == 0, resumed.output
+    assert len(provider.batches) == 1
+
+
+def test_study_selection_batch_mode_resumes_the_submitted_batch(
+    runner, valid_selection_config_path, many_results_path, fake_batch_provider
+):
+    interrupted = fake_batch_provider(_answer_by_title)
+    interrupted.generator = MagicMock()
+    interrupted._batch_status = MagicMock(side_effect=KeyboardInterrupt())
+    args = [
+        str(many_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+        "--batch",
+    ]
+    runner.invoke(study_selection, args, obj=_obj(MagicMock(return_value=interrupted)))
+    # the provider still holds the batch when the next run starts
+    provider = fake_batch_provider(_answer_by_title)
+    provider.generator = MagicMock()
+    provider.batches = interrupted.batches
+
+    result = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=provider))
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(provider.batches) == 1
+    provider.generator.generate_json.assert_not_called()
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+
+
+def test_study_selection_batch_mode_submits_a_failed_batch_again(
+    runner, valid_selection_config_path, many_results_path, fake_batch_provider
+):
+    interrupted = fake_batch_provider(_answer_by_title)
+    interrupted.generator = MagicMock()
+    interrupted._batch_status = MagicMock(side_effect=KeyboardInterrupt())
+    args = [
+        str(many_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+        "--batch",
+    ]
+    runner.invoke(study_selection, args, obj=_obj(MagicMock(return_value=interrupted)))
+    provider = fake_batch_provider(_answer_by_title)
+    provider.generator = MagicMock()
+    provider.batches = interrupted.batches
+    statuses = iter([BatchStatus.failed, BatchStatus.ended])
+    provider._batch_status = lambda batch_id: next(statuses)
+
+    result = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=provider))
+    )
+
+    assert result.exit_code == 0, result.output
+    assert len(provider.batches) == 2 and len(provider.batches[1]) == 12
+
+
+def test_study_selection_batch_mode_requires_a_batch_capable_provider(
+    runner, valid_selection_config_path, search_results_path
+):
+    provider = _fake_provider()
+    provider.supports_batches = False
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(search_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--batch",
+        ],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    assert result.exit_code == 2
+    assert "batch mode" in result.output
+    provider.new_json_generator.assert_not_called()
+
+
+def test_pack_records_stays_within_record_and_token_limits():
+    records = [(0, "a" * 40), (1, "b" * 40), (2, "c" * 40), (3, "d" * 400)]
+
+    assert [[ix for ix, _ in g] for g in _pack_records(records, 2, 1000)] == [
+        [0, 1],
+        [2, 3],
+    ]
+    assert [[ix for ix, _ in g] for g in _pack_records(records, 10, 30)] == [
+        [0, 1],
+        [2],
+        [3],
+    ]
+
+
+def _answer_records(user_prompt, response_schema, **_):
+    if "answers" not in response_schema["properties"]:
+        return _answer_by_title(user_prompt)
+    answers = []
+    for n, record in enumerate(user_prompt.split("### Record ")[1:], start=1):
+        answer = _answer_by_title(record.split("\n", 1)[1])
+        # T3's verdict comes back without a justification and T5's is missing
+        if record.split("\n")[1] == "title: T3":
+            answer = {"answer": "exclude"}
+        if record.split("\n")[1] != "title: T5":
+            answers.append({"id": str(n), **answer})
+    return {"answers": answers}
+
+
+def test_study_selection_packs_records_into_multi_record_prompts(
+    runner, valid_selection_config_path, many_results_path
+):
+    provider = _fake_provider()
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.side_effect = _answer_records
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(many_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--records-per-prompt",
+            "5",
+        ],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    assert result.exit_code == 0, result.output
+    prompts = [c.kwargs["user_prompt"] for c in generate_json.call_args_list]
+    multi = [p for p in prompts if p.startswith("### Record")]
+    assert [p.count("### Record") for p in multi] == [5, 5, 2]
+    assert sorted(p.splitlines()[0] for p in prompts if p not in multi) == [
+        "title: T3",
+        "title: T5",
+    ]
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+    assert written.loc[3, "exclude_reason"] == "odd T3"
+
+
+def test_study_selection_starts_over_when_records_per_prompt_changes(
+    runner, valid_selection_config_path, search_results_path
+):
+    args = [str(search_results_path), "--config-file", str(valid_selection_config_path)]
+    runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=_fake_provider()))
+    )
+    provider = _fake_provider()
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.side_effect = _answer_records
+
+    runner.invoke(
+        study_selection,
+        args + ["--records-per-prompt", "5"],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    generate_json.assert_called()
+
+
+def _screening_answer(user_prompt, **_):
+    # the screening model is sure about T0-T5 only, and fails on T6
+    n = int(user_prompt.splitlines()[0].split(": T")[1])
+    if n == 6:
+        raise RuntimeError("screening model crashed")
+    return {**_answer_by_title(user_prompt), "confidence": 0.95 if n < 6 else 0.5}
+
+
+def test_study_selection_cascade_escalates_only_uncertain_records(
+    runner, valid_selection_config_path, many_results_path, monkeypatch
+):
+    monkeypatch.setattr(
+        "mapwisefox.assistant.study_selection._study_selection._RETRY_WAIT",
+        wait_none(),
+    )
+    screening, provider = _fake_provider(), _fake_provider()
+    screening.new_json_generator.return_value.generate_json.side_effect = (
+        _screening_answer
+    )
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.side_effect = _answer_by_title
+    obj = _obj(MagicMock(return_value=provider))
+    obj.screening_provider_factory = MagicMock(return_value=screening)
+    obj.screening_model_choice = "small"
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(many_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--cascade",
+        ],
+        obj=obj,
+    )
+
+    assert result.exit_code == 0, result.output
+    escalated = [c.kwargs["user_prompt"] for c in generate_json.call_args_list]
+    assert sorted(p.splitlines()[0] for p in escalated) == sorted(
+        f"title: T{n}" for n in range(6, 12)
+    )
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written["include"].tolist() == ["include", "exclude"] * 6
+    assert "12 records" in result.output
+    assert "3 included, 3 excluded; 6 escalated to gpt_oss" in result.output
+
+
+def test_study_selection_cascade_requires_a_screening_model(
+    runner, valid_selection_config_path, search_results_path
+):
+    provider = _fake_provider()
+
+    result = runner.invoke(
+        study_selection,
+        [
+            str(search_results_path),
+            "--config-file",
+            str(valid_selection_config_path),
+            "--cascade",
+        ],
+        obj=_obj(MagicMock(return_value=provider)),
+    )
+
+    assert result.exit_code == 2
+    assert "--screening-model" in result.output
+
+
+class _TitleEmbedder:
+    """Makes records with a higher title number more similar to the criteria."""
+
+    calls = []
+    api_keys = []
+
+    def __init__(self, model, ollama_host, api_key=None):
+        _TitleEmbedder.api_keys.append(api_key)
+
+    def __call__(self, texts):
+        _TitleEmbedder.calls.append(len(texts))
+        vectors = []
+        for text in texts:
+            if text.startswith("title: T"):
+                n = int(text.splitlines()[0].split(": T")[1])
+                vectors.append([1.0, 12.0 - n])
+            else:
+                vectors.append([1.0, 0.0])
+        return vectors
+
+
+def test_study_selection_ranks_records_and_auto_excludes_the_tail(
+    runner, valid_selection_config_path, many_results_path, monkeypatch
+):
+    monkeypatch.setattr(
+        "mapwisefox.assistant.study_selection._study_selection.OllamaEmbedder",
+        _TitleEmbedder,
+    )
+    _TitleEmbedder.calls = []
+    provider = _fake_provider()
+    generate_json = provider.new_json_generator.return_value.generate_json
+    generate_json.side_effect = _answer_by_title
+    args = [
+        str(many_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+        "--embedding-model",
+        "nomic-embed-text",
+        "--auto-exclude-tail",
+        "0.25",
+        "--no-resume",
+    ]
+
+    result = runner.invoke(
+        study_selection, args, obj=_obj(MagicMock(return_value=provider))
+    )
+
+    assert result.exit_code == 0, result.output
+    asked = [
+        c.kwargs["user_prompt"].splitlines()[0] for c in generate_json.call_args_list
+    ]
+    assert asked == [f"title: T{n}" for n in range(11, 2, -1)]
+    written = pd.read_excel(many_results_path.parent / "many-gpt_oss.xlsx")
+    assert written.loc[:2, "include"].tolist() == ["exclude"] * 3
+    assert (
+        written.loc[0, "exclude_reason"]
+        == "least similar to the selection criteria by embedding"
+    )
+    assert written["relevance"].is_monotonic_increasing
+
+    runner.invoke(study_selection, args, obj=_obj(MagicMock(return_value=provider)))
+
+    # the second run reuses the cached embeddings of records and criteria
+    assert _TitleEmbedder.calls == [13]
+
+
+def test_study_selection_sends_the_embedding_model_only_its_own_api_key(
+    runner, valid_selection_config_path, search_results_path, monkeypatch
+):
+    monkeypatch.setattr(
+        "mapwisefox.assistant.study_selection._study_selection.OllamaEmbedder",
+        _TitleEmbedder,
+    )
+    _TitleEmbedder.api_keys = []
+    obj = _obj(MagicMock(return_value=_fake_provider()))
+    obj.api_key = "hosted-key"
+    args = [
+        str(search_results_path),
+        "--config-file",
+        str(valid_selection_config_path),
+        "--embedding-model",
+        "nomic-embed-text",
+        "--embedding-cache",
+        str(search_results_path.parent / "embeddings.npz"),
+        "--no-resume",
+    ]
+
+    runner.invoke(study_selection, args, obj=obj)
+    runner.invoke(
+        study_selection, args + ["--embedding-api-key", "ollama-key"], obj=obj
+    )
+
+    assert _TitleEmbedder.api_keys == [None, "ollama-key"]
@@ -45,3 +45,21 @@ def test_selection_template_renders_additional_context():
     rendered = load_template(TEMPLATE_PATH).render(**config.model_dump())
 
     assert "Prioritize architecture descriptions." in rendered
+
+
+def test_multi_record_template_keeps_criteria_and_asks_for_answer_array():
+    config = SelectionConfig(
+        review_topic="entity resolution",
+        inclusion_criteria=[{"label": "english", "description": "written in English"}],
+        exclusion_criteria=[
+            {"label": "not primary", "description": "not a primary study"}
+        ],
+    )
+
+    rendered = load_template(
+        TEMPLATE_PATH.with_name("_study_selection_multi.j2")
+    ).render(**config.model_dump())
+
+    assert "written in English" in rendered
+    assert '"answers"' in rendered
+    assert '- {"answer": "exclude", "justification"' not in rendered
@@ -1,12 +1,16 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import jinja2
 
+from mapwisefox.assistant.instrumentation import MetricsRegistry
 from mapwisefox.assistant.tools.llm._anthropic import (
     AnthropicJSONGenerator,
     AnthropicProvider,
 )
+from mapwisefox.assistant.tools.llm._metrics import LLMMetrics
+from mapwisefox.assistant.tools.llm._usage import TokenUsage
 
 
 class Param(dict):
@@ -43,6 +47,25 @@ def _stream(events):
     return stream
 
 
+class _AsyncStream:
+    def __init__(self, items):
+        self.items = list(items)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+
 def test_anthropic_generator_streams_thinking_and_text():
     client = MagicMock()
     events = [
@@ -58,10 +81,7 @@ def test_anthropic_generator_streams_thinking_and_text():
     ]
     client.beta.messages.stream.return_value = _stream(events)
     thoughts, text = [], []
-    with (
-        _patch_modules(),
-        patch("mapwisefox.assistant.tools.llm._anthropic.time.sleep"),
-    ):
+    with _patch_modules():
         generator = AnthropicJSONGenerator(
             client,
             "model",
@@ -91,13 +111,69 @@ def test_anthropic_generator_supports_unstructured_json_mode():
     )
     with _patch_modules():
         generator = AnthropicJSONGenerator(client, "model")
-        with patch("mapwisefox.assistant.tools.llm._anthropic.time.sleep"):
-            result = generator.generate_json(jinja2.Template("system"), {}, "user")
+        result = generator.generate_json(jinja2.Template("system"), {}, "user")
 
     assert result == {"ok": True}
     assert client.beta.messages.stream.call_args.kwargs["output_format"] is None
 
 
+def test_anthropic_generator_caches_system_prompt_and_records_usage():
+    client = MagicMock()
+    usage = SimpleNamespace(
+        input_tokens=20, cache_read_input_tokens=1500, cache_creation_input_tokens=0
+    )
+    client.beta.messages.stream.return_value = _stream(
+        [
+            SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage)),
+            SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="text_delta", text='{"ok": true}'),
+            ),
+        ]
+    )
+    with _patch_modules():
+        generator = AnthropicJSONGenerator(client, "model", token_usage=TokenUsage())
+        generator.generate_json(jinja2.Template("paper"), {}, "criterion")
+
+    kwargs = client.beta.messages.stream.call_args.kwargs
+    assert kwargs["system"] == [
+        {"type": "text", "text": "paper", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert kwargs["messages"] == [{"role": "user", "content": "criterion"}]
+    assert generator._token_usage.input_tokens == 1520
+    assert generator._token_usage.cached_input_tokens == 1500
+
+
+def test_anthropic_generator_records_answer_tokens_of_the_message_delta():
+    client = MagicMock()
+    usage = SimpleNamespace(
+        input_tokens=20, cache_read_input_tokens=0, cache_creation_input_tokens=0
+    )
+    client.beta.messages.stream.return_value = _stream(
+        [
+            SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage)),
+            SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="text_delta", text='{"ok": true}'),
+            ),
+            SimpleNamespace(
+                type="message_delta", usage=SimpleNamespace(output_tokens=6)
+            ),
+        ]
+    )
+    registry = MetricsRegistry()
+    with _patch_modules():
+        generator = AnthropicJSONGenerator(
+            client, "model", metrics=LLMMetrics(registry, "anthropic", "model")
+        )
+        generator.generate_json(jinja2.Template("paper"), {}, "criterion")
+
+    labels = {"provider": "anthropic", "model": "model"}
+    prefix = "mwf_assistant_llm"
+    assert registry.counter(f"{prefix}_input_tokens_total").value(**labels) == 20
+    assert registry.counter(f"{prefix}_output_tokens_total").value(**labels) == 6
+
+
 def test_anthropic_provider_ensures_model_and_handles_api_error():
     client = MagicMock()
     api_error = type("APIError", (Exception,), {})
@@ -112,3 +188,63 @@ def test_anthropic_provider_ensures_model_and_handles_api_error():
         assert provider.ensure_model() is True
         client.models.retrieve.side_effect = api_error("offline")
         assert provider.ensure_model() is False
+
+
+def test_anthropic_provider_runs_batches_through_message_batches():
+    client = MagicMock()
+    batches = client.beta.messages.batches
+    batches.create.return_value = SimpleNamespace(id="msgbatch_1")
+    batches.retrieve.return_value = SimpleNamespace(processing_status="ended")
+    usage = SimpleNamespace(
+        input_tokens=10,
+        cache_read_input_tokens=700,
+        cache_creation_input_tokens=None,
+        output_tokens=5,
+    )
+    message = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text='{"ok": true}')], usage=usage
+    )
+    batches.results.return_value = [
+        SimpleNamespace(
+            custom_id="a", result=SimpleNamespace(type="succeeded", message=message)
+        ),
+        SimpleNamespace(custom_id="b", result=SimpleNamespace(type="expired")),
+    ]
+    token_usage = TokenUsage()
+    with _patch_modules(client):
+        provider = AnthropicProvider("model", "key", token_usage=token_usage)
+
+    answers = dict(
+        provider.generate_json_batch(
+            jinja2.Template("system"), {}, {"a": "one", "b": "two"}, {"type": "object"}
+        )
+    )
+
+    assert answers["a"] == {"ok": True}
+    assert "expired" in str(answers["b"])
+    requests = batches.create.call_args.kwargs["requests"]
+    assert requests[0]["custom_id"] == "a"
+    assert requests[0]["params"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert requests[0]["params"]["output_format"]["schema"] == {"type": "object"}
+    assert (token_usage.input_tokens, token_usage.cached_input_tokens) == (710, 700)
+
+
+def test_anthropic_generator_streams_through_the_shared_async_client():
+    client, async_client = MagicMock(), MagicMock()
+    async_client.beta.messages.stream.return_value = _AsyncStream(
+        [
+            SimpleNamespace(
+                type="content_block_delta",
+                delta=SimpleNamespace(type="text_delta", text='{"ok": true}'),
+            )
+        ]
+    )
+    with _patch_modules():
+        generator = AnthropicJSONGenerator(
+            client, "claude", async_client=lambda: async_client
+        )
+
+        result = asyncio.run(generator.agenerate_json(jinja2.Template("s"), {}, "u"))
+
+    assert result == {"ok": True}
+    client.beta.messages.stream.assert_not_called()
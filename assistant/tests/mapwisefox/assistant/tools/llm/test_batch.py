@@ -0,0 +1,124 @@
+from unittest.mock import MagicMock
+
+import jinja2
+import pytest
+
+from mapwisefox.assistant.tools.llm import (
+    BatchError,
+    BatchProviderMixin,
+    BatchStatus,
+    LLMProviderBase,
+)
+
+
+def _answers(provider, prompts, **kwargs):
+    return dict(
+        provider.generate_json_batch(
+            jinja2.Template("topic: {{ topic }}"),
+            {"topic": "t"},
+            prompts,
+            {"type": "object"},
+            **kwargs,
+        )
+    )
+
+
+def test_generate_json_batch_polls_until_the_batch_ends(fake_batch_provider):
+    provider = fake_batch_provider(lambda prompt: {"echo": prompt}, polls=3)
+    sleeps = []
+
+    answers = _answers(provider, {"a": "one", "b": "two"}, sleep=sleeps.append)
+
+    assert answers == {"a": {"echo": "one"}, "b": {"echo": "two"}}
+    assert sleeps == [60.0, 60.0]
+    (requests,) = provider.batches
+    assert [r.system_prompt for r in requests] == ["topic: t"] * 2
+    assert requests[0].response_format == {"type": "object"}
+
+
+def test_generate_json_batch_reports_unusable_answers_per_request(
+    fake_batch_provider,
+):
+    def answer(prompt):
+        return {
+            "ok": {"answer": "include"},
+            "failed": ValueError("request errored"),
+            "missing": None,
+        }[prompt]
+
+    provider = fake_batch_provider(answer)
+
+    answers = _answers(provider, {p: p for p in ("ok", "failed", "missing")})
+
+    assert answers["ok"] == {"answer": "include"}
+    assert str(answers["failed"]) == "request errored"
+    assert "no answer" in str(answers["missing"])
+
+
+def test_generate_json_batch_strips_code_fences_and_rejects_non_json(
+    fake_batch_provider,
+):
+    provider = fake_batch_provider(None)
+    provider._batch_results = lambda _: iter(
+        [("fenced", '```json\n{"ok": true}\n```'), ("prose", "no JSON here")]
+    )
+
+    answers = _answers(provider, {"fenced": "", "prose": ""})
+
+    assert answers["fenced"] == {"ok": True}
+    assert isinstance(answers["prose"], ValueError)
+
+
+def test_generate_json_batch_raises_when_the_provider_fails_the_batch(
+    fake_batch_provider,
+):
+    provider = fake_batch_provider(dict, status=BatchStatus.failed)
+
+    with pytest.raises(BatchError, match="batch-1"):
+        _answers(provider, {"a": "one"})
+
+
+def test_generate_json_batch_collects_a_batch_submitted_earlier(fake_batch_provider):
+    submitting = fake_batch_provider(lambda prompt: {"echo": prompt}, polls=2)
+    submitted = []
+    with pytest.raises(KeyboardInterrupt):
+        _answers(
+            submitting,
+            {"a": "one"},
+            on_submitted=submitted.append,
+            sleep=MagicMock(side_effect=KeyboardInterrupt()),
+        )
+    collecting = fake_batch_provider(lambda prompt: {"echo": prompt})
+    collecting.batches = list(submitting.batches)
+
+    answers = _answers(collecting, {"a": "one"}, submitted=submitted[0])
+
+    assert submitted == [{"id": "batch-1", "state": {}}]
+    assert answers == {"a": {"echo": "one"}}
+    assert len(collecting.batches) == 1
+
+
+def test_providers_do_not_support_batches_by_default():
+    class Provider(LLMProviderBase):
+        def ensure_model(self):
+            return True
+
+        def new_json_generator(self, max_retries=1, thinking=False):
+            return None
+
+    provider = Provider("model")
+
+    assert provider.supports_batches is False
+    assert not hasattr(provider, "generate_json_batch")
+
+
+def test_batch_providers_implement_the_batch_interface():
+    class Provider(BatchProviderMixin, LLMProviderBase):
+        def ensure_model(self):
+            return True
+
+        def new_json_generator(self, max_retries=1, thinking=False):
+            return None
+
+    with pytest.raises(TypeError, match="_submit_batch"):
+        Provider("model")
@@ -170,3 +170,131 @@ def test_bedrock_provider_maps_models_and_checks_availability():
         assert provider.ensure_model() is False
 
     assert errors
+
+
+def _bedrock_provider(clients, **kwargs):
+    client_module = SimpleNamespace(client=lambda service: clients[service])
+    exceptions = SimpleNamespace(
+        ClientError=type("ClientError", (Exception,), {}),
+        BotoCoreError=type("BotoCoreError", (Exception,), {}),
+    )
+    with patch(
+        "mapwisefox.assistant.tools.llm._bedrock.try_import",
+        side_effect=lambda name: client_module if name == "boto3" else exceptions,
+    ):
+        return BedrockProvider(
+            model="anthropic.claude-haiku",
+            api_key="token",
+            on_error=lambda *_: None,
+            **kwargs,
+        )
+
+
+def test_bedrock_provider_supports_batches_only_when_configured():
+    clients = {"bedrock": MagicMock(), "bedrock-runtime": MagicMock()}
+
+    assert _bedrock_provider(clients).supports_batches is False
+    assert _bedrock_provider(
+        clients, batch_s3_uri="s3://bucket/batches", batch_role_arn="arn:role"
+    ).supports_batches
+
+
+def test_bedrock_provider_runs_batches_as_model_invocation_jobs():
+    bedrock, s3 = MagicMock(), MagicMock()
+    arn = "arn:aws:bedrock:eu-west-1:1:model-invocation-job/job1"
+    bedrock.create_model_invocation_job.return_value = {"jobArn": arn}
+    bedrock.get_model_invocation_job.side_effect = [
+        {"status": "InProgress"},
+        {"status": "Completed"},
+        {"outputDataConfig": {"s3OutputDataConfig": {"s3Uri": "s3://bucket/out/"}}},
+    ]
+    output = {
+        "content": [{"type": "text", "text": '{"ok": true}'}],
+        "usage": {"input_tokens": 321},
+    }
+    lines = [
+        {"recordId": "00000000000", "modelOutput": output},
+        {"recordId": "00000000001", "error": {"errorMessage": "throttled"}},
+    ]
+    s3.list_objects_v2.return_value = {
+        "Contents": [
+            {"Key": "out/job1/manifest.json.out"},
+            {"Key": "out/job1/in.jsonl.out"},
+        ]
+    }
+    s3.get_object.return_value = {
+        "Body": SimpleNamespace(
+            read=lambda: "\n".join(json.dumps(line) for line in lines).encode()
+        )
+    }
+    clients = {"bedrock": bedrock, "bedrock-runtime": MagicMock(), "s3": s3}
+    provider = _bedrock_provider(
+        clients, batch_s3_uri="s3://bucket/batches/", batch_role_arn="arn:role"
+    )
+
+    answers = dict(
+        provider.generate_json_batch(
+            jinja2.Template("system"),
+            {},
+            {"a": "one", "b": "two"},
+            sleep=lambda _: None,
+        )
+    )
+
+    assert answers["a"] == {"ok": True}
+    assert "throttled" in str(answers["b"])
+    put = s3.put_object.call_args.kwargs
+    assert put["Bucket"] == "bucket" and put["Key"].startswith("batches/mapwisefox-")
+    records = [json.loads(line) for line in put["Body"].decode().splitlines()]
+    assert records[1]["modelInput"]["messages"] == [{"role": "user", "content": "two"}]
+    job = bedrock.create_model_invocation_job.call_args.kwargs
+    assert job["roleArn"] == "arn:role"
+    assert job["modelId"] == "eu.anthropic.claude-haiku"
+    s3.list_objects_v2.assert_called_once_with(Bucket="bucket", Prefix="out/job1/")
+    s3.get_object.assert_called_once_with(Bucket="bucket", Key="out/job1/in.jsonl.out")
+
+
+def test_bedrock_provider_collects_a_batch_submitted_by_another_process():
+    bedrock, s3 = MagicMock(), MagicMock()
+    arn = "arn:aws:bedrock:eu-west-1:1:model-invocation-job/job1"
+    bedrock.create_model_invocation_job.return_value = {"jobArn": arn}
+    bedrock.get_model_invocation_job.side_effect = [
+        {"status": "InProgress"},
+        {"status": "Completed"},
+        {"outputDataConfig": {"s3OutputDataConfig": {"s3Uri": "s3://bucket/out/"}}},
+    ]
+    output = {"content": [{"type": "text", "text": '{"ok": true}'}]}
+    s3.list_objects_v2.return_value = {"Contents": [{"Key": "out/job1/in.jsonl.out"}]}
+    s3.get_object.return_value = {
+        "Body": SimpleNamespace(
+            read=lambda: json.dumps(
+                {"recordId": "00000000001", "modelOutput": output}
+            ).encode()
+        )
+    }
+    clients = {"bedrock": bedrock, "bedrock-runtime": MagicMock(), "s3": s3}
+    settings = dict(batch_s3_uri="s3://bucket/batches", batch_role_arn="arn:role")
+    submitted = []
+    batches = _bedrock_provider(clients, **settings).generate_json_batch(
+        jinja2.Template("system"),
+        {},
+        {"a": "one", "b": "two"},
+        on_submitted=submitted.append,
+        sleep=MagicMock(side_effect=KeyboardInterrupt()),
+    )
+    # the submitting process is interrupted while waiting for the batch
+    with pytest.raises(KeyboardInterrupt):
+        dict(batches)
+
+    answers = dict(
+        _bedrock_provider(clients, **settings).generate_json_batch(
+            jinja2.Template("system"),
+            {},
+            {"a": "one", "b": "two"},
+            submitted=json.loads(json.dumps(submitted[0])),
+        )
+    )
+
+    assert submitted[0]["id"] == arn
+    assert answers["b"] == {"ok": True}
+    bedrock.create_model_invocation_job.assert_called_once()
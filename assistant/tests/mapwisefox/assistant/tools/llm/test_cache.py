@@ -0,0 +1,48 @@
+import secrets
+
+from mapwisefox.assistant.tools.llm._cache import ResponseCache
+
+
+def test_response_cache_key_depends_on_every_request_part():
+    base = ResponseCache.key("gen", "system", "user", "json")
+
+    assert base == ResponseCache.key("gen", "system", "user", "json")
+    assert base != ResponseCache.key("other", "system", "user", "json")
+    assert base != ResponseCache.key("gen", "other", "user", "json")
+    assert base != ResponseCache.key("gen", "system", "other", "json")
+    assert base != ResponseCache.key("gen", "system", "user", {"type": "object"})
+
+
+def test_response_cache_round_trips_and_counts_hits_and_misses(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    key = ResponseCache.key("gen", "system", "user", "json")
+
+    assert cache.get(key) is None
+    cache.put(key, "gen", '{"answer": "include"}')
+
+    assert cache.get(key) == '{"answer": "include"}'
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_response_cache_persists_between_instances(tmp_path):
+    path = tmp_path / "responses.sqlite3"
+    cache = ResponseCache(path)
+    cache.put("key", "gen", "{}")
+    cache.close()
+
+    assert ResponseCache(path).get("key") == "{}"
+
+
+def test_response_cache_evicts_least_recently_used_answers(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_size_bytes=1500)
+    for key in ["a", "b"]:
+        cache.put(key, "gen", secrets.token_hex(600))
+    cache.get("a")
+
+    cache.put("c", "gen", secrets.token_hex(600))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    cache.close()
@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
@@ -5,18 +6,39 @@ import jinja2
 import pytest
 
 from mapwisefox.assistant.tools.llm._google import GoogleJSONGenerator, GoogleProvider
+from mapwisefox.assistant.tools.llm._usage import TokenUsage
 
 
 def _part(text, thought=False):
     return SimpleNamespace(text=text, thought=thought)
 
 
-def _chunk(parts):
+def _chunk(parts, usage=None):
     return SimpleNamespace(
-        candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))]
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))],
+        usage_metadata=usage,
     )
 
 
+class _AsyncStream:
+    def __init__(self, items):
+        self.items = list(items)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+
 def test_google_generator_streams_thoughts_and_text():
     client = MagicMock()
     client.models.generate_content_stream.return_value = iter(
@@ -42,6 +64,24 @@ def test_google_generator_streams_thoughts_and_text():
     ] == {"type": "object"}
 
 
+def test_google_generator_records_usage_of_the_last_chunk():
+    client = MagicMock()
+    usage = SimpleNamespace(
+        prompt_token_count=3000,
+        cached_content_token_count=2048,
+        candidates_token_count=12,
+    )
+    client.models.generate_content_stream.return_value = iter(
+        [_chunk([_part('{"ok":')]), _chunk([_part(" true}")], usage)]
+    )
+    token_usage = TokenUsage()
+    generator = GoogleJSONGenerator(client, "gemini-pro", token_usage=token_usage)
+
+    generator.generate_json(jinja2.Template("system"), {}, "user")
+
+    assert (token_usage.input_tokens, token_usage.cached_input_tokens) == (3000, 2048)
+
+
 def test_google_generator_returns_empty_text_and_reports_errors():
     client = MagicMock()
     client.models.generate_content_stream.side_effect = RuntimeError("offline")
@@ -71,3 +111,24 @@ def test_google_provider_ensures_model_and_handles_api_error():
         client.models.get.side_effect = api_error("offline")
         assert provider.ensure_model() is False
     assert errors
+
+
+def test_google_generator_streams_through_the_client_aio_interface():
+    client = MagicMock()
+
+    async def generate_content_stream(**kwargs):
+        return _AsyncStream([_chunk([_part("think", True), _part('{"ok": true}')])])
+
+    client.aio.models.generate_content_stream.side_effect = generate_content_stream
+    module = SimpleNamespace(Client=MagicMock(return_value=client), APIError=Exception)
+    with patch(
+        "mapwisefox.assistant.tools.llm._google.try_import", return_value=module
+    ):
+        provider = GoogleProvider("gemini-pro", "key")
+        generator = provider.new_json_generator()
+
+    result = asyncio.run(generator.agenerate_json(jinja2.Template("s"), {}, "u"))
+
+    assert result == {"ok": True}
+    client.models.generate_content_stream.assert_not_called()
+    asyncio.run(provider.aclose())
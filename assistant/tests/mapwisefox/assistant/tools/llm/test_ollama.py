@@ -1,13 +1,40 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import jinja2
 
+from mapwisefox.assistant.instrumentation import MetricsRegistry
 from mapwisefox.assistant.tools.llm._ollama import OllamaJSONGenerator, OllamaProvider
+from mapwisefox.assistant.tools.llm._usage import TokenUsage
 
 
-def _chunk(thinking="", content=""):
-    return SimpleNamespace(message=SimpleNamespace(thinking=thinking, content=content))
+def _chunk(thinking="", content="", prompt_eval_count=None, eval_count=None):
+    return SimpleNamespace(
+        message=SimpleNamespace(thinking=thinking, content=content),
+        done=prompt_eval_count is not None,
+        prompt_eval_count=prompt_eval_count,
+        eval_count=eval_count,
+    )
+
+
+class _AsyncStream:
+    def __init__(self, items):
+        self.items = list(items)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
 
 
 def test_ollama_generator_streams_thoughts_and_text():
@@ -35,6 +62,22 @@ def test_ollama_generator_streams_thoughts_and_text():
     client.chat.assert_called_once()
 
 
+def test_ollama_generator_keeps_model_loaded_and_records_usage():
+    client = MagicMock()
+    client.chat.return_value = iter(
+        [_chunk(content='{"ok": true}'), _chunk(prompt_eval_count=42)]
+    )
+    token_usage = TokenUsage()
+    generator = OllamaJSONGenerator(client, "llama", token_usage=token_usage)
+
+    generator.generate_json(jinja2.Template("paper"), {}, "criterion")
+
+    kwargs = client.chat.call_args.kwargs
+    assert kwargs["keep_alive"] == OllamaJSONGenerator.KEEP_ALIVE
+    assert kwargs["messages"][0]["content"].startswith("paper")
+    assert (token_usage.requests, token_usage.input_tokens) == (1, 42)
+
+
 def test_ollama_provider_ensures_existing_model():
     client = MagicMock()
     client.list.return_value.models = [SimpleNamespace(model="model")]
@@ -126,3 +169,49 @@ def test_ollama_provider_returns_false_when_download_fails():
         )
 
     assert provider.ensure_model() is False
+
+
+def test_ollama_generator_streams_through_the_shared_async_client():
+    client, async_client = MagicMock(), MagicMock()
+
+    async def chat(**kwargs):
+        return _AsyncStream(
+            [_chunk(content='{"ok": true}'), _chunk(prompt_eval_count=7)]
+        )
+
+    async_client.chat.side_effect = chat
+    token_usage = TokenUsage()
+    generator = OllamaJSONGenerator(
+        client, "llama", token_usage=token_usage, async_client=lambda: async_client
+    )
+
+    result = asyncio.run(generator.agenerate_json(jinja2.Template("s"), {}, "u"))
+
+    assert result == {"ok": True}
+    assert token_usage.input_tokens == 7
+    client.chat.assert_not_called()
+
+
+def test_ollama_provider_records_metrics_of_its_generators():
+    client = MagicMock()
+    client.chat.return_value = iter(
+        [_chunk(content='{"ok": true}'), _chunk(prompt_eval_count=42, eval_count=9)]
+    )
+    module = SimpleNamespace(
+        Client=MagicMock(return_value=client),
+        RequestError=type("RequestError", (Exception,), {}),
+        ResponseError=type("ResponseError", (Exception,), {}),
+    )
+    registry = MetricsRegistry()
+    with patch(
+        "mapwisefox.assistant.tools.llm._ollama.try_import", return_value=module
+    ):
+        provider = OllamaProvider("llama", "localhost", metrics=registry)
+
+    provider.new_json_generator().generate_json(jinja2.Template("s"), {}, "u")
+
+    labels = {"provider": "ollama", "model": "llama"}
+    tokens = registry.counter("mwf_assistant_llm_output_tokens_total")
+    latency = registry.histogram("mwf_assistant_llm_request_duration_seconds")
+    assert tokens.value(**labels) == 9
+    assert latency.count(**labels) == 1
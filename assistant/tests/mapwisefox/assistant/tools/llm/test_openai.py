@@ -1,3 +1,5 @@
+import asyncio
+import json
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
@@ -5,6 +7,7 @@ import jinja2
 import pytest
 
 from mapwisefox.assistant.tools.llm._openai import OpenAIJSONGenerator, OpenAIProvider
+from mapwisefox.assistant.tools.llm._usage import TokenUsage
 
 
 class SchemaParam(dict):
@@ -26,12 +29,33 @@ def _stream(events):
     return stream
 
 
+class _AsyncStream:
+    def __init__(self, items):
+        self.items = list(items)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+
 def test_openai_generator_streams_text_and_builds_json_object_format():
     client = MagicMock()
     events = [
         SimpleNamespace(type="response.created"),
         SimpleNamespace(type="response.output_text.delta", delta='{"ok": true}'),
-        SimpleNamespace(type="response.completed"),
+        SimpleNamespace(
+            type="response.completed", response=SimpleNamespace(usage=None)
+        ),
     ]
     client.responses.stream.return_value = _stream(events)
     generator = OpenAIJSONGenerator(client, "model")
@@ -44,6 +68,46 @@ def test_openai_generator_streams_text_and_builds_json_object_format():
     }
 
 
+def test_openai_generator_keys_prompt_cache_on_system_prompt():
+    client = MagicMock()
+    client.responses.stream.side_effect = lambda **_: _stream(
+        [SimpleNamespace(type="response.output_text.delta", delta='{"ok": true}')]
+    )
+    generator = OpenAIJSONGenerator(client, "model")
+
+    for system, user in [("paper", "c1"), ("paper", "c2"), ("other", "c1")]:
+        generator.generate_json(jinja2.Template(system), {}, user)
+
+    keys = [
+        c.kwargs["prompt_cache_key"] for c in client.responses.stream.call_args_list
+    ]
+    assert keys[0] == keys[1] != keys[2]
+
+
+def test_openai_generator_records_cached_prompt_tokens():
+    client = MagicMock()
+    usage = SimpleNamespace(
+        input_tokens=1200,
+        input_tokens_details=SimpleNamespace(cached_tokens=1024),
+        output_tokens=30,
+    )
+    client.responses.stream.return_value = _stream(
+        [
+            SimpleNamespace(type="response.output_text.delta", delta='{"ok": true}'),
+            SimpleNamespace(
+                type="response.completed", response=SimpleNamespace(usage=usage)
+            ),
+        ]
+    )
+    token_usage = TokenUsage()
+    generator = OpenAIJSONGenerator(client, "model", token_usage=token_usage)
+
+    generator.generate_json(jinja2.Template("system"), {}, "user")
+
+    assert (token_usage.requests, token_usage.input_tokens) == (1, 1200)
+    assert token_usage.cached_input_tokens == 1024
+
+
 def test_openai_generator_builds_schema_format_and_reports_error_event():
     client = MagicMock()
     client.responses.stream.return_value = _stream(
@@ -90,3 +154,78 @@ def test_openai_provider_ensures_model_and_handles_api_error():
         assert provider.ensure_model() is True
         client.models.retrieve.side_effect = api_error("offline")
         assert provider.ensure_model() is False
+
+
+def test_openai_provider_runs_batches_through_the_batch_api():
+    client = MagicMock()
+    client.files.create.return_value = SimpleNamespace(id="file-in")
+    client.batches.create.return_value = SimpleNamespace(id="batch-1")
+    answered = {
+        "custom_id": "a",
+        "response": {
+            "status_code": 200,
+            "body": {
+                "output": [
+                    {"type": "reasoning", "content": []},
+                    {
+                        "type": "message",
+                        "content": [{"type": "output_text", "text": '{"ok": true}'}],
+                    },
+                ],
+                "usage": {
+                    "input_tokens": 900,
+                    "input_tokens_details": {"cached_tokens": 512},
+                },
+            },
+        },
+        "error": None,
+    }
+    failed = {"custom_id": "b", "response": None, "error": {"code": "bad"}}
+    client.batches.retrieve.side_effect = [
+        SimpleNamespace(status="in_progress"),
+        SimpleNamespace(status="completed"),
+        SimpleNamespace(output_file_id="file-out", error_file_id="file-err"),
+    ]
+    client.files.content.side_effect = lambda file_id: SimpleNamespace(
+        text=json.dumps(answered if file_id == "file-out" else failed)
+    )
+    usage = TokenUsage()
+    with patch(
+        "mapwisefox.assistant.tools.llm._openai.try_import",
+        return_value=_module(client),
+    ):
+        provider = OpenAIProvider("model", "key", token_usage=usage)
+
+    answers = dict(
+        provider.generate_json_batch(
+            jinja2.Template("system"),
+            {},
+            {"a": "one", "b": "two"},
+            {"type": "object"},
+            sleep=lambda _: None,
+        )
+    )
+
+    assert answers["a"] == {"ok": True}
+    assert isinstance(answers["b"], ValueError)
+    name, contents = client.files.create.call_args.kwargs["file"]
+    first = json.loads(contents.decode().splitlines()[0])
+    assert first["custom_id"] == "a"
+    assert first["url"] == "/v1/responses"
+    assert first["body"]["text"]["format"]["schema"] == {"type": "object"}
+    assert client.batches.create.call_args.kwargs["input_file_id"] == "file-in"
+    assert (usage.input_tokens, usage.cached_input_tokens) == (900, 512)
+
+
+def test_openai_generator_streams_through_the_shared_async_client():
+    client, async_client = MagicMock(), MagicMock()
+    async_client.responses.stream.return_value = _AsyncStream(
+        [SimpleNamespace(type="response.output_text.delta", delta='{"ok": true}')]
+    )
+    generator = OpenAIJSONGenerator(client, "model", async_client=lambda: async_client)
+
+    result = asyncio.run(generator.agenerate_json(jinja2.Template("s"), {}, "u"))
+
+    assert result == {"ok": True}
+    assert async_client.responses.stream.call_args.kwargs["input"] == "u"
+    client.responses.stream.assert_not_called()
@@ -1,8 +1,14 @@
+import asyncio
+
 import jinja2
 import pytest
 from itertools import repeat
 
+from mapwisefox.assistant.instrumentation import MetricsRegistry
 from mapwisefox.assistant.tools.llm._provider import JSONGenerator, LLMProviderBase
+from mapwisefox.assistant.tools.llm._cache import ResponseCache
+from mapwisefox.assistant.tools.llm._metrics import LLMMetrics
+from mapwisefox.assistant.tools.llm._rate_limit import RateLimiter
 
 
 class FakeGenerator(JSONGenerator):
@@ -92,6 +98,287 @@ def test_json_generator_raises_after_retries_are_exhausted():
         generator.generate_json(jinja2.Template("prompt"), {}, "paper")
 
 
+def test_json_generator_answers_repeated_requests_from_the_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    first = FakeGenerator(['{"answer": "include"}'], response_cache=cache)
+    second = FakeGenerator([], response_cache=cache)
+
+    first.generate_json(jinja2.Template("prompt"), {}, "paper")
+    result = second.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    assert result == {"answer": "include"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_json_generator_cache_is_keyed_on_the_rendered_prompt(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    generator = FakeGenerator(['{"n": 1}', '{"n": 2}'], response_cache=cache)
+    template = jinja2.Template("topic={{ topic }}")
+
+    generator.generate_json(template, {"topic": "a"}, "paper")
+
+    assert generator.generate_json(template, {"topic": "b"}, "paper") == {"n": 2}
+
+
+def test_json_generator_refresh_replaces_the_cached_answer(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    generator = FakeGenerator(['{"n": 1}', '{"n": 2}'], response_cache=cache)
+    generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    refreshed = generator.generate_json(
+        jinja2.Template("prompt"), {}, "paper", refresh=True
+    )
+
+    assert refreshed == {"n": 2}
+    assert generator.generate_json(jinja2.Template("prompt"), {}, "paper") == {"n": 2}
+
+
+def test_json_generator_does_not_cache_failed_answers(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    generator = FakeGenerator(["not json", '{"ok": true}'], response_cache=cache)
+
+    with pytest.raises(ValueError):
+        generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    assert generator.generate_json(jinja2.Template("prompt"), {}, "paper") == {
+        "ok": True
+    }
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+class _RecordingLimiter(RateLimiter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events = []
+
+    def acquire(self, tokens=0):
+        self.events.append(("acquire", tokens))
+
+    async def aacquire(self, tokens=0):
+        self.events.append(("acquire", tokens))
+
+    def throttled(self):
+        self.events.append("throttled")
+
+    def succeeded(self):
+        self.events.append("succeeded")
+
+
+class ThrottledGenerator(FakeGenerator):
+    def _generate_text(self, system_prompt, user_prompt, response_format):
+        response = next(self.responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_json_generator_backs_off_and_retries_throttled_requests():
+    limiter = _RecordingLimiter()
+    generator = ThrottledGenerator([_Throttled(), '{"ok": true}'], rate_limiter=limiter)
+
+    result = generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    assert result == {"ok": True}
+    assert limiter.events == [
+        ("acquire", 3),
+        "throttled",
+        ("acquire", 3),
+        "succeeded",
+    ]
+
+
+def test_json_generator_gives_up_after_max_throttle_retries():
+    limiter = _RecordingLimiter(max_throttle_retries=1)
+    generator = ThrottledGenerator(repeat(_Throttled()), rate_limiter=limiter)
+
+    with pytest.raises(_Throttled):
+        generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    assert limiter.events.count("throttled") == 1
+
+
+def test_agenerate_json_runs_sync_generators_on_a_worker_thread():
+    generator = FakeGenerator(['{"n": 1}', '{"n": 2}'])
+
+    async def ask_twice():
+        return await asyncio.gather(
+            generator.agenerate_json(jinja2.Template("prompt"), {}, "a"),
+            generator.agenerate_json(jinja2.Template("prompt"), {}, "b"),
+        )
+
+    assert sorted(r["n"] for r in asyncio.run(ask_twice())) == [1, 2]
+
+
+def test_agenerate_json_awaits_the_async_text_generator():
+    class AsyncGenerator(FakeGenerator):
+        def _generate_text(self, system_prompt, user_prompt, response_format):
+            raise AssertionError("the sync path must not be used")
+
+        async def _agenerate_text(self, system_prompt, user_prompt, response_format):
+            return f'{{"prompt": "{user_prompt}"}}'
+
+    generator = AsyncGenerator([])
+
+    result = asyncio.run(generator.agenerate_json(jinja2.Template("p"), {}, "paper"))
+
+    assert result == {"prompt": "paper"}
+
+
+def test_agenerate_json_shares_the_response_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    FakeGenerator(['{"n": 1}'], response_cache=cache).generate_json(
+        jinja2.Template("prompt"), {}, "paper"
+    )
+    generator = FakeGenerator([], response_cache=cache)
+
+    result = asyncio.run(
+        generator.agenerate_json(jinja2.Template("prompt"), {}, "paper")
+    )
+
+    assert result == {"n": 1}
+
+
+def test_agenerate_json_backs_off_and_retries_throttled_requests():
+    limiter = _RecordingLimiter()
+    generator = ThrottledGenerator([_Throttled(), '{"ok": true}'], rate_limiter=limiter)
+
+    result = asyncio.run(
+        generator.agenerate_json(jinja2.Template("prompt"), {}, "paper")
+    )
+
+    assert result == {"ok": True}
+    assert limiter.events == [
+        ("acquire", 3),
+        "throttled",
+        ("acquire", 3),
+        "succeeded",
+    ]
+
+
+def test_agenerate_json_raises_after_retries_are_exhausted():
+    generator = FakeGenerator(repeat("not json"), max_retries=2)
+
+    with pytest.raises(ValueError, match="non-JSON"):
+        asyncio.run(generator.agenerate_json(jinja2.Template("prompt"), {}, "paper"))
+
+
+def test_llm_provider_shares_one_async_client_until_closed():
+    class Client:
+        closed = False
+
+        async def close(self):
+            self.closed = True
+
+    class AsyncProvider(FakeProvider):
+        def _new_async_client(self):
+            return Client()
+
+    provider = AsyncProvider("model")
+    client = provider._async_client()
+
+    assert provider._async_client() is client
+    asyncio.run(provider.aclose())
+    assert client.closed
+    assert provider._async_client() is not client
+
+
+def test_llm_provider_aclose_without_async_client_is_a_no_op():
+    provider = FakeProvider("model")
+
+    asyncio.run(provider.aclose())
+
+    assert provider._async_client() is None
+
+
+def _value(registry, name, **labels):
+    labels = {"provider": "fake", "model": "m", **labels}
+    for value in registry.summary()["metrics"][name]["values"]:
+        if value["labels"] == labels:
+            return value.get("value", value.get("count"))
+    return 0
+
+
+def test_json_generator_records_request_metrics(tmp_path):
+    registry = MetricsRegistry()
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    generator = FakeGenerator(
+        ["not json", '{"ok": true}'],
+        max_retries=2,
+        response_cache=cache,
+        metrics=LLMMetrics(registry, "fake", "m"),
+    )
+
+    generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+    generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    prefix = "mwf_assistant_llm"
+    assert _value(registry, f"{prefix}_request_duration_seconds") == 2
+    assert _value(registry, f"{prefix}_requests_total", outcome="ok") == 2
+    assert _value(registry, f"{prefix}_json_decode_failures_total") == 1
+    assert _value(registry, f"{prefix}_retries_total", reason="invalid_answer") == 1
+    assert _value(registry, f"{prefix}_response_cache_misses_total") == 1
+    assert _value(registry, f"{prefix}_response_cache_hits_total") == 1
+
+
+def test_json_generator_records_throttled_retries():
+    registry = MetricsRegistry()
+    generator = ThrottledGenerator(
+        [_Throttled(), '{"ok": true}'],
+        rate_limiter=_RecordingLimiter(),
+        metrics=LLMMetrics(registry, "fake", "m"),
+    )
+
+    generator.generate_json(jinja2.Template("prompt"), {}, "paper")
+
+    prefix = "mwf_assistant_llm"
+    assert _value(registry, f"{prefix}_requests_total", outcome="error") == 1
+    assert _value(registry, f"{prefix}_retries_total", reason="throttled") == 1
+
+
+class StreamingGenerator(FakeGenerator):
+    def _generate_text(self, system_prompt, user_prompt, response_format):
+        text = next(self.responses)
+        for token in text:
+            self._text_callback(token)
+        self._record_usage(10, 4, len(text))
+        return text
+
+
+def test_json_generator_records_first_token_once_per_request():
+    registry = MetricsRegistry()
+    streamed = []
+    generator = StreamingGenerator(
+        ['{"n": 1}', '{"n": 2}'],
+        on_text=streamed.append,
+        metrics=LLMMetrics(registry, "fake", "m"),
+    )
+
+    generator.generate_json(jinja2.Template("prompt"), {}, "a")
+    asyncio.run(generator.agenerate_json(jinja2.Template("prompt"), {}, "b"))
+
+    prefix = "mwf_assistant_llm"
+    assert "".join(streamed) == '{"n": 1}{"n": 2}'
+    assert _value(registry, f"{prefix}_time_to_first_token_seconds") == 2
+    assert _value(registry, f"{prefix}_input_tokens_total") == 20
+    assert _value(registry, f"{prefix}_cached_input_tokens_total") == 8
+    assert _value(registry, f"{prefix}_output_tokens_total") == 16
+    assert generator._token_usage.input_tokens == 20
+
+
+def test_llm_provider_labels_metrics_with_provider_and_model():
+    registry = MetricsRegistry()
+    provider = FakeProvider("m", metrics=registry)
+
+    provider._record_usage(5, 0, 7)
+
+    assert provider.provider_name == "fake"
+    assert _value(registry, "mwf_assistant_llm_output_tokens_total") == 7
+    assert FakeProvider("m")._metrics is None
+
+
 def test_llm_provider_base_stores_model_and_is_abstract():
     FakeProvider("model")
 
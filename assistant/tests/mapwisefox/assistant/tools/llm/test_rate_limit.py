@@ -0,0 +1,163 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from mapwisefox.assistant.tools.llm._rate_limit import (
+    RateLimiter,
+    estimate_tokens,
+    is_throttling_error,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(clock, **kwargs):
+    return RateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def _error(**attrs):
+    err = Exception("throttled")
+    for name, value in attrs.items():
+        setattr(err, name, value)
+    return err
+
+
+@pytest.mark.parametrize(
+    "err, expected",
+    [
+        (_error(status_code=429), True),
+        (_error(code=429), True),
+        (_error(response={"Error": {"Code": "ThrottlingException"}}), True),
+        (_error(response=SimpleNamespace(status_code=429)), True),
+        (_error(status_code=500), False),
+        (_error(response={"Error": {"Code": "ValidationException"}}), False),
+        (ValueError("bad"), False),
+    ],
+)
+def test_is_throttling_error(err, expected):
+    assert is_throttling_error(err) is expected
+
+
+def test_estimate_tokens_counts_four_characters_per_token():
+    assert estimate_tokens("a" * 40, "b" * 40) == 21
+
+
+def test_unlimited_rate_limiter_never_waits():
+    clock = _Clock()
+    limiter = _limiter(clock)
+
+    for _ in range(1000):
+        limiter.acquire(10_000)
+
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_spaces_requests_after_the_burst():
+    clock = _Clock()
+    limiter = _limiter(clock, requests_per_minute=60, burst_seconds=2)
+
+    for _ in range(5):
+        limiter.acquire()
+
+    # two requests fit in the burst, the others are admitted once per second
+    assert clock.now == pytest.approx(3.0)
+
+
+def test_rate_limiter_budgets_prompt_tokens():
+    clock = _Clock()
+    limiter = _limiter(clock, tokens_per_minute=600, burst_seconds=10)
+
+    limiter.acquire(100)
+    limiter.acquire(100)
+
+    assert clock.now == pytest.approx(10.0)
+
+
+def test_rate_limiter_admits_requests_larger_than_the_bucket():
+    clock = _Clock()
+    limiter = _limiter(clock, tokens_per_minute=60, burst_seconds=10)
+
+    limiter.acquire(1_000)
+    limiter.acquire(1)
+
+    # the oversized request leaves the bucket in debt, delaying the next one
+    assert clock.now > 10.0
+
+
+def test_rate_limiter_backs_off_and_slows_down_when_throttled():
+    clock = _Clock()
+    limiter = _limiter(clock, requests_per_minute=60, burst_seconds=1)
+    limiter.acquire()
+
+    limiter.throttled()
+    limiter.throttled()
+    limiter.acquire()
+
+    assert limiter.rate_factor == pytest.approx(0.25)
+    assert clock.now >= 1.0
+
+
+def test_rate_limiter_recovers_after_successes():
+    clock = _Clock()
+    limiter = _limiter(clock)
+    limiter.throttled()
+
+    for _ in range(10):
+        limiter.succeeded()
+
+    assert limiter.rate_factor == 1.0
+
+
+def test_rate_limiter_is_shared_between_threads():
+    clock = _Clock()
+    lock = threading.Lock()
+
+    def sleep(seconds):
+        with lock:
+            clock.sleep(seconds)
+
+    limiter = RateLimiter(
+        requests_per_minute=600, burst_seconds=1, clock=clock, sleep=sleep
+    )
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # ten requests fit in the burst, the others are admitted ten per second
+    assert clock.now >= 1.0 - 1e-9
+
+
+def test_rate_limiter_awaits_without_blocking_the_event_loop(monkeypatch):
+    clock = _Clock()
+    limiter = _limiter(clock, requests_per_minute=60, burst_seconds=1)
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    async def acquire_twice():
+        await limiter.aacquire()
+        await limiter.aacquire()
+
+    asyncio.run(acquire_twice())
+
+    assert slept == [pytest.approx(1.0)]
+    assert clock.sleeps == []
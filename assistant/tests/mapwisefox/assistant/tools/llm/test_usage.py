@@ -0,0 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from mapwisefox.assistant.tools.llm import TokenUsage
+
+
+def test_token_usage_sums_requests_from_several_threads():
+    usage = TokenUsage()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: usage.record(100, 60), range(200)))
+    usage.record(None)
+
+    assert usage.requests == 201
+    assert usage.input_tokens == 20000
+    assert usage.cached_input_tokens == 12000
@@ -1,21 +1,119 @@
+import os
+import zlib
 from unittest.mock import MagicMock
 
-from mapwisefox.assistant.tools.pdf._caching import CachingFileContentsExtractor
+import pytest
 
+from mapwisefox.assistant.tools.pdf import _caching
+from mapwisefox.assistant.tools.pdf._caching import (
+    CachingFileContentsExtractor,
+    ExtractionCache,
+)
 
-def test_caching_extractor_reads_and_writes_cache(tmp_path):
+
+def _extractor(text="paper text", cache_key="reader(dpi=150)"):
     extractor = MagicMock()
-    extractor.read_file.return_value = "paper text"
-    caching = CachingFileContentsExtractor(tmp_path, extractor)
+    extractor.read_file.return_value = text
+    extractor.cache_key = cache_key
+    return extractor
 
-    assert caching.read_file(tmp_path / "paper.pdf") == "paper text"
-    assert (tmp_path / "paper.txt").read_text() == "paper text"
 
+@pytest.fixture
+def paper(tmp_path):
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(b"%PDF-1.4 paper")
+    return path
 
-def test_caching_extractor_uses_existing_cache(tmp_path):
-    (tmp_path / "paper.txt").write_text("cached text")
-    extractor = MagicMock()
+
+def test_caching_extractor_reads_and_writes_cache(tmp_path, paper):
+    extractor = _extractor()
     caching = CachingFileContentsExtractor(tmp_path, extractor)
 
-    assert caching.read_file(tmp_path / "paper.pdf") == "cached text"
+    assert caching.read_file(paper) == "paper text"
+    assert (tmp_path / ExtractionCache.FILE_NAME).exists()
+
+
+def test_caching_extractor_uses_existing_cache(tmp_path, paper):
+    cache = ExtractionCache(tmp_path)
+    CachingFileContentsExtractor(cache, _extractor("cached text")).read_file(paper)
+    extractor = _extractor()
+
+    result = CachingFileContentsExtractor(cache, extractor).read_file(paper)
+
+    assert result == "cached text"
+    extractor.read_file.assert_not_called()
+
+
+def test_caching_extractor_does_not_share_texts_between_configurations(tmp_path, paper):
+    cache = ExtractionCache(tmp_path)
+    CachingFileContentsExtractor(
+        cache, _extractor("docling text", "docling")
+    ).read_file(paper)
+
+    result = CachingFileContentsExtractor(
+        cache, _extractor("custom text", "custom")
+    ).read_file(paper)
+
+    assert result == "custom text"
+
+
+def test_caching_extractor_keys_on_contents_not_file_name(tmp_path, paper):
+    cache = ExtractionCache(tmp_path)
+    CachingFileContentsExtractor(cache, _extractor("first")).read_file(paper)
+    copy = tmp_path / "renamed.pdf"
+    copy.write_bytes(paper.read_bytes())
+    paper.write_bytes(b"%PDF-1.4 a different paper")
+    extractor = _extractor("second")
+
+    assert CachingFileContentsExtractor(cache, extractor).read_file(copy) == "first"
+    assert CachingFileContentsExtractor(cache, extractor).read_file(paper) == "second"
+
+
+def test_extraction_cache_persists_across_instances(tmp_path, paper):
+    CachingFileContentsExtractor(ExtractionCache(tmp_path), _extractor()).read_file(
+        paper
+    )
+    extractor = _extractor("fresh text")
+
+    result = CachingFileContentsExtractor(
+        ExtractionCache(tmp_path), extractor
+    ).read_file(paper)
+
+    assert result == "paper text"
     extractor.read_file.assert_not_called()
+
+
+def test_extraction_cache_evicts_least_recently_used_entries(tmp_path):
+    texts = {name: os.urandom(1024).hex() for name in "abcd"}
+    entry_size = max(len(zlib.compress(text.encode())) for text in texts.values())
+    cache = ExtractionCache(tmp_path, max_size_bytes=3 * entry_size)
+    for name in "abc":
+        cache.put(name, name, "reader", texts[name])
+    cache.get("a")
+
+    cache.put("d", "d", "reader", texts["d"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == texts["a"]
+    assert cache.get("c") == texts["c"]
+    assert cache.get("d") == texts["d"]
+
+
+def test_extraction_cache_hashes_unchanged_documents_once_across_runs(
+    tmp_path, paper, monkeypatch
+):
+    hashed = []
+    original = _caching._file_sha256
+    monkeypatch.setattr(
+        _caching, "_file_sha256", lambda file: hashed.append(file) or original(file)
+    )
+    with ExtractionCache(tmp_path) as cache:
+        first = cache.document_hash(paper)
+
+    with ExtractionCache(tmp_path) as cache:
+        assert cache.document_hash(paper) == first
+    paper.write_bytes(b"%PDF-1.4 an edited paper")
+    with ExtractionCache(tmp_path) as cache:
+        assert cache.document_hash(paper) != first
+
+    assert hashed == [paper, paper]
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock, patch
+import threading
+from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
 
@@ -6,10 +7,14 @@ from mapwisefox.assistant.tools.pdf._base import (
     ExtractionFailureReason,
     FileContentsExtractionError,
 )
-from mapwisefox.assistant.tools.pdf._docling import ConversionError, DoclingExtractor
+from mapwisefox.assistant.tools.pdf._docling import (
+    ConversionError,
+    DoclingExtractor,
+    _docling_worker,
+)
 
 
-def _extractor(artifacts_path=None, error_callback=None):
+def _extractor(artifacts_path=None, error_callback=None, **kwargs):
     options = MagicMock()
     with (
         patch(
@@ -21,31 +26,50 @@ def _extractor(artifacts_path=None, error_callback=None):
             return_value=MagicMock(),
         ),
     ):
-        return DoclingExtractor(artifacts_path, error_callback=error_callback)
+        return DoclingExtractor(artifacts_path, error_callback=error_callback, **kwargs)
 
 
 class _Process:
+    started = []
+
     def __init__(self, target, args):
         self.target = target
         self.args = args
-        self.exitcode = 0
+        self.exitcode = None
+        _Process.started.append(self)
 
     def start(self):
         pass
 
-    def join(self):
+    def is_alive(self):
+        return self.exitcode is None
+
+    def join(self, timeout=None):
         pass
 
     def terminate(self):
-        self.exitcode = -1
+        self.exitcode = -15
 
 
-class _RunningProcess(_Process):
-    def start(self):
-        try:
-            self.target(*self.args)
-        except Exception:
-            self.exitcode = 1
+@pytest.fixture
+def processes():
+    _Process.started = []
+    with patch("mapwisefox.assistant.tools.pdf._docling.Process", _Process):
+        yield _Process.started
+
+
+def _conn(*responses, poll=True):
+    conn = MagicMock()
+    conn.poll.return_value = poll
+    conn.recv.side_effect = list(responses)
+    return conn
+
+
+def _pipes(*conns):
+    return patch(
+        "mapwisefox.assistant.tools.pdf._docling.Pipe",
+        side_effect=[(conn, MagicMock()) for conn in conns],
+    )
 
 
 def test_docling_extractor_downloads_artifacts_when_path_is_supplied(tmp_path):
@@ -55,115 +79,97 @@ def test_docling_extractor_downloads_artifacts_when_path_is_supplied(tmp_path):
     download.assert_called_once()
 
 
-def test_docling_extractor_public_read_returns_markdown(tmp_path):
+def test_docling_extractor_public_read_returns_markdown(tmp_path, processes):
     extractor = _extractor()
-    recv = MagicMock()
-    recv.poll.return_value = True
-    recv.recv.return_value = "markdown"
-    process = _Process
+    conn = _conn((True, "markdown", 100))
 
-    with (
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.Pipe",
-            return_value=(recv, MagicMock()),
-        ),
-        patch("mapwisefox.assistant.tools.pdf._docling.Process", process),
-    ):
+    with _pipes(conn):
         assert extractor.read_file(tmp_path / "paper.pdf") == "markdown"
 
+    conn.send.assert_called_once_with(str((tmp_path / "paper.pdf").resolve()))
+    assert processes[0].target is _docling_worker
 
-def test_docling_extractor_public_read_unloads_backend_after_conversion(tmp_path):
-    converter = MagicMock()
-    backend = MagicMock()
-    converter.convert.return_value.input._backend = backend
-    converter.convert.return_value.document.export_to_markdown.return_value = "markdown"
+
+def test_docling_extractor_reuses_worker_process_across_documents(tmp_path, processes):
     extractor = _extractor()
-    recv = MagicMock()
-    recv.poll.return_value = True
-    recv.recv.return_value = "markdown"
+    conn = _conn((True, "first", 100), (True, "second", 100))
 
-    with (
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.DocumentConverter",
-            return_value=converter,
-        ),
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.Pipe",
-            return_value=(recv, MagicMock()),
-        ),
-        patch("mapwisefox.assistant.tools.pdf._docling.Process", _RunningProcess),
-    ):
-        assert extractor.read_file(tmp_path / "paper.pdf") == "markdown"
+    with _pipes(conn):
+        assert extractor.read_file(tmp_path / "a.pdf") == "first"
+        assert extractor.read_file(tmp_path / "b.pdf") == "second"
 
-    backend.unload.assert_called_once()
+    assert len(processes) == 1
 
 
-def test_docling_extractor_public_read_reports_conversion_failure(tmp_path):
+def test_docling_worker_loads_converter_once_and_unloads_backends(tmp_path):
+    converter = MagicMock()
+    backend = MagicMock()
+    converter.convert.return_value.input._backend = backend
+    converter.convert.return_value.document.export_to_markdown.return_value = "markdown"
+    conn = _conn(str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf"), None)
+
+    with patch(
+        "mapwisefox.assistant.tools.pdf._docling.DocumentConverter",
+        return_value=converter,
+    ) as converter_type:
+        _docling_worker(conn, {}, MagicMock())
+
+    converter_type.assert_called_once()
+    assert conn.send.call_args_list == [call((True, "markdown", ANY))] * 2
+    assert backend.unload.call_count == 2
+    conn.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "error, message",
+    [
+        (ConversionError("conversion failed"), "conversion error"),
+        (RuntimeError("conversion failed"), "unhandled error"),
+    ],
+)
+def test_docling_worker_reports_conversion_failures(tmp_path, error, message):
     callback = MagicMock()
     converter = MagicMock()
-    converter.convert.side_effect = ConversionError("conversion failed")
-    extractor = _extractor(error_callback=callback)
-    recv = MagicMock()
-    recv.poll.return_value = True
-    recv.recv.return_value = "conversion error"
+    converter.convert.side_effect = error
+    conn = _conn(str(tmp_path / "paper.pdf"), None)
 
-    with (
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.DocumentConverter",
-            return_value=converter,
-        ),
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.Pipe",
-            return_value=(recv, MagicMock()),
-        ),
-        patch("mapwisefox.assistant.tools.pdf._docling.Process", _RunningProcess),
-        pytest.raises(FileContentsExtractionError) as raised,
+    with patch(
+        "mapwisefox.assistant.tools.pdf._docling.DocumentConverter",
+        return_value=converter,
     ):
-        extractor.read_file(tmp_path / "paper.pdf")
+        _docling_worker(conn, {}, callback)
 
-    assert raised.value.reason == ExtractionFailureReason.BackendError
+    conn.send.assert_called_once_with((False, message, ANY))
     callback.assert_called_once()
 
 
-def test_docling_extractor_public_read_reports_generic_conversion_failure(tmp_path):
-    converter = MagicMock()
-    converter.convert.side_effect = RuntimeError("conversion failed")
+def test_docling_extractor_public_read_reports_conversion_failure(tmp_path, processes):
     extractor = _extractor()
-    recv = MagicMock()
-    recv.poll.return_value = True
-    recv.recv.return_value = "unhandled error"
+    conn = _conn((False, "conversion error", 100))
 
-    with (
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.DocumentConverter",
-            return_value=converter,
-        ),
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.Pipe",
-            return_value=(recv, MagicMock()),
-        ),
-        patch("mapwisefox.assistant.tools.pdf._docling.Process", _RunningProcess),
-        pytest.raises(FileContentsExtractionError),
-    ):
+    with _pipes(conn), pytest.raises(FileContentsExtractionError) as raised:
         extractor.read_file(tmp_path / "paper.pdf")
 
+    assert raised.value.reason == ExtractionFailureReason.BackendError
+    assert processes[0].is_alive()
+
 
-def test_docling_extractor_public_read_raises_timeout(tmp_path):
+def test_docling_extractor_public_read_raises_timeout_and_replaces_worker(
+    tmp_path, processes
+):
     extractor = _extractor()
-    recv = MagicMock()
-    recv.poll.return_value = False
+    stuck = _conn(poll=False)
+    fresh = _conn((True, "markdown", 100))
 
-    with (
-        patch(
-            "mapwisefox.assistant.tools.pdf._docling.Pipe",
-            return_value=(recv, MagicMock()),
-        ),
-        patch("mapwisefox.assistant.tools.pdf._docling.Process", _Process),
-        pytest.raises(FileContentsExtractionError) as raised,
-    ):
-        extractor.read_file(tmp_path / "paper.pdf")
+    with _pipes(stuck, fresh):
+        with pytest.raises(FileContentsExtractionError) as raised:
+            extractor.read_file(tmp_path / "paper.pdf")
+        result = extractor.read_file(tmp_path / "paper.pdf")
 
     assert raised.value.reason == ExtractionFailureReason.Timeout
+    assert not processes[0].is_alive()
+    assert result == "markdown"
+    assert len(processes) == 2
 
 
 def test_docling_extractor_public_read_wraps_process_setup_errors(tmp_path):
@@ -179,3 +185,62 @@ def test_docling_extractor_public_read_wraps_process_setup_errors(tmp_path):
         extractor.read_file(tmp_path / "paper.pdf")
 
     assert raised.value.reason == ExtractionFailureReason.Generic
+
+
+def test_docling_extractor_recycles_worker_after_max_documents(tmp_path, processes):
+    extractor = _extractor(max_documents_per_worker=1)
+    first = _conn((True, "first", 100))
+    second = _conn((True, "second", 100))
+
+    with _pipes(first, second):
+        extractor.read_file(tmp_path / "a.pdf")
+        extractor.read_file(tmp_path / "b.pdf")
+
+    assert len(processes) == 2
+    first.send.assert_called_with(None)
+    assert not processes[0].is_alive()
+
+
+def test_docling_extractor_recycles_worker_on_memory_growth(tmp_path, processes):
+    extractor = _extractor(max_worker_rss_growth_mb=1)
+    first = _conn((True, "first", 100), (True, "second", 100 + 2 * 2**20))
+    second = _conn((True, "third", 100))
+
+    with _pipes(first, second):
+        for name in ["a", "b", "c"]:
+            extractor.read_file(tmp_path / f"{name}.pdf")
+
+    assert len(processes) == 2
+
+
+def test_docling_extractor_converts_documents_in_parallel(tmp_path, processes):
+    extractor = _extractor(workers=2)
+    barrier = threading.Barrier(2, timeout=5)
+    conns = [_conn((True, "markdown", 100)) for _ in range(2)]
+    for conn in conns:
+        conn.poll.side_effect = lambda timeout: barrier.wait() is not None
+
+    with _pipes(*conns):
+        threads = [
+            threading.Thread(target=extractor.read_file, args=(tmp_path / f"{i}.pdf",))
+            for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(processes) == 2
+    assert all(conn.recv.called for conn in conns)
+
+
+def test_docling_extractor_close_stops_workers(tmp_path, processes):
+    extractor = _extractor()
+    conn = _conn((True, "markdown", 100))
+
+    with _pipes(conn):
+        extractor.read_file(tmp_path / "paper.pdf")
+    extractor.close()
+
+    conn.send.assert_called_with(None)
+    assert not processes[0].is_alive()
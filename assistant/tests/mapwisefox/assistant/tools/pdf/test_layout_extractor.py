@@ -1,4 +1,4 @@
-from concurrent.futures import Future
+from contextlib import contextmanager
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
@@ -12,17 +12,40 @@ def _element(kind, coordinates):
     return SimpleNamespace(type=kind, block=SimpleNamespace(coordinates=coordinates))
 
 
-class _Pool:
-    def __enter__(self):
-        return self
+@contextmanager
+def _rendered_pdf(pages, image=None):
+    image = image or Image.new("RGB", (100, 200))
+    rendered = []
 
-    def __exit__(self, *args):
-        return False
+    def _convert(_, dpi, first_page, last_page):
+        rendered.append((first_page, last_page))
+        return [image] * (last_page - first_page + 1)
+
+    with (
+        patch("pdf2image.pdfinfo_from_path", return_value={"Pages": pages}),
+        patch("pdf2image.convert_from_path", side_effect=_convert),
+    ):
+        yield rendered
 
-    def submit(self, function, image):
-        future = Future()
-        future.set_result(function(image=image))
-        return future
+
+@pytest.fixture(autouse=True)
+def unload_layout_model():
+    PdfLayoutExtractor().unload()
+    yield
+    PdfLayoutExtractor().unload()
+
+
+def _extract(extractor, path, model, pages=1):
+    with (
+        patch("shutil.which", return_value="/usr/bin/pdftoppm"),
+        patch(
+            "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
+            return_value=model,
+        ) as model_type,
+        _rendered_pdf(pages),
+    ):
+        extractor(path)
+    return model_type
 
 
 def test_layout_extractor_public_call_reports_missing_poppler(tmp_path, monkeypatch):
@@ -44,11 +67,7 @@ def test_layout_extractor_public_call_writes_debug_image(tmp_path):
             "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
             return_value=model,
         ),
-        patch(
-            "mapwisefox.assistant.tools.pdf._layout_extractor.ThreadPoolExecutor",
-            return_value=_Pool(),
-        ),
-        patch("pdf2image.convert_from_path", return_value=[image]),
+        _rendered_pdf(1, image),
     ):
         result = extractor(tmp_path / "paper.pdf")
 
@@ -73,12 +92,142 @@ def test_layout_extractor_public_call_merges_overlapping_detected_boxes(tmp_path
             "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
             return_value=model,
         ),
+        _rendered_pdf(1, image),
+    ):
+        extractor(tmp_path / "paper.pdf")
+
+    assert len(extractor.page_layouts[0]) == 1
+
+
+def test_layout_extractor_loads_model_once_per_process(tmp_path):
+    model = MagicMock()
+    model.detect.return_value = []
+
+    first = _extract(PdfLayoutExtractor(), tmp_path / "a.pdf", model)
+    second = _extract(PdfLayoutExtractor(), tmp_path / "b.pdf", model)
+
+    first.assert_called_once()
+    second.assert_not_called()
+    assert model.detect.call_count == 2
+
+
+def test_layout_extractor_unload_releases_model(tmp_path):
+    model = MagicMock()
+    model.detect.return_value = []
+    extractor = PdfLayoutExtractor()
+    _extract(extractor, tmp_path / "a.pdf", model)
+
+    extractor.unload()
+    model_type = _extract(extractor, tmp_path / "a.pdf", model)
+
+    model_type.assert_called_once()
+
+
+def test_layout_extractor_warm_up_loads_model_before_first_call(tmp_path):
+    model = MagicMock()
+    model.detect.return_value = []
+    extractor = PdfLayoutExtractor()
+    with patch(
+        "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
+        return_value=model,
+    ) as model_type:
+        extractor.warm_up()
+
+    _extract(extractor, tmp_path / "a.pdf", model, pages=3)
+
+    model_type.assert_called_once()
+    assert extractor.stats.model_load_ns == 0
+    assert extractor.stats.pages == 3
+    assert extractor.stats.inference_ns > 0
+
+
+def test_layout_extractor_detects_pages_of_several_documents_in_batches(tmp_path):
+    model = MagicMock()
+    model.detect.return_value = [_element("Text", (0, 0, 10, 10))]
+    extractor = PdfLayoutExtractor(batch_size=4)
+    batch_sizes = []
+    detect_batch = extractor._detect_batch
+
+    def _detect_batch(m, images):
+        batch_sizes.append(len(images))
+        return detect_batch(m, images)
+
+    extractor._detect_batch = _detect_batch
+    with (
+        patch("shutil.which", return_value="/usr/bin/pdftoppm"),
+        patch(
+            "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
+            return_value=model,
+        ),
+        _rendered_pdf(3),
+    ):
+        documents = list(
+            extractor.detect_documents([tmp_path / "a.pdf", tmp_path / "b.pdf"])
+        )
+
+    assert [d.file_path.name for d in documents] == ["a.pdf", "b.pdf"]
+    assert batch_sizes == [4, 2]
+    assert all(sorted(d.page_layouts) == [0, 1, 2] for d in documents)
+    assert extractor.stats.pages == 6
+
+
+def test_layout_extractor_bounds_rendered_pages_waiting_for_inference(tmp_path):
+    rendered = []
+    inferred = []
+
+    class _Image:
+        size = (100, 200)
+
+        def __init__(self, page_no):
+            self.page_no = page_no
+
+        def getbands(self):
+            return ("R", "G", "B")
+
+    def _convert(_, dpi, first_page, last_page):
+        pages = range(first_page - 1, last_page)
+        rendered.extend(pages)
+        return [_Image(page_no) for page_no in pages]
+
+    def _detect(image):
+        inferred.append(image.page_no)
+        # queued pages, plus one being handed over and one being rendered
+        assert len(rendered) - len(inferred) <= 2 + 1 + 1
+        return []
+
+    model = MagicMock()
+    model.detect.side_effect = _detect
+    extractor = PdfLayoutExtractor(batch_size=1, max_queued_pages=2, pages_per_render=1)
+
+    with (
+        patch("shutil.which", return_value="/usr/bin/pdftoppm"),
         patch(
-            "mapwisefox.assistant.tools.pdf._layout_extractor.ThreadPoolExecutor",
-            return_value=_Pool(),
+            "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
+            return_value=model,
         ),
-        patch("pdf2image.convert_from_path", return_value=[image]),
+        patch("pdf2image.pdfinfo_from_path", return_value={"Pages": 20}),
+        patch("pdf2image.convert_from_path", side_effect=_convert),
     ):
         extractor(tmp_path / "paper.pdf")
 
-    assert len(extractor.page_layouts[0]) == 1
+    assert inferred == list(range(20))
+    assert 0 < extractor.stats.peak_page_bytes <= 4 * 100 * 200 * 3
+
+
+def test_layout_extractor_renders_requested_page_range_in_chunks(tmp_path):
+    model = MagicMock()
+    model.detect.return_value = []
+    extractor = PdfLayoutExtractor(pages_per_render=2)
+
+    with (
+        patch("shutil.which", return_value="/usr/bin/pdftoppm"),
+        patch(
+            "mapwisefox.assistant.tools.pdf._layout_extractor.AutoLayoutModel",
+            return_value=model,
+        ),
+        _rendered_pdf(10) as rendered,
+    ):
+        extractor(tmp_path / "paper.pdf", first_page=3, last_page=7)
+
+    assert rendered == [(3, 4), (5, 6), (7, 7)]
+    assert sorted(extractor.page_layouts) == [3, 4, 5, 6, 7]
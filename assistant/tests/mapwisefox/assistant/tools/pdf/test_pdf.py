@@ -1,7 +1,15 @@
 from unittest.mock import MagicMock, patch
 
 from mapwisefox.assistant.tools.pdf._pdf import BasicPdfMarkdownExtractor
-from mapwisefox.assistant.tools.pdf._types import LayoutBox, Point, Rect, Size, TextItem
+from mapwisefox.assistant.tools.pdf._types import (
+    LayoutBlocks,
+    LayoutBox,
+    Point,
+    Rect,
+    Size,
+    TextBlocks,
+    TextItem,
+)
 
 
 def _item(text, bounds):
@@ -15,10 +23,10 @@ def _box(kind, bounds):
 def _extractor(text_items, layout_boxes):
     text_extractor = MagicMock()
     text_extractor.page_sizes = {0: Size(100, 100)}
-    text_extractor.text_items = {0: text_items}
+    text_extractor.text_blocks = {0: TextBlocks.from_items(text_items)}
     layout_extractor = MagicMock()
     layout_extractor.image_sizes = {0: Size(100, 100)}
-    layout_extractor.page_layouts = {0: layout_boxes}
+    layout_extractor.layout_blocks = {0: LayoutBlocks.from_boxes(layout_boxes)}
 
     return text_extractor, layout_extractor
 
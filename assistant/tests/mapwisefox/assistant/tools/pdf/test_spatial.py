@@ -0,0 +1,93 @@
+import random
+
+import numpy as np
+import pytest
+
+from mapwisefox.assistant.tools.pdf._spatial import (
+    RectIndex,
+    greedy_overlap_merge,
+    overlap_ratios,
+    rect_coords,
+)
+from mapwisefox.assistant.tools.pdf._types import Point, Rect
+
+
+def _random_rects(count, seed, extent=500, max_size=80):
+    rng = random.Random(seed)
+    rects = []
+    for _ in range(count):
+        x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+        w, h = rng.uniform(0, max_size), rng.uniform(0, max_size)
+        rects.append(Rect(Point(x, y), Point(x + w, y + h)))
+    return rects
+
+
+def _naive_merge(rects, min_ratio):
+    q = list(enumerate(rects))
+    groups = []
+    while q:
+        first, current = q.pop(0)
+        group = [first]
+        i = 0
+        while i < len(q):
+            index, candidate = q[i]
+            if current.overlap_ratio(candidate) >= min_ratio:
+                current = current.union(candidate)
+                group.append(index)
+                del q[i]
+                i = 0
+            else:
+                i += 1
+        groups.append(group)
+    return groups
+
+
+def test_overlap_ratios_match_rect_overlap_ratio():
+    rects = _random_rects(50, seed=1) + [Rect(Point(3, 3), Point(3, 3))]
+    coords = rect_coords(rects)
+
+    ratios = overlap_ratios(coords[:, None, :], coords[None, :, :])
+
+    expected = [[a.overlap_ratio(b) for b in rects] for a in rects]
+    np.testing.assert_allclose(ratios, expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rect_index_finds_the_same_overlaps_as_a_full_scan(seed):
+    boxes = _random_rects(100, seed=seed)
+    queries = _random_rects(200, seed=seed + 100, max_size=20)
+    index = RectIndex(rect_coords(boxes))
+
+    for query, coords in zip(queries, rect_coords(queries)):
+        expected = [i for i, b in enumerate(boxes) if b.overlap_ratio(query) >= 0.3]
+        assert index.overlapping(coords, 0.3).tolist() == expected
+
+
+@pytest.mark.parametrize("min_ratio", [0.0, 0.2, 0.5, 0.9])
+def test_greedy_overlap_merge_matches_pairwise_merge(min_ratio):
+    rects = _random_rects(150, seed=7)
+
+    groups = greedy_overlap_merge(RectIndex(rect_coords(rects)), min_ratio)
+
+    assert groups == _naive_merge(rects, min_ratio)
+
+
+def test_rect_index_handles_empty_and_degenerate_rectangles():
+    empty = RectIndex(rect_coords([]))
+    point = RectIndex(rect_coords([Rect(Point(1, 1), Point(1, 1))]))
+
+    assert greedy_overlap_merge(empty, 0.5) == []
+    assert point.overlapping(np.array([0.0, 0.0, 2.0, 2.0]), 0.5).tolist() == []
+    assert point.overlapping(np.array([0.0, 0.0, 2.0, 2.0]), 0.0).tolist() == [0]
+
+
+@pytest.mark.parametrize("box_count", [40, 400])
+def test_rect_index_overlapping_many_matches_single_queries(box_count):
+    index = RectIndex(rect_coords(_random_rects(box_count, seed=3)))
+    queries = rect_coords(_random_rects(300, seed=4, max_size=20))
+
+    result = index.overlapping_many(queries, 0.5)
+
+    assert [r.tolist() for r in result] == [
+        index.overlapping(q, 0.5).tolist() for q in queries
+    ]
@@ -1,6 +1,14 @@
 import pytest
 
-from mapwisefox.assistant.tools.pdf._types import LayoutBox, Point, Rect, Size
+from mapwisefox.assistant.tools.pdf._types import (
+    LayoutBlocks,
+    LayoutBox,
+    Point,
+    Rect,
+    Size,
+    TextBlocks,
+    TextItem,
+)
 
 
 def test_point_and_size_have_compact_representations():
@@ -62,3 +70,31 @@ def test_layout_box_ensures_unique_types_and_unions_bounds():
     assert union.types == ["text", "list", "title"]
     assert union.bounds.area == 9
     assert union.scale(2, 2).bounds.area == 36
+
+
+def test_text_blocks_round_trip_text_items():
+    items = [
+        TextItem("first", 10, None, Rect(Point(0, 1), Point(2, 3))),
+        TextItem("second", 12, {"/FirstChar": 65}, Rect(Point(4, 5), Point(6, 7))),
+    ]
+
+    blocks = TextBlocks.from_items(items)
+
+    assert len(blocks) == 2
+    assert blocks.coords.tolist() == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert blocks.to_items() == items
+
+
+def test_layout_blocks_scale_and_merge_like_layout_boxes():
+    boxes = [
+        LayoutBox(["Text"], Rect(Point(0, 0), Point(10, 10))),
+        LayoutBox(["Title"], Rect(Point(5, 5), Point(20, 15))),
+        LayoutBox(["Text", "List"], Rect(Point(30, 30), Point(40, 40))),
+    ]
+    blocks = LayoutBlocks.from_boxes(boxes)
+
+    merged = blocks.merge([[0, 1, 2]]).to_boxes()
+    scaled = blocks.scale(2, 0.5).to_boxes()
+
+    assert merged == [boxes[0].union(boxes[1]).union(boxes[2])]
+    assert scaled == [box.scale(2, 0.5) for box in boxes]
@@ -1,48 +1,93 @@
+import io
+import json
 import logging
+import threading
 
+from mapwisefox.assistant.config import OutputMode
 from mapwisefox.assistant.tools.callbacks import (
+    OutputDispatcher,
     make_stderr_callback,
-    make_thinking_callback,
-    write_stdout,
 )
 
 
-def test_write_stdout_echoes_plain_message(capsys):
-    write_stdout("hello")
+def test_stderr_callback_logs_with_exception_info(caplog):
+    logger = logging.getLogger("test-stderr-callback")
+    callback = make_stderr_callback(logger)
+    error = ValueError("boom")
 
-    assert capsys.readouterr().out == "hello"
+    with caplog.at_level(logging.ERROR, logger="test-stderr-callback"):
+        callback("something failed", error)
 
+    assert "something failed" in caplog.text
 
-def test_write_stdout_interpolates_args(capsys):
-    write_stdout("hello %s", "world")
 
-    assert capsys.readouterr().out == "hello world"
+class _ThreadRecordingFile(io.StringIO):
+    writers: set[str] = set()
 
+    def write(self, text):
+        self.writers = self.writers | {threading.current_thread().name}
+        return super().write(text)
 
-def test_thinking_callback_prints_label_once_on_first_call(capsys):
-    callback = make_thinking_callback()
 
-    callback("first thought")
+def test_output_dispatcher_streams_text_from_its_own_thread():
+    out = _ThreadRecordingFile()
 
-    assert "Thinking" in capsys.readouterr().out
+    with OutputDispatcher(OutputMode.stream, out) as output:
+        output.on_thinking("hmm")
+        output.on_text("hello %s", "world")
 
+    assert out.getvalue() == "Thinking ... \nhmmhello world"
+    assert out.writers == {"llm-output"}
 
-def test_thinking_callback_omits_label_on_subsequent_calls(capsys):
-    callback = make_thinking_callback()
-    callback("first thought")
-    capsys.readouterr()
 
-    callback("second thought")
+def test_output_dispatcher_aggregates_answers_per_record():
+    out = io.StringIO()
 
-    assert "Thinking" not in capsys.readouterr().out
+    with OutputDispatcher(OutputMode.aggregated, out) as output:
+        output.on_text("loading model\n")
+        with output.record(1):
+            output.on_thinking("ignored")
+            output.on_text('{"answer":')
 
+            def other_record():
+                with output.record(2):
+                    output.on_text('{"answer": "exclude"}')
 
-def test_stderr_callback_logs_with_exception_info(caplog):
-    logger = logging.getLogger("test-stderr-callback")
-    callback = make_stderr_callback(logger)
-    error = ValueError("boom")
+            thread = threading.Thread(target=other_record)
+            thread.start()
+            thread.join()
+            output.on_text(' "include"}')
 
-    with caplog.at_level(logging.ERROR, logger="test-stderr-callback"):
-        callback("something failed", error)
+    assert out.getvalue().splitlines() == [
+        '[2] {"answer": "exclude"}',
+        '[1] {"answer": "include"}',
+        "loading model",
+    ]
 
-    assert "something failed" in caplog.text
+
+def test_output_dispatcher_writes_json_events():
+    out = io.StringIO()
+    output = OutputDispatcher(OutputMode.jsonl, out)
+
+    with output.record("a"):
+        output.on_text("{")
+        output.on_text("}")
+    output.close()
+
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    # fragments queued between two writes are merged into one event
+    assert events[0]["event"] == "record_start"
+    assert events[-1]["event"] == "record_end"
+    assert {e["record"] for e in events} == {"a"}
+    assert "".join(e["text"] for e in events if e["event"] == "text") == "{}"
+
+
+def test_output_dispatcher_quiet_mode_writes_nothing():
+    out = io.StringIO()
+
+    with OutputDispatcher(OutputMode.quiet, out) as output:
+        output.on_thinking("hmm")
+        with output.record(1):
+            output.on_text("text")
+
+    assert out.getvalue() == ""
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from mapwisefox.assistant.tools.embeddings import (
+    EmbeddingCache,
+    OllamaEmbedder,
+    cosine_similarity,
+    embed_texts,
+)
+
+
+class _Embedder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [[len(text), 1.0] for text in texts]
+
+
+def test_embed_texts_sends_texts_in_batches():
+    embed = _Embedder()
+
+    vectors = embed_texts(embed, "m", ["a", "bb", "ccc"], batch_size=2)
+
+    assert embed.batches == [["a", "bb"], ["ccc"]]
+    assert vectors.tolist() == [[1, 1], [2, 1], [3, 1]]
+
+
+def test_embed_texts_embeds_only_texts_missing_from_the_cache(tmp_path):
+    path = tmp_path / "vectors.npz"
+    cache = EmbeddingCache(path)
+    embed_texts(_Embedder(), "m", ["a", "bb"], cache)
+    cache.save()
+    embed = _Embedder()
+
+    vectors = embed_texts(embed, "m", ["bb", "ccc", "a"], EmbeddingCache(path))
+
+    assert embed.batches == [["ccc"]]
+    assert vectors.tolist() == [[2, 1], [3, 1], [1, 1]]
+
+
+def test_embed_texts_keys_the_cache_on_the_model(tmp_path):
+    cache = EmbeddingCache(tmp_path / "vectors.npz")
+    embed_texts(_Embedder(), "m1", ["a"], cache)
+    embed = _Embedder()
+
+    embed_texts(embed, "m2", ["a"], cache)
+
+    assert embed.batches == [["a"]]
+
+
+def test_embedding_cache_replaces_vectors_of_another_size(tmp_path):
+    cache = EmbeddingCache(tmp_path / "vectors.npz")
+    cache.put("a", [1.0, 2.0])
+
+    cache.put("b", [1.0, 2.0, 3.0])
+    cache.save()
+
+    assert len(EmbeddingCache(tmp_path / "vectors.npz")) == 1
+
+
+def test_embedding_cache_ignores_unreadable_files(tmp_path):
+    path = tmp_path / "vectors.npz"
+    path.write_text("not a numpy file")
+
+    assert len(EmbeddingCache(path)) == 0
+
+
+def test_cosine_similarity_handles_zero_vectors():
+    vectors = np.array([[1.0, 0.0], [0.0, 2.0], [0.0, 0.0]])
+
+    similarity = cosine_similarity(vectors, np.array([1.0, 0.0]))
+
+    assert similarity.tolist() == pytest.approx([1.0, 0.0, 0.0])
+
+
+def test_ollama_embedder_embeds_with_the_configured_model():
+    client = MagicMock()
+    client.embed.return_value = SimpleNamespace(embeddings=[[0.1, 0.2]])
+    module = SimpleNamespace(Client=MagicMock(return_value=client))
+    with patch("mapwisefox.assistant.tools.embeddings.try_import", return_value=module):
+        embedder = OllamaEmbedder("nomic-embed-text", "http://ollama", "key")
+
+    assert embedder(["text"]) == [[0.1, 0.2]]
+    client.embed.assert_called_once_with(model="nomic-embed-text", input=["text"])
+    assert module.Client.call_args.kwargs["headers"] == {"Authorization": "Bearer key"}
@@ -1,3 +1,8 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
 from unittest.mock import MagicMock
 
 import pytest
@@ -73,3 +78,173 @@ def test_file_provider_redownloads_when_cached_hash_is_stale(tmp_path, mock_get)
     provider(url)
 
     assert mock_get.called
+
+
+def test_file_provider_fetch_many_yields_every_distinct_url(tmp_path, mock_get):
+    paper = tmp_path / "local.pdf"
+    paper.write_bytes(b"pdf")
+    urls = [
+        "https://example.com/a.pdf",
+        "https://example.com/b.pdf",
+        "https://example.com/a.pdf",
+        paper.as_uri(),
+    ]
+
+    results = dict(FileProvider(tmp_path / "cache").fetch_many(urls))
+
+    assert set(results) == set(urls)
+    assert results[paper.as_uri()] == paper.resolve()
+    assert results["https://example.com/a.pdf"].read_bytes().startswith(b"%PDF")
+    assert mock_get.call_count == 2
+
+
+def test_file_provider_fetch_many_yields_errors_instead_of_raising(tmp_path):
+    results = dict(FileProvider(tmp_path).fetch_many(["ftp://example.com/a.pdf"]))
+
+    assert isinstance(results["ftp://example.com/a.pdf"], ValueError)
+
+
+def test_file_provider_fetch_many_limits_requests_per_host(tmp_path, mock_get):
+    in_flight = {"current": 0, "peak": 0}
+    lock = threading.Lock()
+    response = mock_get.return_value
+
+    def iter_content(chunk_size):
+        with lock:
+            in_flight["current"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        time.sleep(0.05)
+        with lock:
+            in_flight["current"] -= 1
+        return [b"%PDF-1.4"]
+
+    response.iter_content.side_effect = iter_content
+    urls = [f"https://example.com/{i}.pdf" for i in range(6)]
+
+    list(FileProvider(tmp_path, max_workers=6, max_per_host=2).fetch_many(urls))
+
+    assert in_flight["peak"] == 2
+
+
+def test_file_provider_fetch_many_downloads_from_other_hosts_meanwhile(
+    tmp_path, mock_get
+):
+    other_host_started = threading.Event()
+    response = mock_get.return_value
+
+    def get(url, **kwargs):
+        if "other.org" in url:
+            other_host_started.set()
+        # downloads from the busy host wait for the other host's download
+        elif not other_host_started.wait(timeout=2):
+            raise TimeoutError("other host was kept waiting")
+        return response
+
+    mock_get.side_effect = get
+    urls = [f"https://busy.org/{i}.pdf" for i in range(3)]
+    urls.append("https://other.org/paper.pdf")
+
+    results = dict(
+        FileProvider(tmp_path, max_workers=2, max_per_host=1).fetch_many(urls)
+    )
+
+    assert all(isinstance(path, os.PathLike) for path in results.values())
+
+
+def test_file_provider_fetch_many_serves_cache_hits_without_a_host_slot(
+    tmp_path, mock_get
+):
+    cached = "https://example.com/cached.pdf"
+    FileProvider(tmp_path)(cached)
+    release = threading.Event()
+
+    def iter_content(chunk_size):
+        release.wait(timeout=2)
+        return [b"%PDF-1.4"]
+
+    mock_get.return_value.iter_content.side_effect = iter_content
+
+    fetched = FileProvider(tmp_path, max_per_host=1).fetch_many(
+        ["https://example.com/new.pdf", cached]
+    )
+
+    assert next(fetched)[0] == cached
+    release.set()
+    assert next(fetched)[0] == "https://example.com/new.pdf"
+
+
+def test_file_provider_leaves_no_partial_file_when_download_fails(tmp_path, mock_get):
+    mock_get.return_value.iter_content.side_effect = requests.ConnectionError()
+
+    with pytest.raises(requests.ConnectionError):
+        FileProvider(tmp_path)("https://example.com/paper.pdf")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_file_provider_serves_warm_cache_without_reading_contents(
+    tmp_path, mock_get, monkeypatch
+):
+    url = "https://example.com/paper.pdf"
+    FileProvider(tmp_path)(url)
+    monkeypatch.setattr(
+        "mapwisefox.assistant.tools.fileprovider._hash_file",
+        MagicMock(side_effect=AssertionError("cached file was re-hashed")),
+    )
+
+    local_path = FileProvider(tmp_path)(url)
+
+    assert local_path.exists()
+    assert mock_get.call_count == 1
+
+
+def _indexed(cache_dir):
+    with sqlite3.connect(cache_dir / ".index.sqlite3") as db:
+        rows = db.execute("SELECT name, size, sha256 FROM downloads")
+        return {name: (size, sha256) for name, size, sha256 in rows}
+
+
+def test_file_provider_records_streamed_hash_in_index_and_sidecar(tmp_path, mock_get):
+    local_path = FileProvider(tmp_path)("https://example.com/paper.pdf")
+
+    expected = hashlib.sha256(b"%PDF-1.4 fake pdf bytes").hexdigest()
+    assert _indexed(tmp_path) == {
+        local_path.name: (local_path.stat().st_size, expected)
+    }
+    assert local_path.with_name(f"{local_path.name}.sha256").read_text() == expected
+
+
+def test_file_provider_verify_mode_detects_same_size_corruption(tmp_path, mock_get):
+    url = "https://example.com/paper.pdf"
+    local_path = FileProvider(tmp_path)(url)
+    stat = local_path.stat()
+    local_path.write_bytes(b"X" * stat.st_size)
+    os.utime(local_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    FileProvider(tmp_path)(url)
+    assert mock_get.call_count == 1
+
+    FileProvider(tmp_path, verify_cache=True)(url)
+    assert mock_get.call_count == 2
+
+
+def test_file_provider_indexes_legacy_sidecar_cache_entries(tmp_path, mock_get):
+    url = "https://example.com/paper.pdf"
+    provider = FileProvider(tmp_path)
+    local_path = provider(url)
+    provider.close()
+    (tmp_path / ".index.sqlite3").unlink()
+
+    FileProvider(tmp_path)(url)
+
+    assert mock_get.call_count == 1
+    assert local_path.name in _indexed(tmp_path)
+
+
+def test_file_provider_keeps_the_index_entries_of_other_processes(tmp_path, mock_get):
+    first, second = FileProvider(tmp_path), FileProvider(tmp_path)
+
+    paths = [first("https://example.com/a.pdf"), second("https://example.com/b.pdf")]
+    first("https://example.com/c.pdf")
+
+    assert {p.name for p in paths} < set(_indexed(tmp_path))
@@ -0,0 +1,85 @@
+import json
+import threading
+
+from mapwisefox.assistant.tools.journal import CheckpointJournal, fingerprint
+
+
+def test_fingerprint_depends_on_every_part():
+    assert fingerprint("model", {"a": 1}) == fingerprint("model", {"a": 1})
+    assert fingerprint("model", {"a": 1}) != fingerprint("model", {"a": 2})
+    assert fingerprint("model", {"a": 1}) != fingerprint("other", {"a": 1})
+
+
+def test_journal_resumes_recorded_entries(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    with CheckpointJournal(path, "run") as journal:
+        journal.record("a", {"answer": "include"})
+        journal.record("b", [1, 2])
+
+    resumed = CheckpointJournal(path, "run")
+
+    assert len(resumed) == 2
+    assert resumed.get("a") == {"answer": "include"}
+    assert "b" in resumed
+    assert resumed.get("c") is None
+
+
+def test_journal_entries_are_on_disk_before_close(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    journal = CheckpointJournal(path, "run")
+
+    journal.record("a", 1)
+
+    assert CheckpointJournal(path, "run").get("a") == 1
+    journal.close()
+
+
+def test_journal_starts_over_when_settings_change(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    with CheckpointJournal(path, "old settings") as journal:
+        journal.record("a", 1)
+
+    with CheckpointJournal(path, "new settings") as journal:
+        assert len(journal) == 0
+        journal.record("b", 2)
+
+    resumed = CheckpointJournal(path, "new settings")
+    assert "a" not in resumed
+    assert resumed.get("b") == 2
+
+
+def test_journal_can_ignore_previous_entries(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    with CheckpointJournal(path, "run") as journal:
+        journal.record("a", 1)
+
+    assert len(CheckpointJournal(path, "run", resume=False)) == 0
+
+
+def test_journal_skips_a_partially_written_last_entry(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    with CheckpointJournal(path, "run") as journal:
+        journal.record("a", 1)
+    with open(path, "a") as f:
+        f.write('{"key": "b", "val')
+
+    with CheckpointJournal(path, "run") as journal:
+        assert "b" not in journal
+        journal.record("c", 3)
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line).get("key") for line in lines[1:]] == ["a", "c"]
+
+
+def test_journal_records_from_several_threads(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    with CheckpointJournal(path, "run") as journal:
+        threads = [
+            threading.Thread(target=journal.record, args=(str(i), i)) for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(CheckpointJournal(path, "run")) == 20
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import zlib
+
+import pytest
+
+from mapwisefox.assistant.tools.lru_store import SQLiteLRUStore
+
+
+@pytest.fixture
+def texts():
+    return {name: os.urandom(1024).hex() for name in "abcd"}
+
+
+def _size(text):
+    return len(zlib.compress(text.encode()))
+
+
+def _store(tmp_path, max_size_bytes):
+    return SQLiteLRUStore(
+        tmp_path / "store.sqlite3", "items", ("kind",), max_size_bytes
+    )
+
+
+def test_lru_store_round_trips_texts_and_their_columns(tmp_path):
+    store = _store(tmp_path, 2**20)
+
+    store.put("a", "some text", "paper")
+
+    assert store.get("a") == "some text"
+    assert store.get("missing") is None
+    with store.transaction() as db:
+        assert db.execute("SELECT kind FROM items").fetchall() == [("paper",)]
+
+
+def test_lru_store_evicts_least_recently_used_texts(tmp_path, texts):
+    store = _store(tmp_path, 3 * max(map(_size, texts.values())))
+    for name in "abc":
+        store.put(name, texts[name], "kind")
+    store.get("a")
+
+    store.put("d", texts["d"], "kind")
+
+    assert [store.get(name) is None for name in "abcd"] == [False, True, False, False]
+
+
+def test_lru_store_does_not_count_replaced_texts_twice(tmp_path, texts):
+    store = _store(tmp_path, 2 * max(map(_size, texts.values())))
+    store.put("a", texts["a"], "kind")
+    for _ in range(3):
+        store.put("b", texts["b"], "kind")
+
+    assert store.get("a") == texts["a"]
+
+
+def test_lru_store_counts_texts_stored_by_an_earlier_run(tmp_path, texts):
+    budget = 2 * max(map(_size, texts.values()))
+    first = _store(tmp_path, budget)
+    first.put("a", texts["a"], "kind")
+    first.put("b", texts["b"], "kind")
+    first.close()
+
+    _store(tmp_path, budget).put("c", texts["c"], "kind")
+
+    rows = sqlite3.connect(tmp_path / "store.sqlite3").execute("SELECT key FROM items")
+    assert sorted(key for (key,) in rows) == ["b", "c"]
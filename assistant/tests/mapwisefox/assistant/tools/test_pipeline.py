@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from mapwisefox.assistant.tools.pipeline import pipelined
+
+
+def test_pipelined_preserves_item_order():
+    assert list(pipelined(lambda x: x * 2, range(5))) == [0, 2, 4, 6, 8]
+
+
+def test_pipelined_chains_stages():
+    first = pipelined(lambda x: x + 1, range(3))
+
+    assert list(pipelined(str, first)) == ["1", "2", "3"]
+
+
+def test_pipelined_reraises_stage_errors_in_consumer():
+    def stage(x):
+        if x == 2:
+            raise RuntimeError("stage failed")
+        return x
+
+    results = pipelined(stage, range(5))
+
+    assert next(results) == 0
+    with pytest.raises(RuntimeError, match="stage failed"):
+        list(results)
+
+
+def test_pipelined_runs_stage_on_background_thread():
+    main_thread = threading.get_ident()
+
+    threads = list(pipelined(lambda _: threading.get_ident(), range(2)))
+
+    assert main_thread not in threads
+
+
+def test_pipelined_bounds_how_far_the_stage_runs_ahead():
+    produced = []
+
+    def stage(x):
+        produced.append(x)
+        return x
+
+    results = pipelined(stage, range(100), maxsize=2)
+    next(results)
+    time.sleep(0.3)
+
+    # one item consumed, two queued, one blocked waiting for a free slot
+    assert len(produced) <= 4
+    results.close()
+
+
+def test_pipelined_workers_apply_stage_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def stage(x):
+        barrier.wait()
+        return x
+
+    assert sorted(pipelined(stage, range(3), maxsize=3, workers=3)) == [0, 1, 2]
+
+
+def test_pipelined_workers_close_source_once_all_finish():
+    closed = threading.Event()
+
+    def source():
+        try:
+            yield from range(10)
+        finally:
+            closed.set()
+
+    assert sorted(pipelined(lambda x: x, source(), workers=4)) == list(range(10))
+    assert closed.wait(timeout=5)
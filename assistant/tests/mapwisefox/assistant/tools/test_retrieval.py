@@ -0,0 +1,76 @@
+import os
+
+from mapwisefox.assistant.tools.retrieval import ChunkIndex, split_sections
+
+
+_PAPER = """# A Study
+
+Preamble text.
+
+## Method
+
+We interviewed twelve practitioners.
+
+## Threats to Validity
+
+Construct validity is threatened by the small sample.
+
+## Results
+
+Latency dropped by half.
+"""
+
+
+def test_split_sections_splits_at_headings():
+    chunks = split_sections(_PAPER)
+
+    assert [c.splitlines()[0] for c in chunks] == [
+        "# A Study",
+        "## Method",
+        "## Threats to Validity",
+        "## Results",
+    ]
+
+
+def test_split_sections_splits_long_sections_at_paragraphs():
+    section = "## Long\n\n" + "\n\n".join(["word " * 100] * 3)
+
+    chunks = split_sections(section, max_tokens=200)
+
+    assert len(chunks) == 3
+    assert chunks[0].startswith("## Long")
+
+
+def test_chunk_index_ranks_matching_chunks_first():
+    index = ChunkIndex.from_markdown(_PAPER)
+
+    scores = index.scores("threats to validity")
+
+    assert max(range(len(scores)), key=scores.__getitem__) == 2
+    assert scores[3] == 0
+
+
+def test_chunk_index_context_keeps_best_chunks_in_document_order():
+    index = ChunkIndex(["alpha " * 40, "beta " * 40, "gamma alpha " * 20])
+
+    context = index.context("alpha gamma", token_budget=130)
+
+    assert context == (os.linesep * 2).join(["alpha " * 40, "gamma alpha " * 20])
+
+
+def test_chunk_index_context_returns_whole_document_within_budget():
+    index = ChunkIndex.from_markdown(_PAPER)
+
+    context = index.context("anything", token_budget=10_000)
+
+    assert context == (os.linesep * 2).join(index.chunks)
+
+
+def test_chunk_index_context_returns_best_chunk_exceeding_the_budget():
+    index = ChunkIndex(["alpha " * 100, "beta"])
+
+    assert index.context("alpha", token_budget=10) == "alpha " * 100
+
+
+def test_chunk_index_handles_documents_without_terms():
+    assert ChunkIndex(["", "..."]).scores("anything") == [0, 0]
@@ -28,6 +28,7 @@ class SelectionConfig(BaseModel):
 class SelectionResponse(BaseModel):
     answer: Literal["include", "exclude"]
     justification: Optional[str] = None
+    confidence: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class QACriterion(BaseModel):
@@ -149,3 +149,16 @@ def test_selection_response_rejects_unknown_answer():
 def test_selection_response_rejects_non_string_answer():
     with pytest.raises(ValidationError):
         SelectionResponse(answer=123)
+
+
+def test_selection_response_accepts_confidence_between_zero_and_one():
+    response = SelectionResponse(answer="exclude", justification="x", confidence=0.9)
+
+    assert response.confidence == 0.9
+    assert SelectionResponse(answer="include").confidence is None
+
+
+@pytest.mark.parametrize("confidence", [-0.1, 1.5])
+def test_selection_response_rejects_confidence_outside_zero_and_one(confidence):
+    with pytest.raises(ValidationError):
+        SelectionResponse(answer="include", confidence=confidence)